@@ -0,0 +1,101 @@
+"""
+Batch fan-out for the chatgpt_batch and claude_batch tools
+
+Online batches run every prompt concurrently with bounded parallelism and
+return results in input order, with an error entry for any prompt that
+failed. Offline batches are submitted to the providers' batch endpoints
+(OpenAI Batch API, Anthropic Message Batches) and collected later by id.
+"""
+
+import asyncio
+import json
+import os
+
+def batch_item(item):
+    """Normalize a prompt string or {'prompt': ..., overrides} object"""
+    if isinstance(item, str):
+        return {"prompt": item}
+    if isinstance(item, dict) and isinstance(item.get("prompt"), str):
+        return item
+    raise ValueError("each item must be a prompt string or an object with a 'prompt' string")
+
+async def run_batch(items, run_item, max_concurrency=None):
+    """
+    Run run_item(item) for every item with at most max_concurrency in flight
+
+    Returns:
+        One {"index", "text"} or {"index", "error"} dict per item, in order
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or int(os.getenv("BATCH_MAX_CONCURRENCY", "8")))
+
+    async def run_one(index, item):
+        async with semaphore:
+            try:
+                return {"index": index, "text": await run_item(batch_item(item))}
+            except Exception as e:
+                return {"index": index, "error": str(e)}
+
+    return await asyncio.gather(*[run_one(index, item) for index, item in enumerate(items)])
+
+async def submit_openai_batch(client, requests):
+    """Upload chat completion requests to the OpenAI Batch API"""
+    lines = [
+        json.dumps({"custom_id": str(index), "method": "POST", "url": "/v1/chat/completions", "body": params})
+        for index, params in enumerate(requests)
+    ]
+    upload = await client.files.create(file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch")
+    submitted = await client.batches.create(
+        input_file_id=upload.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    return {"batch_id": submitted.id, "status": submitted.status, "count": len(requests)}
+
+async def openai_batch_results(client, batch_id):
+    """Status of an OpenAI batch, with ordered results once it has completed"""
+    status = await client.batches.retrieve(batch_id)
+    report = {"batch_id": batch_id, "status": status.status}
+    if status.status != "completed":
+        return report
+
+    results = []
+    for file_id in (status.output_file_id, status.error_file_id):
+        if not file_id:
+            continue
+        content = await client.files.content(file_id)
+        for line in content.text.splitlines():
+            entry = json.loads(line)
+            index = int(entry["custom_id"])
+            body = (entry.get("response") or {}).get("body") or {}
+            if entry.get("error") or "choices" not in body:
+                results.append({"index": index, "error": str(entry.get("error") or body.get("error"))})
+            else:
+                results.append({"index": index, "text": body["choices"][0]["message"]["content"]})
+    report["results"] = sorted(results, key=lambda result: result["index"])
+    return report
+
+async def submit_anthropic_batch(client, requests):
+    """Submit message requests to the Anthropic Message Batches API"""
+    submitted = await client.messages.batches.create(requests=[
+        {"custom_id": str(index), "params": params} for index, params in enumerate(requests)
+    ])
+    return {"batch_id": submitted.id, "status": submitted.processing_status, "count": len(requests)}
+
+async def anthropic_batch_results(client, batch_id):
+    """Status of an Anthropic message batch, with ordered results once it has ended"""
+    status = await client.messages.batches.retrieve(batch_id)
+    report = {"batch_id": batch_id, "status": status.processing_status}
+    if status.processing_status != "ended":
+        return report
+
+    results = []
+    async for entry in await client.messages.batches.results(batch_id):
+        index = int(entry.custom_id)
+        if entry.result.type == "succeeded":
+            results.append({"index": index, "text": entry.result.message.content[0].text})
+        elif entry.result.type == "errored":
+            results.append({"index": index, "error": str(entry.result.error)})
+        else:
+            results.append({"index": index, "error": entry.result.type})
+    report["results"] = sorted(results, key=lambda result: result["index"])
+    return report
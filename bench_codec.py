@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the stdio codec
+
+Runs server_echo.py over stdio with the SDK transport and with the
+accelerated one from stdio_codec.py (MCP_FAST_CODEC=true), and reports
+calls per second for each echo tool with requests pipelined on one session,
+and for the accelerated transport with the calls sent as JSON-RPC batches.
+Server logging is set to warning for both, so the per-request log line
+doesn't hide the difference. The in-process cost of decoding a request and
+encoding a response is reported alongside.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import timeit
+
+import mcp.types as types
+
+import stdio_codec
+from bench_suite import StdioSession, server_env
+
+TOOLS = ["echo", "reverse", "uppercase", "lowercase"]
+
+REQUEST = b'{"jsonrpc":"2.0","id":7,"method":"tools/call","params":{"name":"echo","arguments":{"text":"hello 7"}}}'
+
+RESPONSE = types.JSONRPCMessage(types.JSONRPCResponse(
+    jsonrpc="2.0",
+    id=7,
+    result={
+        "content": [{"type": "text", "text": "Echo: hello 7"}],
+        "structuredContent": {"result": "Echo: hello 7"},
+        "isError": False
+    }
+))
+
+async def throughput(session, tool, requests, concurrency):
+    """Calls per second for one tool, keeping `concurrency` calls in flight"""
+    counter = itertools.count()
+
+    async def worker():
+        while (i := next(counter)) < requests:
+            _, error = await session.call_tool(tool, {"text": f"Hello World {i}"})
+            if error:
+                raise RuntimeError(f"{tool}: {error}")
+
+    start = asyncio.get_running_loop().time()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (asyncio.get_running_loop().time() - start)
+
+async def batch_throughput(session, tool, requests, batch_size):
+    """Calls per second for one tool, sent as batches of batch_size calls, one batch at a time"""
+    start = asyncio.get_running_loop().time()
+    for first in range(0, requests, batch_size):
+        calls = [(tool, {"text": f"Hello World {i}"}) for i in range(first, min(first + batch_size, requests))]
+        for response in await session.call_batch(calls):
+            if "error" in response or response["result"].get("isError"):
+                raise RuntimeError(f"{tool}: {response}")
+    return requests / (asyncio.get_running_loop().time() - start)
+
+async def run_codec(fast, requests, concurrency, warmup, batch_size=None):
+    env = server_env()
+    env["MCP_FAST_CODEC"] = "true" if fast else "false"
+    session = StdioSession("server_echo.py", env)
+    await session.start()
+    try:
+        await throughput(session, "echo", warmup, concurrency)
+        if batch_size:
+            return {tool: await batch_throughput(session, tool, requests, batch_size) for tool in TOOLS}
+        return {tool: await throughput(session, tool, requests, concurrency) for tool in TOOLS}
+    finally:
+        await session.close()
+
+def codec_costs(number=20000):
+    """Microseconds to decode a tools/call request and encode its response"""
+    sdk = (
+        lambda: types.JSONRPCMessage.model_validate_json(REQUEST),
+        lambda: RESPONSE.model_dump_json(by_alias=True, exclude_none=True).encode("utf-8")
+    )
+    fast = (lambda: stdio_codec.decode_message(REQUEST), lambda: stdio_codec.encode_message(RESPONSE))
+    return {
+        name: [timeit.timeit(fn, number=number) / number * 1e6 for fn in fns]
+        for name, fns in (("sdk", sdk), ("fast", fast))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the SDK and accelerated stdio codecs on the echo tools")
+    parser.add_argument("--requests", type=int, default=1000, help="Calls per tool (default: 1000)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Calls in flight (default: 32)")
+    parser.add_argument("--warmup", type=int, default=100, help="Unmeasured calls first (default: 100)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Calls per JSON-RPC batch (default: 100)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    print("Stdio codec benchmark: server_echo.py")
+    print(f"JSON library: {'orjson' if stdio_codec.orjson else 'pydantic/json'}, "
+          f"{args.requests} calls per tool, concurrency {args.concurrency}")
+    results = {
+        "sdk": asyncio.run(run_codec(False, args.requests, args.concurrency, args.warmup)),
+        "fast": asyncio.run(run_codec(True, args.requests, args.concurrency, args.warmup)),
+        "batch": asyncio.run(run_codec(True, args.requests, args.concurrency, args.warmup, args.batch_size))
+    }
+
+    print(f"\n{'Tool':<12}{'SDK calls/s':>14}{'fast calls/s':>14}{'batch calls/s':>15}{'speedup':>10}")
+    for tool in TOOLS:
+        before, after, batched = results["sdk"][tool], results["fast"][tool], results["batch"][tool]
+        print(f"{tool:<12}{before:>14.0f}{after:>14.0f}{batched:>15.0f}{after / before:>9.2f}x")
+
+    costs = codec_costs()
+    results["codec_us"] = costs
+    print(f"\n{'Codec':<12}{'decode µs':>14}{'encode µs':>14}")
+    for name, (decode, encode) in costs.items():
+        print(f"{name:<12}{decode:>14.1f}{encode:>14.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
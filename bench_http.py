@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Load test for the HTTP transports
+
+Starts one long-lived server process over streamable HTTP or SSE and drives
+it with many concurrent MCP client sessions, reporting calls per second and
+latency percentiles.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"server did not listen on port {port} within {timeout}s")
+
+def start_server(script, transport, port, extra_args=()):
+    """Spawn a server on an HTTP transport and wait until it accepts connections"""
+    proc = subprocess.Popen(
+        [sys.executable, script, "--transport", transport, "--port", str(port), *extra_args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "MCP_LOG_LEVEL": "warning"}
+    )
+    wait_for_port(port)
+    return proc
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def run_session(url, transport, tool, arguments, calls, latencies):
+    """Open one MCP session and make `calls` sequential tool calls"""
+    client = streamablehttp_client(url) if transport == "streamable-http" else sse_client(url)
+    async with client as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+            for _ in range(calls):
+                start = time.perf_counter()
+                result = await session.call_tool(tool, arguments)
+                latencies.append(time.perf_counter() - start)
+                if result.isError:
+                    raise RuntimeError(result.content[0].text)
+
+async def run_load(url, transport, sessions, calls, tool, arguments):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_session(url, transport, tool, arguments, calls, latencies) for _ in range(sessions)
+    ])
+    elapsed = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "calls": len(latencies),
+        "elapsed_s": elapsed,
+        "calls_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test over HTTP transports")
+    parser.add_argument("--server", default="server_echo.py", help="Server script (default: server_echo.py)")
+    parser.add_argument("--transport", choices=["streamable-http", "sse"], default="streamable-http")
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent client sessions (default: 50)")
+    parser.add_argument("--calls", type=int, default=20, help="Tool calls per session (default: 20)")
+    parser.add_argument("--tool", default="echo", help="Tool to call (default: echo)")
+    parser.add_argument("--arguments", default='{"text": "hello"}', help="Tool arguments as JSON")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    port = free_port()
+    proc = start_server(args.server, args.transport, port)
+    path = "/mcp" if args.transport == "streamable-http" else "/sse"
+    try:
+        results = asyncio.run(run_load(
+            f"http://127.0.0.1:{port}{path}", args.transport, args.sessions, args.calls,
+            args.tool, json.loads(args.arguments)
+        ))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+    results.update(server=args.server, transport=args.transport, tool=args.tool)
+    print(f"{args.server} over {args.transport}: {results['sessions']} sessions x {args.calls} calls")
+    print(f"  {results['calls_per_s']:.0f} calls/s, p50 {results['p50_ms']:.1f}ms, "
+          f"p95 {results['p95_ms']:.1f}ms, p99 {results['p99_ms']:.1f}ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
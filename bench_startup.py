@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the MCP servers
+
+Spawns each stdio server and measures the time until it answers
+`initialize` and `tools/list`. For reference it also measures how long
+importing the openai and anthropic SDKs takes on its own.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SERVERS = [
+    "server.py",
+    "server_echo.py",
+    "server_chatgpt.py",
+    "server_claude.py",
+    "server_news.py",
+    "gateway.py"
+]
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 0,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "bench", "version": "1.0.0"}
+    }
+}
+
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized", "params": {}}
+
+TOOLS_LIST = {"jsonrpc": "2.0", "id": 1, "method": "tools/list", "params": {}}
+
+def send(proc, message):
+    proc.stdin.write(json.dumps(message) + "\n")
+    proc.stdin.flush()
+
+def measure_server(script):
+    """Return (initialize seconds, tools/list seconds) for one cold start"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, script],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    try:
+        send(proc, INITIALIZE)
+        json.loads(proc.stdout.readline())
+        initialize = time.perf_counter() - start
+
+        send(proc, INITIALIZED)
+        send(proc, TOOLS_LIST)
+        json.loads(proc.stdout.readline())
+        tools_list = time.perf_counter() - start
+    finally:
+        proc.stdin.close()
+        proc.wait(timeout=10)
+    return initialize, tools_list
+
+def measure_sdk_import():
+    """Seconds spent importing the provider SDKs in a fresh interpreter"""
+    code = "import time; t = time.perf_counter(); import openai, anthropic; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(result.stdout)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure MCP server cold-start latency")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per server (default: 5)")
+    parser.add_argument("--servers", nargs="*", default=SERVERS, help="Server scripts to measure")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {
+        "sdk_import_ms": statistics.median(measure_sdk_import() for _ in range(args.runs)) * 1000,
+        "servers": {}
+    }
+    print(f"{'server':<20} {'initialize':>12} {'tools/list':>12}   (median of {args.runs} cold starts)")
+    for script in args.servers:
+        samples = [measure_server(script) for _ in range(args.runs)]
+        initialize = statistics.median(s[0] for s in samples) * 1000
+        tools_list = statistics.median(s[1] for s in samples) * 1000
+        results["servers"][script] = {"initialize_ms": initialize, "tools_list_ms": tools_list}
+        print(f"{script:<20} {initialize:>10.0f}ms {tools_list:>10.0f}ms")
+    print(f"\nopenai + anthropic SDK import alone: {results['sdk_import_ms']:.0f}ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the MCP servers
+
+Starts each stdio server once, keeps that one session open and drives it
+with a weighted mix of tool calls at a fixed concurrency. The provider
+tools talk to the local provider stand-ins from mock_providers.py, with
+scriptable latency, token rate and failure injection, so results don't
+depend on the network or on API keys. For every server it reports startup
+time, calls per second, p50/p95/p99 latency and the server's resident
+memory.
+
+Results can be saved with --json and compared against an earlier run with
+--compare, e.g. to check a change for regressions:
+    python bench_suite.py --json before.json
+    git checkout my-branch
+    python bench_suite.py --compare before.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import mock_providers
+from bench_http import percentile
+from bench_startup import INITIALIZE, INITIALIZED, TOOLS_LIST
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Request mix name -> (server script, [(weight, tool, arguments)])
+# "{i}" in a string argument is replaced by the call number, so those calls miss the caches.
+MIXES = {
+    "echo": ("server_echo.py", [
+        (4, "echo", {"text": "hello {i}"}),
+        (2, "reverse", {"text": "hello {i}"}),
+        (1, "uppercase", {"text": "hello"}),
+        (1, "lowercase", {"text": "HELLO"})
+    ]),
+    "chatgpt": ("server_chatgpt.py", [
+        (6, "chatgpt", {"prompt": "ping {i}"}),
+        (3, "chatgpt", {"prompt": "ping", "temperature": 0}),
+        (1, "chatgpt", {"prompt": "ping {i}", "stream": True})
+    ]),
+    "claude": ("server_claude.py", [
+        (6, "claude", {"prompt": "ping {i}"}),
+        (3, "claude", {"prompt": "ping", "temperature": 0}),
+        (1, "claude", {"prompt": "ping {i}", "stream": True})
+    ]),
+    "news": ("server_news.py", [
+        (3, "get_news", {"category": "technology", "limit": 5}),
+        (1, "get_news", {"category": "science", "limit": 10})
+    ]),
+    "gateway": ("gateway.py", [
+        (4, "echo", {"text": "hello {i}"}),
+        (2, "chatgpt", {"prompt": "ping {i}"}),
+        (2, "claude", {"prompt": "ping {i}"}),
+        (1, "get_news", {"category": "technology", "limit": 5}),
+        (1, "route_prompt", {"prompt": "ping {i}"})
+    ])
+}
+
+def fill(value, i):
+    if isinstance(value, str):
+        return value.replace("{i}", str(i))
+    if isinstance(value, dict):
+        return {key: fill(item, i) for key, item in value.items()}
+    return value
+
+def read_rss_kb(pid):
+    """(current, peak) resident set size of a process in KiB, from /proc on Linux"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None, None
+    current = fields.get("VmRSS")
+    peak = fields.get("VmHWM")
+    return (int(current.split()[0]) if current else None, int(peak.split()[0]) if peak else None)
+
+class StdioSession:
+    """One long-lived JSON-RPC session with a stdio server, with requests pipelined by id"""
+
+    def __init__(self, script, env):
+        self.script = script
+        self.env = env
+        self.proc = None
+        self.pending = {}
+        self.ids = itertools.count(2)
+        self.reader = None
+
+    async def start(self):
+        """Spawn the server and return seconds until tools/list is answered"""
+        start = time.perf_counter()
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable, self.script,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=HERE,
+            env=self.env,
+            limit=16 * 1024 * 1024
+        )
+        self.reader = asyncio.create_task(self.read_responses())
+        await self.request(INITIALIZE)
+        self.send(INITIALIZED)
+        await self.request(TOOLS_LIST)
+        return time.perf_counter() - start
+
+    def send(self, message):
+        self.proc.stdin.write(json.dumps(message).encode("utf-8") + b"\n")
+
+    async def request(self, message):
+        future = asyncio.get_running_loop().create_future()
+        self.pending[message["id"]] = future
+        self.send(message)
+        await self.proc.stdin.drain()
+        return await future
+
+    async def read_responses(self):
+        while True:
+            line = await self.proc.stdout.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            # A JSON-RPC batch is answered with an array of responses
+            for response in message if isinstance(message, list) else [message]:
+                # Notifications (logging, progress) have no id and are skipped
+                future = self.pending.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        for future in self.pending.values():
+            future.set_exception(RuntimeError(f"{self.script} exited with code {self.proc.returncode}"))
+
+    async def call_tool(self, name, arguments):
+        """Call a tool and return (seconds, error text or None)"""
+        request_id = next(self.ids)
+        start = time.perf_counter()
+        response = await self.request({
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": "tools/call",
+            "params": {"name": name, "arguments": arguments}
+        })
+        elapsed = time.perf_counter() - start
+        if "error" in response:
+            return elapsed, response["error"]["message"]
+        result = response["result"]
+        text = result["content"][0]["text"] if result.get("content") else ""
+        if result.get("isError") or text.startswith("Error"):
+            return elapsed, text
+        return elapsed, None
+
+    async def call_batch(self, calls):
+        """Send [(name, arguments)] as one JSON-RPC batch and return the responses in order"""
+        loop = asyncio.get_running_loop()
+        batch = []
+        futures = []
+        for name, arguments in calls:
+            request_id = next(self.ids)
+            futures.append(loop.create_future())
+            self.pending[request_id] = futures[-1]
+            batch.append({
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": "tools/call",
+                "params": {"name": name, "arguments": arguments}
+            })
+        self.send(batch)
+        await self.proc.stdin.drain()
+        return await asyncio.gather(*futures)
+
+    async def close(self):
+        self.proc.stdin.close()
+        try:
+            await asyncio.wait_for(self.proc.wait(), 10)
+        except asyncio.TimeoutError:
+            self.proc.kill()
+            await self.proc.wait()
+        self.reader.cancel()
+
+async def run_mix(mix, requests, concurrency, warmup, seed, env):
+    """Benchmark one server with one request mix; returns its results"""
+    script, calls = MIXES[mix]
+    rng = random.Random(seed)
+    weights = [weight for weight, _, _ in calls]
+    plan = [rng.choices(calls, weights)[0] for _ in range(warmup + requests)]
+
+    session = StdioSession(script, env)
+    startup = await session.start()
+    rss_idle, _ = read_rss_kb(session.proc.pid)
+    try:
+        for i, (_, tool, arguments) in enumerate(plan[:warmup]):
+            await session.call_tool(tool, fill(arguments, f"warmup-{i}"))
+
+        latencies = []
+        errors = {}
+        queue = iter(enumerate(plan[warmup:]))
+
+        async def worker():
+            for i, (_, tool, arguments) in queue:
+                elapsed, error = await session.call_tool(tool, fill(arguments, i))
+                latencies.append(elapsed)
+                if error is not None:
+                    errors[error[:80]] = errors.get(error[:80], 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+        rss, rss_peak = read_rss_kb(session.proc.pid)
+    finally:
+        await session.close()
+
+    return {
+        "server": script,
+        "calls": len(latencies),
+        "errors": sum(errors.values()),
+        "error_samples": errors,
+        "elapsed_s": elapsed,
+        "calls_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "startup_ms": startup * 1000,
+        "rss_idle_mb": rss_idle / 1024 if rss_idle else None,
+        "rss_mb": rss / 1024 if rss else None,
+        "rss_peak_mb": rss_peak / 1024 if rss_peak else None
+    }
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=HERE)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, cwd=HERE)
+    except OSError:
+        return None
+    return result.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "") if result.returncode == 0 else None
+
+def server_env():
+    """Environment for the servers: the provider stand-ins' URLs, without metrics or tracing exporters"""
+    env = {name: value for name, value in os.environ.items() if not name.startswith(("METRICS_", "TRACE_"))}
+    env["MCP_LOG_LEVEL"] = "warning"
+    return env
+
+# Metric -> whether higher is better
+COMPARED = {
+    "calls_per_s": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "startup_ms": False,
+    "rss_mb": False
+}
+
+def compare(baseline, results, threshold):
+    """Print each metric's change against a baseline run; returns the regressed ones"""
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} (regression threshold {threshold:.0%}):")
+    for mix, current in results["mixes"].items():
+        previous = baseline.get("mixes", {}).get(mix)
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            if flag:
+                regressions.append(f"{mix}.{metric}")
+            print(f"  {mix:<10} {metric:<12} {old:>10.1f} -> {new:>10.1f}  {change:+7.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MCP servers with one long-lived session each")
+    parser.add_argument("--mixes", nargs="*", default=list(MIXES), choices=list(MIXES),
+                        help="Request mixes to run (default: all)")
+    parser.add_argument("--requests", type=int, default=200, help="Measured tool calls per mix (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Calls in flight per session (default: 10)")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured calls before each run (default: 10)")
+    parser.add_argument("--latency", default="0.05",
+                        help="Provider latency in seconds or a distribution spec, see mock_providers.py (default: 0.05)")
+    parser.add_argument("--token-rate", type=float, help="Provider output tokens per second after the first")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of provider requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of provider requests answered with 500")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the request mix (default: 1)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare with results saved by an earlier --json run")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative change reported as a regression by --compare (default: 0.1)")
+    args = parser.parse_args()
+
+    fake = mock_providers.start_mock_providers(
+        seed=args.seed, latency=args.latency, token_rate=args.token_rate,
+        rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate, retry_after=0.1
+    )
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "latency": args.latency,
+            "token_rate": args.token_rate,
+            "rate_limit_rate": args.rate_limit_rate,
+            "error_rate": args.error_rate,
+            "seed": args.seed
+        },
+        "mixes": {}
+    }
+    print(f"{args.requests} calls per mix, {args.concurrency} in flight, provider latency {args.latency} (seconds)")
+    print(f"{'mix':<10} {'startup':>9} {'calls/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'rss':>8} {'errors':>7}")
+    try:
+        for mix in args.mixes:
+            result = asyncio.run(run_mix(mix, args.requests, args.concurrency, args.warmup, args.seed, server_env()))
+            results["mixes"][mix] = result
+            rss = f"{result['rss_mb']:.0f}MB" if result["rss_mb"] else "n/a"
+            print(f"{mix:<10} {result['startup_ms']:>7.0f}ms {result['calls_per_s']:>9.1f} "
+                  f"{result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms {result['p99_ms']:>7.1f}ms "
+                  f"{rss:>8} {result['errors']:>7}")
+            for error, count in result["error_samples"].items():
+                print(f"    {count} x {error}")
+    finally:
+        fake.should_exit = True
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Multi-worker scaling benchmark
+
+Runs server_echo.py over streamable HTTP with 1, 2, 4, ... workers and
+measures echo-tool calls per second from several client processes, so
+scaling with core count can be compared against a single worker.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+import httpx
+
+from bench_http import free_port, start_server
+
+TOOLS = ["echo", "reverse", "uppercase", "lowercase"]
+
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+
+async def drive(url, concurrency, duration):
+    """Send tools/call requests with `concurrency` in flight for `duration` seconds"""
+    deadline = time.monotonic() + duration
+    ids = itertools.count()
+    completed = 0
+
+    async def loop(client):
+        nonlocal completed
+        while time.monotonic() < deadline:
+            request_id = next(ids)
+            body = {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": "tools/call",
+                "params": {"name": TOOLS[request_id % len(TOOLS)], "arguments": {"text": "Hello, World!"}}
+            }
+            response = await client.post(url, json=body)
+            response.raise_for_status()
+            completed += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(headers=HEADERS, limits=limits, timeout=30) as client:
+        await asyncio.gather(*[loop(client) for _ in range(concurrency)])
+    return completed
+
+def client_process(url, concurrency, duration, results):
+    results.put(asyncio.run(drive(url, concurrency, duration)))
+
+def measure(workers, clients, concurrency, duration):
+    """Calls per second against a server with the given number of workers"""
+    port = free_port()
+    proc = start_server("server_echo.py", "streamable-http", port, ["--stateless", "--workers", str(workers)])
+    url = f"http://127.0.0.1:{port}/mcp"
+    try:
+        # Let every worker finish starting before measuring
+        time.sleep(1.0)
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=client_process, args=(url, concurrency, duration, results))
+            for _ in range(clients)
+        ]
+        for p in procs:
+            p.start()
+        total = sum(results.get(timeout=duration + 60) for _ in procs)
+        for p in procs:
+            p.join()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return total / duration
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure echo-tool throughput against worker count")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4], help="Worker counts to compare")
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1, help="Client processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=16, help="In-flight requests per client (default: 16)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per measurement (default: 10)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {"cpu_count": os.cpu_count(), "runs": []}
+    baseline = None
+    print(f"{'workers':>8} {'calls/s':>10} {'speedup':>8}   ({os.cpu_count()} CPUs)")
+    for workers in args.workers:
+        rate = measure(workers, args.clients, args.concurrency, args.duration)
+        baseline = baseline or rate
+        results["runs"].append({"workers": workers, "calls_per_s": rate, "speedup": rate / baseline})
+        print(f"{workers:>8} {rate:>10.0f} {rate / baseline:>7.2f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Response cache for identical tool calls
+
+Entries are keyed on a canonical hash of every request parameter, expire
+after a TTL and are evicted least-recently-used once the entry or byte
+budget is exceeded. An optional SQLite tier keeps entries across restarts;
+it is held to the same budgets, dropping expired rows and then the oldest
+ones on every write.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+import stats
+from semantic_cache import semantic_cache
+from tracing import span
+
+_caches = []  # every ResponseCache created in this process
+
+class ResponseCache:
+    """In-memory LRU cache with TTL and an optional on-disk SQLite tier"""
+
+    def __init__(self, ttl=3600.0, max_entries=1000, max_bytes=16 * 1024 * 1024, path=None, name=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self.name = name
+        self._entries = OrderedDict()  # key -> (expires_at, value, size)
+        self._bytes = 0
+        self._db = None
+        self._db_pid = None
+        self._pending = {}  # key -> in-flight fetch task
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.coalesced = 0
+        _caches.append(self)
+
+    @classmethod
+    def from_env(cls, prefix, ttl=3600.0):
+        """Build a cache configured by <prefix>_TTL, _MAX_ENTRIES, _MAX_BYTES and _PATH"""
+        return cls(
+            ttl=float(os.getenv(f"{prefix}_TTL", str(ttl))),
+            max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", "1000")),
+            max_bytes=int(os.getenv(f"{prefix}_MAX_BYTES", str(16 * 1024 * 1024))),
+            path=os.getenv(f"{prefix}_PATH") or None,
+            name=prefix.lower()
+        )
+
+    @property
+    def db(self):
+        """
+        SQLite connection for the on-disk tier, or None when memory-only
+
+        Opened lazily and reopened in a forked child, since a connection
+        must not be shared across processes.
+        """
+        if not self.path:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            self._db_pid = os.getpid()
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, size INTEGER NOT NULL DEFAULT 0)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(entries)")}
+            if "size" not in columns:
+                # Files from before the disk budget: size their rows once
+                self._db.execute("ALTER TABLE entries ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                self._db.execute("UPDATE entries SET size = LENGTH(key) + LENGTH(CAST(value AS BLOB))")
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+            self._db.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),))
+        return self._db
+
+    @staticmethod
+    def make_key(params):
+        """Canonical hash of a request parameter dict"""
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._remove(key)
+
+        if self.db is not None:
+            row = self.db.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is not None:
+                self._store(key, row[0], row[1])
+                self.disk_hits += 1
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        """Cache value under key for the configured TTL"""
+        expires_at = time.time() + self.ttl
+        self._store(key, value, expires_at)
+        if self.db is not None:
+            size = len(key) + len(value.encode("utf-8"))
+            if size > self.max_bytes:
+                return
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, size) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, size)
+            )
+            self._prune_disk()
+
+    async def get_or_fetch(self, key, fetch):
+        """
+        Return the cached value for key, or await fetch() and cache its result
+
+        Concurrent callers that miss on the same key share a single fetch.
+        If the fetch raises, nothing is cached and every caller sees the error.
+        """
+        with span("cache.lookup", cache=self.name) as lookup:
+            cached = self.get(key)
+            lookup.set("hit", cached is not None)
+        if cached is not None:
+            return cached
+
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_set(key, fetch))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shield so a cancelled caller does not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    async def _fetch_and_set(self, key, fetch):
+        value = await fetch()
+        self.set(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        self._entries.clear()
+        self._bytes = 0
+        if self.db is not None:
+            self.db.execute("DELETE FROM entries")
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+            "coalesced": self.coalesced,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "disk": self.path
+        }
+
+    def _store(self, key, value, expires_at):
+        if key in self._entries:
+            self._remove(key)
+        size = len(key) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (expires_at, value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _prune_disk(self):
+        """Drop expired rows, then the oldest rows beyond the entry or byte budget"""
+        self.db.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        cursor = self.db.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM ("
+            "SELECT key, ROW_NUMBER() OVER newest AS n, SUM(size) OVER newest AS total FROM entries "
+            "WINDOW newest AS (ORDER BY expires_at DESC, key)) WHERE n > ? OR total > ?)",
+            (self.max_entries, self.max_bytes)
+        )
+        self.disk_evictions += max(cursor.rowcount, 0)
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+def share_on_disk(directory):
+    """
+    Give every memory-only cache an on-disk tier in directory
+
+    Used by multi-worker mode so worker processes share one warm cache
+    instead of each warming their own.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for cache in _caches:
+        if not cache.path and cache.name:
+            cache.path = os.path.join(directory, f"{cache.name}.db")
+
+# Shared cache for chatgpt/claude completions
+llm_cache = ResponseCache.from_env("LLM_CACHE")
+stats.register("llm_cache", llm_cache.stats)
+
+def cache_enabled(temperature, force=False):
+    """
+    Decide whether a completion may be served from the cache
+
+    Sampled completions (temperature > 0) are not deterministic, so they
+    bypass the cache unless forced per call or with LLM_CACHE_FORCE=true.
+    """
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "true":
+        return False
+    if force or os.getenv("LLM_CACHE_FORCE", "false").lower() == "true":
+        return True
+    return temperature <= 0
+
+async def cached_completion(params, fetch, force=False):
+    """
+    Return the cached completion for params, or await fetch() and cache it
+
+    After an exact-match miss, single-prompt requests also try the semantic
+    cache for a near-duplicate prompt (see semantic_cache.py). A reply without
+    text (OpenAI returns content=None for refusals) comes back as "" and is
+    not cached.
+    """
+    if not cache_enabled(params["temperature"], force):
+        return await fetch() or ""
+
+    key = llm_cache.make_key(params)
+    with span("cache.lookup", cache=llm_cache.name) as lookup:
+        cached = llm_cache.get(key)
+        lookup.set("hit", cached is not None)
+    if cached is not None:
+        return cached
+    if semantic_cache.enabled:
+        with span("cache.lookup", cache=semantic_cache.name) as lookup:
+            cached = semantic_cache.lookup(params)
+            lookup.set("hit", cached is not None)
+        if cached is not None:
+            return cached
+    text = await fetch()
+    if not isinstance(text, str):
+        return ""
+    llm_cache.set(key, text)
+    semantic_cache.add(params, text)
+    return text
@@ -1,9 +1,10 @@
 import subprocess
 import json
+import sys
 
 # Test the server directly
 result = subprocess.run(
-    ["python", "server.py"],
+    [sys.executable, "server.py"],
     input='{"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {"protocolVersion": "2024-11-05", "capabilities": {}, "clientInfo": {"name": "test", "version": "1.0.0"}}}\n',
     text=True,
     capture_output=True,
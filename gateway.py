@@ -0,0 +1,58 @@
+"""
+Gateway MCP server
+
+Mounts the echo, news, OpenAI, Anthropic and router toolsets in one process, so they
+share the event loop, HTTP connection pool, caches and statistics.
+Enable toolsets with GATEWAY_TOOLSETS (comma-separated, default: all).
+"""
+
+from mcp.server.fastmcp import FastMCP
+import importlib
+import os
+import sys
+from runner import serve
+
+# Toolset name -> server module that defines it
+TOOLSETS = {
+    "echo": "server_echo",
+    "news": "server_news",
+    "openai": "server_chatgpt",
+    "anthropic": "server_claude",
+    "router": "server_router"
+}
+
+def enabled_toolsets():
+    """Toolsets selected by GATEWAY_TOOLSETS"""
+    names = [name.strip() for name in os.getenv("GATEWAY_TOOLSETS", ",".join(TOOLSETS)).split(",") if name.strip()]
+    unknown = [name for name in names if name not in TOOLSETS]
+    if unknown:
+        raise ValueError(f"Unknown toolset(s): {', '.join(unknown)}. Available: {', '.join(TOOLSETS)}")
+    return names
+
+def mount(gateway, toolset):
+    """Register every tool of a toolset's server module on the gateway"""
+    module = importlib.import_module(TOOLSETS[toolset])
+    for tool in module.mcp._tool_manager.list_tools():
+        # Shared tools such as server_stats are registered once
+        if gateway._tool_manager.get_tool(tool.name):
+            continue
+        gateway.add_tool(
+            tool.fn,
+            name=tool.name,
+            title=tool.title,
+            description=tool.description,
+            annotations=tool.annotations
+        )
+
+def build_gateway(toolsets=None):
+    """Create a FastMCP server with the given toolsets mounted"""
+    gateway = FastMCP("gateway_server")
+    for toolset in toolsets or enabled_toolsets():
+        mount(gateway, toolset)
+    return gateway
+
+mcp = build_gateway()
+
+if __name__ == "__main__":
+    print(f"🌐 Gateway MCP server starting ({', '.join(enabled_toolsets())})...", file=sys.stderr)
+    serve(mcp)
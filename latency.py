@@ -0,0 +1,164 @@
+"""
+Rolling latency statistics per provider model, and model selection from them
+
+Every upstream call records its total latency (and time to first token when
+streamed) into a rolling window keyed by provider, model and prompt-length
+bucket. pick_models() uses these windows to choose the model most likely
+to answer within a latency budget, or for a fast/balanced/best tier.
+
+Configuration:
+    ROUTER_MODELS              candidate models, cheapest first, as provider:model
+    ROUTER_BALANCED_BUDGET_MS  latency budget of the balanced tier (default: 5000)
+"""
+
+import os
+import time
+from collections import deque
+
+import stats
+from ratelimit import estimate_tokens
+
+# Samples kept per (provider, model, bucket)
+WINDOW = 200
+MIN_SAMPLES = 5
+
+# Upper bounds, in prompt tokens, of the prompt-length buckets
+BUCKETS = (256, 1024, 4096, 16384, 65536)
+
+# Candidates from cheapest to strongest
+DEFAULT_MODELS = (
+    "openai:gpt-4o-mini",
+    "anthropic:claude-3-5-haiku-20241022",
+    "openai:gpt-4o",
+    "anthropic:claude-3-5-sonnet-20241022"
+)
+
+TIERS = ("fast", "balanced", "best")
+
+_windows = {}
+
+def bucket_for(prompt_tokens):
+    """Index of the prompt-length bucket a prompt falls into"""
+    for index, bound in enumerate(BUCKETS):
+        if prompt_tokens < bound:
+            return index
+    return len(BUCKETS)
+
+def prompt_tokens(params):
+    return estimate_tokens(params) - params.get("max_tokens", 0)
+
+class LatencyWindow:
+    """Recent total and time-to-first-token latencies, in seconds"""
+
+    def __init__(self):
+        self.total = deque(maxlen=WINDOW)
+        self.ttft = deque(maxlen=WINDOW)
+
+    def stats(self):
+        return {
+            "samples": len(self.total),
+            "p50_ms": quantile(self.total, 0.5),
+            "p95_ms": quantile(self.total, 0.95),
+            "ttft_p50_ms": quantile(self.ttft, 0.5),
+            "ttft_p95_ms": quantile(self.ttft, 0.95)
+        }
+
+def quantile(samples, q):
+    """q-quantile of samples in milliseconds, or None without samples"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+
+def record(provider, model, params, total, ttft=None):
+    """Add one completed call's latency to its window"""
+    key = (provider, model, bucket_for(prompt_tokens(params)))
+    window = _windows.get(key)
+    if window is None:
+        window = _windows[key] = LatencyWindow()
+    window.total.append(total)
+    if ttft is not None:
+        window.ttft.append(ttft)
+
+class Timing:
+    """Measures one upstream call; wrap() a delta callback to capture the first token"""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.first_token = None
+
+    def wrap(self, on_delta):
+        async def timed(delta):
+            if self.first_token is None:
+                self.first_token = time.monotonic()
+            await on_delta(delta)
+        return timed
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def record(self, provider, params):
+        ttft = self.first_token - self.start if self.first_token is not None else None
+        record(provider, params["model"], params, self.elapsed(), ttft)
+
+def expected_ms(target, prompt_size, q=0.95):
+    """
+    Predicted q-quantile latency of a provider:model for a prompt size
+
+    Uses the prompt's own bucket when it has enough samples, otherwise the
+    nearest bucket that does. Returns None for a model without data.
+    """
+    provider, _, model = target.partition(":")
+    own = bucket_for(prompt_size)
+    for bucket in sorted(range(len(BUCKETS) + 1), key=lambda b: abs(b - own)):
+        window = _windows.get((provider, model, bucket))
+        if window is not None and len(window.total) >= MIN_SAMPLES:
+            return quantile(window.total, q)
+    return None
+
+def candidate_models():
+    configured = os.getenv("ROUTER_MODELS")
+    if configured:
+        return [target.strip() for target in configured.split(",") if target.strip()]
+    return list(DEFAULT_MODELS)
+
+def pick_models(prompt_size, tier=None, latency_budget_ms=None):
+    """
+    Order the candidate models for a request, best choice first
+
+    Args:
+        prompt_size: Estimated prompt tokens
+        tier: "fast" (lowest expected latency), "balanced" (strongest model
+            within ROUTER_BALANCED_BUDGET_MS) or "best" (strongest model)
+        latency_budget_ms: Pick the cheapest model expected to answer within
+            this many milliseconds; overrides the tier
+
+    Returns:
+        provider:model targets; the rest follow as failover options
+    """
+    models = candidate_models()
+    expected = {target: expected_ms(target, prompt_size) for target in models}
+
+    def by_latency(target):
+        # Models without data are tried early so they get measured
+        return expected[target] if expected[target] is not None else 0.0
+
+    if latency_budget_ms is None and tier in (None, "fast"):
+        return sorted(models, key=by_latency)
+    if latency_budget_ms is None and tier == "best":
+        return list(reversed(models))
+    if latency_budget_ms is None:
+        if tier != "balanced":
+            raise ValueError(f"Unknown tier {tier!r}. Available: {', '.join(TIERS)}")
+        latency_budget_ms = float(os.getenv("ROUTER_BALANCED_BUDGET_MS", "5000"))
+        # Strongest model that fits the budget
+        models = list(reversed(models))
+
+    within = [target for target in models if expected[target] is None or expected[target] <= latency_budget_ms]
+    rest = sorted((target for target in models if target not in within), key=by_latency)
+    return within + rest
+
+stats.register("latency", lambda: {
+    f"{provider}:{model}/<{BUCKETS[bucket] if bucket < len(BUCKETS) else 'max'}": window.stats()
+    for (provider, model, bucket), window in _windows.items()
+})
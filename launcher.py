@@ -1,12 +1,51 @@
 #!/usr/bin/env python3
 """
 Multi-Model MCP Server Launcher
-Choose which AI model server to run
+Choose which AI model server to run, or supervise several at once
+
+Without arguments this shows an interactive menu that runs one server over
+stdio. With --supervise it runs the selected servers as long-lived
+streamable HTTP children, so clients connect to an already-warm process
+instead of paying a cold start. Children are health-checked with MCP
+ping and tools/list, restarted with exponential backoff when they crash or
+stop answering, and their RSS and CPU use are reported periodically:
+    python launcher.py --supervise echo news gateway:8200
 """
 
+import argparse
+import asyncio
+import json
+import os
+import signal
 import subprocess
 import sys
-import os
+import time
+
+# Name -> server script
+SERVERS = {
+    "chatgpt": "server_chatgpt.py",
+    "claude": "server_claude.py",
+    "echo": "server_echo.py",
+    "news": "server_news.py",
+    "server": "server.py",
+    "router": "server_router.py",
+    "gateway": "gateway.py"
+}
+
+MENU = [
+    ("chatgpt", "🤖 ChatGPT Server (OpenAI GPT models)"),
+    ("claude", "🧠 Claude Server (Anthropic Claude models)"),
+    ("echo", "📢 Echo Server (Local text processing)"),
+    ("news", "📰 News Server (NewsAPI headlines)"),
+    ("server", "✅ Echo + ChatGPT Server"),
+    ("router", "🔀 Router Server (Failover across providers)"),
+    ("gateway", "🌐 Gateway Server (All toolsets in one process)")
+]
+
+def python_executable():
+    """The project's virtual environment Python if there is one, else this interpreter"""
+    venv = os.path.join("mcp", "Scripts", "python.exe") if os.name == "nt" else os.path.join("mcp", "bin", "python")
+    return venv if os.path.exists(venv) else sys.executable
 
 def show_menu():
     """Display the server selection menu"""
@@ -15,31 +54,22 @@ def show_menu():
     print("=" * 50)
     print()
     print("Available servers:")
-    print("1. 🤖 ChatGPT Server (OpenAI GPT models)")
-    print("2. 🧠 Claude Server (Anthropic Claude models)")
-    print("3. 📢 Echo Server (Local text processing)")
-    print("4. ❌ Exit")
+    for number, (_, label) in enumerate(MENU, 1):
+        print(f"{number}. {label}")
+    print(f"{len(MENU) + 1}. ❌ Exit")
     print()
 
 def run_server(choice):
     """Run the selected server"""
-    # Use the virtual environment Python
-    python_path = "mcp\\Scripts\\python.exe" if os.name == 'nt' else "mcp/bin/python"
-    
-    if choice == "1":
-        print("Starting ChatGPT server...")
-        subprocess.run([python_path, "server_chatgpt.py"])
-    elif choice == "2":
-        print("Starting Claude server...")
-        subprocess.run([python_path, "server_claude.py"])
-    elif choice == "3":
-        print("Starting Echo server...")
-        subprocess.run([python_path, "server_echo.py"])
-    elif choice == "4":
+    if choice == str(len(MENU) + 1):
         print("Goodbye!")
         sys.exit(0)
-    else:
-        print("Invalid choice. Please select 1-4.")
+    if not choice.isdigit() or not 1 <= int(choice) <= len(MENU):
+        print(f"Invalid choice. Please select 1-{len(MENU) + 1}.")
+        return
+    name, label = MENU[int(choice) - 1]
+    print(f"Starting {label.split(' ', 1)[1]}...")
+    subprocess.run([python_executable(), SERVERS[name]])
 
 def check_env():
     """Check if .env file exists and show configuration status"""
@@ -49,30 +79,315 @@ def check_env():
         print("   See README_MULTI_MODEL.md for details.")
         print()
         return False
-    
+
     with open('.env', 'r') as f:
         content = f.read()
-        
+
     if 'your_openai_api_key_here' in content:
         print("⚠️  WARNING: OpenAI API key not configured!")
         print("   Edit .env and replace 'your_openai_api_key_here' with your real API key")
         print()
-    
+
     if 'your_anthropic_api_key_here' in content:
         print("⚠️  WARNING: Anthropic API key not configured!")
         print("   Edit .env and replace 'your_anthropic_api_key_here' with your real API key")
         print()
-    
+
     return True
 
+def process_usage(pid):
+    """(RSS bytes, CPU seconds) of a process from /proc, or (None, None) where that isn't available"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the parenthesised command name, starting with the state
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            rss_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None, None
+    cpu_ticks = int(fields[11]) + int(fields[12])
+    return rss_pages * os.sysconf("SC_PAGE_SIZE"), cpu_ticks / os.sysconf("SC_CLK_TCK")
+
+async def check_health(url, timeout):
+    """Open an MCP session, ping it and list its tools; returns the number of tools"""
+    import anyio
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    with anyio.fail_after(timeout):
+        async with streamablehttp_client(url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                await session.send_ping()
+                return len((await session.list_tools()).tools)
+
+class Child:
+    """One supervised server process"""
+
+    def __init__(self, name, script, port, host="127.0.0.1"):
+        self.name = name
+        self.script = script
+        self.port = port
+        self.host = host
+        self.proc = None
+        self.state = "stopped"
+        self.started = 0.0
+        self.restarts = 0
+        self.crashes = 0  # consecutive, for the backoff
+        self.failed_checks = 0
+        self.tools = None
+        self.check_ms = None
+        self.cpu_sample = None  # (time, CPU seconds) at the previous report
+        self.cpu_percent = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/mcp"
+
+    def status(self):
+        running = self.proc is not None and self.proc.returncode is None
+        rss, _ = process_usage(self.proc.pid) if running else (None, None)
+        return {
+            "name": self.name,
+            "url": self.url,
+            "pid": self.proc.pid if running else None,
+            "state": self.state,
+            "uptime_s": time.monotonic() - self.started if running else 0.0,
+            "restarts": self.restarts,
+            "tools": self.tools,
+            "check_ms": self.check_ms,
+            "rss_mb": rss / 1024 / 1024 if rss is not None else None,
+            "cpu_percent": self.cpu_percent
+        }
+
+class Supervisor:
+    """
+    Keeps a set of HTTP server children running and healthy
+
+    Args:
+        children: Child instances to run
+        check_interval: Seconds between health checks
+        check_timeout: Seconds a health check may take
+        failure_threshold: Consecutive failed checks before a child is restarted
+        startup_timeout: Seconds a new child has to pass its first check
+        backoff_base: Restart delay after the first crash, doubled per consecutive crash
+        backoff_max: Longest restart delay
+        stable_after: Seconds of uptime after which a crash no longer counts as consecutive
+        report_interval: Seconds between resource reports, 0 to disable
+        status_file: Optional path rewritten with every child's status as JSON
+    """
+
+    def __init__(self, children, check_interval=10.0, check_timeout=5.0, failure_threshold=3,
+                 startup_timeout=30.0, backoff_base=1.0, backoff_max=60.0, stable_after=60.0,
+                 report_interval=30.0, status_file=None):
+        self.children = children
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.failure_threshold = failure_threshold
+        self.startup_timeout = startup_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.report_interval = report_interval
+        self.status_file = status_file
+        self.stopping = None
+
+    async def spawn(self, child):
+        child.proc = await asyncio.create_subprocess_exec(
+            python_executable(), child.script,
+            "--transport", "streamable-http", "--host", child.host, "--port", str(child.port),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            # Health checks open a session each time; keep them out of the logs
+            env={**os.environ, "MCP_LOG_LEVEL": os.getenv("MCP_LOG_LEVEL", "warning")}
+        )
+        child.started = time.monotonic()
+        child.state = "starting"
+        child.failed_checks = 0
+        child.cpu_sample = None
+        child.cpu_percent = None
+
+    async def keep_running(self, child):
+        """Run a child, restarting it with backoff whenever it exits"""
+        while not self.stopping.is_set():
+            await self.spawn(child)
+            returncode = await child.proc.wait()
+            if self.stopping.is_set():
+                break
+            if time.monotonic() - child.started >= self.stable_after:
+                child.crashes = 0
+            delay = min(self.backoff_max, self.backoff_base * 2 ** child.crashes)
+            child.crashes += 1
+            child.restarts += 1
+            child.state = "restarting"
+            print(f"⚠️  {child.name} exited with code {returncode}, restarting in {delay:.1f}s", file=sys.stderr)
+            try:
+                await asyncio.wait_for(self.stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        child.state = "stopped"
+
+    async def check(self, child):
+        if child.proc is None or child.proc.returncode is not None:
+            return
+        start = time.monotonic()
+        try:
+            child.tools = await check_health(child.url, self.check_timeout)
+        except Exception:
+            if child.state == "starting" and time.monotonic() - child.started < self.startup_timeout:
+                return
+            child.failed_checks += 1
+            child.state = "unhealthy"
+            if child.failed_checks >= self.failure_threshold and child.proc.returncode is None:
+                print(f"⚠️  {child.name} failed {child.failed_checks} health checks, restarting", file=sys.stderr)
+                child.proc.kill()
+            return
+        child.check_ms = (time.monotonic() - start) * 1000
+        child.failed_checks = 0
+        if child.state != "healthy":
+            print(f"✅ {child.name} ready on {child.url} ({child.tools} tools)", file=sys.stderr)
+        child.state = "healthy"
+
+    async def check_loop(self):
+        while not self.stopping.is_set():
+            # Children still starting up are polled quickly so they are reported ready promptly
+            starting = any(child.state == "starting" for child in self.children)
+            await asyncio.gather(*[self.check(child) for child in self.children])
+            try:
+                await asyncio.wait_for(self.stopping.wait(), 0.2 if starting else self.check_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def sample_cpu(self):
+        now = time.monotonic()
+        for child in self.children:
+            if child.proc is None or child.proc.returncode is not None:
+                continue
+            _, cpu = process_usage(child.proc.pid)
+            if cpu is None:
+                continue
+            if child.cpu_sample is not None and now > child.cpu_sample[0]:
+                child.cpu_percent = (cpu - child.cpu_sample[1]) / (now - child.cpu_sample[0]) * 100
+            child.cpu_sample = (now, cpu)
+
+    def status(self):
+        return [child.status() for child in self.children]
+
+    def report(self):
+        self.sample_cpu()
+        statuses = self.status()
+        print(f"{'server':<10} {'state':<10} {'pid':>7} {'uptime':>8} {'restarts':>8} {'rss':>8} {'cpu':>7} {'check':>8}",
+              file=sys.stderr)
+        for s in statuses:
+            rss = f"{s['rss_mb']:.0f}MB" if s["rss_mb"] is not None else "n/a"
+            cpu = f"{s['cpu_percent']:.1f}%" if s["cpu_percent"] is not None else "n/a"
+            check = f"{s['check_ms']:.0f}ms" if s["check_ms"] is not None else "n/a"
+            print(f"{s['name']:<10} {s['state']:<10} {s['pid'] or '-':>7} {s['uptime_s']:>7.0f}s {s['restarts']:>8} "
+                  f"{rss:>8} {cpu:>7} {check:>8}", file=sys.stderr)
+        if self.status_file:
+            tmp = f"{self.status_file}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(statuses, f, indent=2)
+            os.replace(tmp, self.status_file)
+
+    async def report_loop(self):
+        self.sample_cpu()
+        while not self.stopping.is_set():
+            try:
+                await asyncio.wait_for(self.stopping.wait(), self.report_interval)
+            except asyncio.TimeoutError:
+                self.report()
+
+    def stop(self):
+        self.stopping.set()
+
+    async def run(self):
+        """Supervise the children until stop() is called, then terminate them"""
+        self.stopping = asyncio.Event()
+        tasks = [asyncio.create_task(self.keep_running(child)) for child in self.children]
+        tasks.append(asyncio.create_task(self.check_loop()))
+        if self.report_interval > 0:
+            tasks.append(asyncio.create_task(self.report_loop()))
+        try:
+            await self.stopping.wait()
+        finally:
+            self.stopping.set()
+            for child in self.children:
+                if child.proc is not None and child.proc.returncode is None:
+                    child.proc.terminate()
+            for child in self.children:
+                if child.proc is not None:
+                    try:
+                        await asyncio.wait_for(child.proc.wait(), 10)
+                    except asyncio.TimeoutError:
+                        child.proc.kill()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+def parse_children(names, host, base_port):
+    """Children for 'name' or 'name:port' entries; ports default to base_port upwards"""
+    children = []
+    for index, entry in enumerate(names):
+        name, _, port = entry.partition(":")
+        if name not in SERVERS:
+            raise ValueError(f"Unknown server {name!r}. Available: {', '.join(SERVERS)}")
+        children.append(Child(name, SERVERS[name], int(port) if port else base_port + index, host))
+    return children
+
+async def supervise(supervisor):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, supervisor.stop)
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C still raises KeyboardInterrupt
+            pass
+    await supervisor.run()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run MCP servers interactively or under supervision")
+    parser.add_argument("--supervise", nargs="*", metavar="SERVER",
+                        help=f"Supervise these servers as HTTP children, as name or name:port ({', '.join(SERVERS)}; default: all)")
+    parser.add_argument("--host", default=os.getenv("MCP_HOST", "127.0.0.1"), help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--base-port", type=int, default=int(os.getenv("LAUNCHER_BASE_PORT", "8100")),
+                        help="Port of the first child without an explicit port (default: 8100)")
+    parser.add_argument("--check-interval", type=float, default=float(os.getenv("LAUNCHER_CHECK_INTERVAL", "10")),
+                        help="Seconds between health checks (default: 10)")
+    parser.add_argument("--failure-threshold", type=int, default=3,
+                        help="Failed health checks before a restart (default: 3)")
+    parser.add_argument("--backoff-max", type=float, default=60.0, help="Longest restart delay in seconds (default: 60)")
+    parser.add_argument("--report-interval", type=float, default=float(os.getenv("LAUNCHER_REPORT_INTERVAL", "30")),
+                        help="Seconds between RSS/CPU reports, 0 to disable (default: 30)")
+    parser.add_argument("--status-file", default=os.getenv("LAUNCHER_STATUS_FILE"),
+                        help="Rewrite this JSON file with the children's status at every report")
+    return parser.parse_args(argv)
+
 def main():
     """Main launcher function"""
+    args = parse_args()
+    if args.supervise is not None:
+        children = parse_children(args.supervise or list(SERVERS), args.host, args.base_port)
+        supervisor = Supervisor(
+            children,
+            check_interval=args.check_interval,
+            failure_threshold=args.failure_threshold,
+            backoff_max=args.backoff_max,
+            report_interval=args.report_interval,
+            status_file=args.status_file
+        )
+        print(f"🛡️  Supervising {', '.join(f'{c.name} on :{c.port}' for c in children)}", file=sys.stderr)
+        try:
+            asyncio.run(supervise(supervisor))
+        except KeyboardInterrupt:
+            pass
+        return
+
     print("Checking configuration...")
     check_env()
-    
+
     while True:
         show_menu()
-        choice = input("Select server (1-4): ").strip()
+        choice = input(f"Select server (1-{len(MENU) + 1}): ").strip()
         run_server(choice)
         print()
 
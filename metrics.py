@@ -0,0 +1,260 @@
+"""
+Prometheus metrics for the MCP servers
+
+instrument() wraps a FastMCP server's tool dispatch to count calls, errors
+(by exception class, or "error_result" for tools that return an error
+string), latency and calls in flight. Provider calls report upstream latency
+and token usage, and the response caches report hits and misses.
+
+Metrics are rendered in the Prometheus text exposition format and can be
+exposed two ways (either works with any transport):
+    METRICS_PORT      serve GET /metrics on 127.0.0.1 at this port
+    METRICS_FILE      rewrite this file every METRICS_INTERVAL seconds (default: 15)
+                      and at exit; worker processes append .<pid>
+"""
+
+import atexit
+import bisect
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cache
+from semantic_cache import semantic_cache
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+class Metric:
+    """A named family of samples, one per label combination"""
+
+    def __init__(self, name, kind, help, label_names=()):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = list(self.values.items())
+        for key, value in items:
+            lines.extend(self.render_sample(dict(zip(self.label_names, key)), value))
+        return lines
+
+    def render_sample(self, labels, value):
+        return [f"{self.name}{format_labels(labels)} {value}"]
+
+class Counter(Metric):
+    def __init__(self, name, help, label_names=()):
+        super().__init__(name, "counter", help, label_names)
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        """Copy a total kept elsewhere (see collect_caches)"""
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+class Gauge(Metric):
+    def __init__(self, name, help, label_names=()):
+        super().__init__(name, "gauge", help, label_names)
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+class Histogram(Metric):
+    def __init__(self, name, help, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, "histogram", help, label_names)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # Per-bucket counts (the last one is +Inf), then the sum
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def render_sample(self, labels, counts):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{format_labels({**labels, 'le': bound})} {cumulative}")
+        lines.append(f"{self.name}_sum{format_labels(labels)} {counts[-1]}")
+        lines.append(f"{self.name}_count{format_labels(labels)} {cumulative}")
+        return lines
+
+tool_calls = Counter("mcp_tool_calls_total", "Tool calls", ("server", "tool"))
+tool_errors = Counter("mcp_tool_errors_total", "Failed tool calls by error class", ("server", "tool", "error"))
+tool_duration = Histogram("mcp_tool_duration_seconds", "Tool call latency", ("server", "tool"))
+tool_in_flight = Gauge("mcp_tool_in_flight", "Tool calls currently running", ("server", "tool"))
+upstream_duration = Histogram("llm_upstream_duration_seconds", "Provider request latency", ("provider", "model"))
+upstream_tokens = Counter("llm_tokens_total", "Tokens reported in provider usage", ("provider", "model", "kind"))
+cache_requests = Counter("mcp_cache_requests_total", "Response cache lookups by outcome", ("cache", "outcome"))
+cache_hit_ratio = Gauge("mcp_cache_hit_ratio", "Response cache hit ratio", ("cache",))
+
+METRICS = [
+    tool_calls, tool_errors, tool_duration, tool_in_flight,
+    upstream_duration, upstream_tokens, cache_requests, cache_hit_ratio
+]
+
+# Provider usage field -> token kind
+USAGE_FIELDS = {
+    "prompt_tokens": "prompt",
+    "completion_tokens": "completion",
+    "input_tokens": "prompt",
+    "output_tokens": "completion",
+    "cache_read_input_tokens": "cache_read",
+    "cache_creation_input_tokens": "cache_write"
+}
+
+def record_upstream(provider, model, seconds, usage=None):
+    """Record one provider request's latency and token usage"""
+    upstream_duration.observe(seconds, provider=provider, model=model)
+    if usage is None:
+        return
+    for field, kind in USAGE_FIELDS.items():
+        tokens = getattr(usage, field, None)
+        if tokens:
+            upstream_tokens.inc(tokens, provider=provider, model=model, kind=kind)
+
+def collect_caches():
+    """Copy the response caches' and the semantic cache's own counters into the metrics"""
+    for response_cache in cache._caches:
+        if not response_cache.name:
+            continue
+        counts = response_cache.stats()
+        for outcome in ("hits", "disk_hits", "misses", "coalesced"):
+            cache_requests.set(counts.get(outcome, 0), cache=response_cache.name, outcome=outcome)
+        cache_hit_ratio.set(counts.get("hit_rate", 0.0), cache=response_cache.name)
+    if semantic_cache.enabled:
+        counts = semantic_cache.stats()
+        for outcome in ("hits", "misses"):
+            cache_requests.set(counts[outcome], cache=semantic_cache.name, outcome=outcome)
+        cache_hit_ratio.set(counts["hit_rate"], cache=semantic_cache.name)
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    collect_caches()
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def result_is_error(result):
+    """Whether a tool returned one of the servers' "Error ..." strings"""
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, (list, tuple)) and result:
+        result = getattr(result[0], "text", None)
+    return isinstance(result, str) and result.startswith("Error")
+
+def instrument(mcp):
+    """Measure every tool call dispatched by a FastMCP server"""
+    manager = mcp._tool_manager
+    if getattr(manager, "instrumented", False):
+        return
+    call_tool = manager.call_tool
+    server = mcp.name
+
+    async def measured_call_tool(name, arguments, *args, **kwargs):
+        labels = {"server": server, "tool": name}
+        tool_calls.inc(**labels)
+        tool_in_flight.inc(**labels)
+        start = time.perf_counter()
+        try:
+            result = await call_tool(name, arguments, *args, **kwargs)
+        except Exception as e:
+            # FastMCP wraps tool exceptions in ToolError; report the original class
+            tool_errors.inc(error=type(e.__cause__ or e).__name__, **labels)
+            raise
+        finally:
+            tool_duration.observe(time.perf_counter() - start, **labels)
+            tool_in_flight.dec(**labels)
+        if result_is_error(result):
+            tool_errors.inc(error="error_result", **labels)
+        return result
+
+    manager.call_tool = measured_call_tool
+    manager.instrumented = True
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Serve /metrics from a background thread; returns the HTTP server"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def write_metrics(path):
+    """Atomically replace path with the current metrics"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+def dump_metrics(path, interval):
+    """Rewrite the metrics file periodically from a background thread, and at exit"""
+    def loop():
+        while True:
+            time.sleep(interval)
+            write_metrics(path)
+
+    threading.Thread(target=loop, daemon=True).start()
+    atexit.register(write_metrics, path)
+
+def start_exporters(worker=False):
+    """
+    Start the exporters configured by METRICS_PORT and METRICS_FILE
+
+    Worker processes only write files, since they can't share one port.
+    """
+    port = os.getenv("METRICS_PORT")
+    path = os.getenv("METRICS_FILE")
+    if port and not worker:
+        serve_metrics(int(port))
+        print(f"   metrics on http://127.0.0.1:{port}/metrics", file=sys.stderr)
+    if path:
+        dump_metrics(f"{path}.{os.getpid()}" if worker else path, float(os.getenv("METRICS_INTERVAL", "15")))
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the OpenAI, Anthropic and NewsAPI endpoints
+
+Serves the parts of the protocols the servers use: OpenAI chat completions
+and Anthropic messages (both also streamed as server-sent events) and NewsAPI
+top headlines, with each provider's 429 and 5xx error formats. Replies echo
+the prompt as "pong: <prompt>", so tests and benchmarks run offline and
+deterministically.
+
+Each provider's behaviour is scriptable:
+    latency          seconds until the reply (or its first token when a
+                     token rate is set), as a number or a distribution:
+                     fixed:S, uniform:LOW,HIGH, normal:MEAN,STDDEV,
+                     lognormal:MEDIAN,SIGMA, exponential:MEAN or choice:S1,S2,...
+    token_rate       output tokens per second after the first, or None
+    output_tokens    tokens to generate instead of the short default reply
+    rate_limit_rate  fraction of requests answered with 429
+    error_rate       fraction of requests answered with 500
+    retry_after      Retry-After seconds sent with 429/503/529 responses
+    script           outcomes for the next requests, before the random ones:
+                     "ok", an HTTP status (429, 500, 503, 529) or "hang"
+
+The servers are pointed at the stand-ins with OPENAI_BASE_URL,
+ANTHROPIC_BASE_URL and NEWS_API_URL. Run the module to serve them on a fixed
+port for manual testing or benchmarks; the printed variables configure the
+servers, and POST /mock/config changes behaviour while running:
+    python mock_providers.py --port 9000 --latency lognormal:0.4,0.5 --token-rate 50 --rate-limit-rate 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import threading
+import time
+from collections import deque
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+PROVIDERS = ("openai", "anthropic", "news")
+DEFAULT_LATENCY = 0.5
+STREAM_DELTAS = ["po", "ng", ": ", "stream"]
+
+# Requests received, for assertions in tests
+LLM_REQUESTS = []
+NEWS_REQUESTS = []
+CACHED_PREFIXES = set()
+
+rng = random.Random()
+
+def parse_latency(spec):
+    """Turn a latency number or distribution spec into a function returning seconds"""
+    if isinstance(spec, (int, float)):
+        return lambda: float(spec)
+    kind, _, args = str(spec).partition(":")
+    if not args:
+        value = float(kind)
+        return lambda: value
+    values = [float(arg) for arg in args.split(",")]
+    distributions = {
+        "fixed": lambda: values[0],
+        "uniform": lambda: rng.uniform(values[0], values[1]),
+        "normal": lambda: max(0.0, rng.gauss(values[0], values[1])),
+        "lognormal": lambda: values[0] * rng.lognormvariate(0, values[1]),
+        "exponential": lambda: rng.expovariate(1 / values[0]),
+        "choice": lambda: rng.choice(values)
+    }
+    if kind not in distributions:
+        raise ValueError(f"Unknown latency distribution {kind!r}. Available: {', '.join(distributions)}")
+    return distributions[kind]
+
+class Behavior:
+    """How one provider stand-in answers"""
+
+    def __init__(self):
+        self.update(
+            latency=DEFAULT_LATENCY, token_rate=None, output_tokens=None,
+            rate_limit_rate=0.0, error_rate=0.0, retry_after=1.0, script=()
+        )
+
+    def update(self, **settings):
+        for name, value in settings.items():
+            if name == "latency":
+                self.latency_spec = value
+                self.sample_latency = parse_latency(value)
+            elif name == "script":
+                self.script = deque(value)
+            elif name in ("token_rate", "output_tokens", "rate_limit_rate", "error_rate", "retry_after"):
+                setattr(self, name, value)
+            else:
+                raise ValueError(f"Unknown mock setting {name!r}")
+
+    def outcome(self):
+        """"ok", an HTTP status or "hang" for the next request"""
+        if self.script:
+            return self.script.popleft()
+        draw = rng.random()
+        if draw < self.rate_limit_rate:
+            return 429
+        if draw < self.rate_limit_rate + self.error_rate:
+            return 500
+        return "ok"
+
+    def delays(self, tokens):
+        """Seconds to wait before each of `tokens` streamed tokens"""
+        latency = self.sample_latency()
+        if self.token_rate is None:
+            return [latency / tokens] * tokens
+        return [latency] + [1 / self.token_rate] * (tokens - 1)
+
+    def settings(self):
+        return {
+            "latency": self.latency_spec,
+            "token_rate": self.token_rate,
+            "output_tokens": self.output_tokens,
+            "rate_limit_rate": self.rate_limit_rate,
+            "error_rate": self.error_rate,
+            "retry_after": self.retry_after,
+            "script": list(self.script)
+        }
+
+BEHAVIORS = {provider: Behavior() for provider in PROVIDERS}
+
+def configure(providers=None, seed=None, **settings):
+    """Change the behaviour of some providers (default: all), e.g. configure(["openai"], script=[429])"""
+    if seed is not None:
+        rng.seed(seed)
+    for provider in providers or PROVIDERS:
+        BEHAVIORS[provider].update(**settings)
+
+def reset():
+    """Restore the default behaviour and forget recorded requests"""
+    for provider in PROVIDERS:
+        BEHAVIORS[provider] = Behavior()
+    LLM_REQUESTS.clear()
+    NEWS_REQUESTS.clear()
+    CACHED_PREFIXES.clear()
+
+def sse(data, event=None):
+    """Format one server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def reply_deltas(body, behavior, stream):
+    """Text of the reply, split into tokens"""
+    if behavior.output_tokens is not None:
+        return ["pong:"] + [" tok"] * (behavior.output_tokens - 1)
+    if stream:
+        return STREAM_DELTAS
+    return ["pong: " + body["messages"][-1]["content"]]
+
+ERROR_MESSAGES = {
+    429: "Rate limit reached",
+    500: "The server had an error while processing your request",
+    503: "Service unavailable",
+    529: "Overloaded"
+}
+
+def error_response(provider, status, behavior):
+    """A provider's error body for an injected failure"""
+    message = ERROR_MESSAGES.get(status, "Injected failure")
+    if provider == "openai":
+        body = {"error": {
+            "message": message,
+            "type": "requests" if status == 429 else "server_error",
+            "param": None,
+            "code": "rate_limit_exceeded" if status == 429 else None
+        }}
+    elif provider == "anthropic":
+        kind = {429: "rate_limit_error", 529: "overloaded_error"}.get(status, "api_error")
+        body = {"type": "error", "error": {"type": kind, "message": message}}
+    else:
+        body = {"status": "error", "code": "rateLimited" if status == 429 else "unexpectedError", "message": message}
+    headers = {}
+    if status in (429, 503, 529):
+        headers = {"retry-after": str(behavior.retry_after), "retry-after-ms": str(int(behavior.retry_after * 1000))}
+    return JSONResponse(body, status_code=status, headers=headers)
+
+async def injected_failure(provider):
+    """Error response for this request, or None to answer normally"""
+    behavior = BEHAVIORS[provider]
+    outcome = behavior.outcome()
+    if outcome == "hang":
+        # Lets callers exercise their timeouts
+        await asyncio.sleep(3600)
+    if outcome in ("ok", "hang"):
+        return None
+    await asyncio.sleep(behavior.sample_latency() / 10)
+    return error_response(provider, int(outcome), behavior)
+
+async def chat_completions_stream(body, behavior, deltas):
+    for delay, delta in zip(behavior.delays(len(deltas)), deltas):
+        await asyncio.sleep(delay)
+        yield sse({
+            "id": "chatcmpl-test",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]
+        })
+    chunk = {"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": int(time.time()), "model": body["model"]}
+    yield sse({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    if (body.get("stream_options") or {}).get("include_usage"):
+        yield sse({**chunk, "choices": [],
+                   "usage": {"prompt_tokens": 1, "completion_tokens": len(deltas), "total_tokens": 1 + len(deltas)}})
+    yield "data: [DONE]\n\n"
+
+async def chat_completions(request):
+    """OpenAI /v1/chat/completions"""
+    body = await request.json()
+    LLM_REQUESTS.append(body)
+    failure = await injected_failure("openai")
+    if failure is not None:
+        return failure
+    behavior = BEHAVIORS["openai"]
+    deltas = reply_deltas(body, behavior, body.get("stream"))
+    if body.get("stream"):
+        return StreamingResponse(chat_completions_stream(body, behavior, deltas), media_type="text/event-stream")
+    await asyncio.sleep(sum(behavior.delays(len(deltas))))
+    return JSONResponse({
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(deltas)},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 1, "completion_tokens": len(deltas), "total_tokens": 1 + len(deltas)}
+    })
+
+def cache_usage(body):
+    """Report a cache write for a newly marked prompt prefix and a read for a repeated one"""
+    if "cache_control" not in json.dumps(body):
+        return {}
+    prefix = json.dumps([body.get("system"), body["messages"][:-1]])
+    tokens = len(prefix) // 4
+    if prefix in CACHED_PREFIXES:
+        return {"cache_read_input_tokens": tokens, "cache_creation_input_tokens": 0}
+    CACHED_PREFIXES.add(prefix)
+    return {"cache_read_input_tokens": 0, "cache_creation_input_tokens": tokens}
+
+async def messages_stream(body, behavior, deltas):
+    yield sse({"type": "message_start", "message": {
+        "id": "msg-test", "type": "message", "role": "assistant", "model": body["model"],
+        "content": [], "stop_reason": None, "stop_sequence": None,
+        "usage": {"input_tokens": 1, "output_tokens": 0}
+    }}, "message_start")
+    yield sse({"type": "content_block_start", "index": 0,
+               "content_block": {"type": "text", "text": ""}}, "content_block_start")
+    for delay, delta in zip(behavior.delays(len(deltas)), deltas):
+        await asyncio.sleep(delay)
+        yield sse({"type": "content_block_delta", "index": 0,
+                   "delta": {"type": "text_delta", "text": delta}}, "content_block_delta")
+    yield sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+    yield sse({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+               "usage": {"output_tokens": len(deltas)}}, "message_delta")
+    yield sse({"type": "message_stop"}, "message_stop")
+
+async def messages(request):
+    """Anthropic /v1/messages"""
+    body = await request.json()
+    LLM_REQUESTS.append(body)
+    failure = await injected_failure("anthropic")
+    if failure is not None:
+        return failure
+    behavior = BEHAVIORS["anthropic"]
+    deltas = reply_deltas(body, behavior, body.get("stream"))
+    if body.get("stream"):
+        return StreamingResponse(messages_stream(body, behavior, deltas), media_type="text/event-stream")
+    await asyncio.sleep(sum(behavior.delays(len(deltas))))
+    return JSONResponse({
+        "id": "msg-test",
+        "type": "message",
+        "role": "assistant",
+        "model": body["model"],
+        "content": [{"type": "text", "text": "".join(deltas)}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 1, "output_tokens": len(deltas), **cache_usage(body)}
+    })
+
+async def top_headlines(request):
+    """NewsAPI /v2/top-headlines"""
+    NEWS_REQUESTS.append(dict(request.query_params))
+    failure = await injected_failure("news")
+    if failure is not None:
+        return failure
+    await asyncio.sleep(BEHAVIORS["news"].sample_latency())
+    category = request.query_params["category"]
+    return JSONResponse({
+        "status": "ok",
+        "totalResults": int(request.query_params["pageSize"]),
+        "articles": [
+            {"title": f"{category} headline {i}", "source": {"id": None, "name": "Fake Wire"},
+             "url": f"https://news.example/{category}/{i}", "publishedAt": "2024-01-01T00:00:00Z"}
+            for i in range(int(request.query_params["pageSize"]))
+        ]
+    })
+
+async def update_config(request):
+    """POST /mock/config with {"providers": [...], "seed": ..., <setting>: ...}"""
+    settings = await request.json()
+    if settings.pop("reset", False):
+        reset()
+    try:
+        configure(**settings)
+    except (TypeError, ValueError) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return await show_config(request)
+
+async def show_config(request):
+    return JSONResponse({
+        "providers": {provider: behavior.settings() for provider, behavior in BEHAVIORS.items()},
+        "llm_requests": len(LLM_REQUESTS),
+        "news_requests": len(NEWS_REQUESTS)
+    })
+
+def create_app():
+    return Starlette(routes=[
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/v1/messages", messages, methods=["POST"]),
+        Route("/v2/top-headlines", top_headlines, methods=["GET"]),
+        Route("/mock/config", show_config, methods=["GET"]),
+        Route("/mock/config", update_config, methods=["POST"])
+    ])
+
+def provider_env(port, host="127.0.0.1"):
+    """Environment variables pointing the servers at stand-ins on port"""
+    return {
+        "OPENAI_API_KEY": "test-key",
+        "OPENAI_BASE_URL": f"http://{host}:{port}/v1",
+        "ANTHROPIC_API_KEY": "test-key",
+        "ANTHROPIC_BASE_URL": f"http://{host}:{port}",
+        "NEWS_API_KEY": "test-key",
+        "NEWS_API_URL": f"http://{host}:{port}/v2/top-headlines"
+    }
+
+def start_mock_providers(port=0, **settings):
+    """
+    Serve the stand-ins from a background thread and point this process's servers at them
+
+    Behaviour is reset to the defaults, then changed by settings (see configure).
+    Returns the uvicorn server; set its should_exit to stop it.
+    """
+    reset()
+    configure(**settings)
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", port))
+    server = uvicorn.Server(uvicorn.Config(create_app(), log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    os.environ.update(provider_env(sock.getsockname()[1]))
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI/Anthropic/NewsAPI stand-ins")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=9000, help="Port (default: 9000)")
+    parser.add_argument("--providers", nargs="*", choices=PROVIDERS, help="Providers the options apply to (default: all)")
+    parser.add_argument("--latency", default=str(DEFAULT_LATENCY), help="Latency in seconds or a distribution spec")
+    parser.add_argument("--token-rate", type=float, help="Output tokens per second after the first")
+    parser.add_argument("--output-tokens", type=int, help="Tokens per reply")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429 (default: 1)")
+    parser.add_argument("--seed", type=int, help="Seed for latencies and failures")
+    args = parser.parse_args()
+
+    configure(
+        args.providers, args.seed, latency=args.latency, token_rate=args.token_rate,
+        output_tokens=args.output_tokens, rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate, retry_after=args.retry_after
+    )
+    for name, value in provider_env(args.port, args.host).items():
+        print(f"{name}={value}")
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
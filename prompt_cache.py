@@ -0,0 +1,86 @@
+"""
+Anthropic prompt caching for the Claude tools
+
+Marks the stable prefix of each request (the system prompt, and the
+conversation up to the newest user turn) with ephemeral cache_control
+breakpoints, so repeated agent-loop turns read that prefix from Anthropic's
+cache instead of reprocessing it. Prefixes shorter than the model's minimum
+cacheable size are left unmarked.
+
+Configuration:
+    ANTHROPIC_PROMPT_CACHE      set to false to disable breakpoints (default: true)
+    ANTHROPIC_CACHE_MIN_TOKENS  smallest prefix worth marking (default: 1024)
+"""
+
+import os
+
+import stats
+from tokens import content_tokens, message_tokens
+
+EPHEMERAL = {"type": "ephemeral"}
+
+_usage = {"requests": 0, "input_tokens": 0, "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+
+def mark_content(content):
+    """Return content as blocks with a cache breakpoint on the last one"""
+    if isinstance(content, str):
+        return [{"type": "text", "text": content, "cache_control": EPHEMERAL}]
+    blocks = list(content)
+    blocks[-1] = {**blocks[-1], "cache_control": EPHEMERAL}
+    return blocks
+
+def with_cache_breakpoints(params):
+    """
+    Add cache_control breakpoints to the stable prefix of a messages request
+
+    Args:
+        params: Anthropic messages.create parameters (not modified)
+
+    Returns:
+        The parameters to send, with breakpoints where the prefix is large enough
+    """
+    if os.getenv("ANTHROPIC_PROMPT_CACHE", "true").lower() == "false":
+        return params
+    min_tokens = int(os.getenv("ANTHROPIC_CACHE_MIN_TOKENS", "1024"))
+    params = dict(params)
+
+    model = params.get("model", "")
+    prefix_tokens = 0
+    system = params.get("system")
+    if system:
+        prefix_tokens = content_tokens(system, model)
+        if prefix_tokens >= min_tokens:
+            params["system"] = mark_content(system)
+
+    # Everything before the newest user turn is repeated on the next turn
+    messages = params["messages"]
+    if len(messages) >= 2 and messages[-2]["content"]:
+        prefix_tokens += sum(message_tokens(message, model) for message in messages[:-1])
+        if prefix_tokens >= min_tokens:
+            messages = list(messages)
+            messages[-2] = {**messages[-2], "content": mark_content(messages[-2]["content"])}
+            params["messages"] = messages
+    return params
+
+def record_usage(usage):
+    """Add one response's cache read/write token counts to the totals"""
+    if usage is None:
+        return None
+    counts = {
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0
+    }
+    _usage["requests"] += 1
+    _usage["input_tokens"] += usage.input_tokens or 0
+    for name, value in counts.items():
+        _usage[name] += value
+    return counts
+
+def cache_stats():
+    prompt_tokens = _usage["input_tokens"] + _usage["cache_read_input_tokens"] + _usage["cache_creation_input_tokens"]
+    return {
+        **_usage,
+        "read_ratio": _usage["cache_read_input_tokens"] / prompt_tokens if prompt_tokens else 0.0
+    }
+
+stats.register("prompt_cache", cache_stats)
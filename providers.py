@@ -0,0 +1,225 @@
+"""
+Shared async provider clients for the MCP servers
+
+Every server in a process shares one pooled httpx.AsyncClient, so concurrent
+tool calls overlap their network wait instead of blocking the event loop.
+The openai and anthropic SDKs are imported on the first call that needs
+them, which keeps them off the server's cold-start path.
+"""
+
+import os
+import httpx
+from dotenv import load_dotenv
+from ratelimit import limiter_for, estimate_tokens
+from prompt_cache import with_cache_breakpoints, record_usage
+from latency import Timing
+from metrics import record_upstream
+from tracing import span
+
+# Load environment variables
+load_dotenv()
+
+_http_client = None
+_openai_client = None
+_anthropic_client = None
+
+def get_http_client():
+    """Return the shared keep-alive HTTP connection pool"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+            ),
+            timeout=httpx.Timeout(
+                float(os.getenv("HTTP_TIMEOUT", "600")),
+                connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+            )
+        )
+    return _http_client
+
+def get_openai_client():
+    """Return the shared AsyncOpenAI client, or None if no API key is configured"""
+    global _openai_client
+    if _openai_client is None and os.getenv("OPENAI_API_KEY"):
+        from openai import AsyncOpenAI
+        _openai_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=get_http_client(),
+            # Retries on 429 are handled by the rate limiter (ratelimit.py)
+            max_retries=0
+        )
+    return _openai_client
+
+def get_anthropic_client():
+    """Return the shared AsyncAnthropic client, or None if no API key is configured"""
+    global _anthropic_client
+    if _anthropic_client is None and os.getenv("ANTHROPIC_API_KEY"):
+        from anthropic import AsyncAnthropic
+        _anthropic_client = AsyncAnthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            http_client=get_http_client(),
+            # Retries on 429/529 are handled by the rate limiter (ratelimit.py)
+            max_retries=0
+        )
+    return _anthropic_client
+
+async def aclose_clients():
+    """Close the shared connection pool and drop the provider clients"""
+    global _http_client, _openai_client, _anthropic_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    _openai_client = None
+    _anthropic_client = None
+
+def delta_notifier(ctx):
+    """
+    Build a callback that forwards streamed text deltas to the MCP client
+
+    Deltas go out as progress notifications when the client sent a
+    progressToken, and as log notifications otherwise.
+    """
+    received = 0
+
+    async def notify(delta):
+        nonlocal received
+        received += 1
+        if ctx is None:
+            return
+        try:
+            meta = ctx.request_context.meta
+        except ValueError:
+            # Called outside an MCP request, so there is no client to notify
+            return
+        if meta is not None and meta.progressToken is not None:
+            await ctx.report_progress(received, message=delta)
+        else:
+            await ctx.log("info", delta, logger_name="stream")
+
+    return notify
+
+async def stream_openai_chat(client, on_delta, **params):
+    """Stream a chat completion, forwarding each delta, and return the full text, usage and reply details"""
+    parts = []
+    usage = None
+    details = {"model": params["model"], "finish_reason": None}
+    # Without include_usage a stream reports no token counts at all
+    stream = await client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **params)
+    async for chunk in stream:
+        details["model"] = chunk.model or details["model"]
+        if chunk.usage:
+            # The last chunk, with no choices, carries the usage of the whole reply
+            usage = chunk.usage
+        if chunk.choices and chunk.choices[0].finish_reason:
+            details["finish_reason"] = chunk.choices[0].finish_reason
+        if chunk.choices and chunk.choices[0].delta.content:
+            delta = chunk.choices[0].delta.content
+            parts.append(delta)
+            await on_delta(delta)
+    return "".join(parts), usage, details
+
+async def stream_anthropic_message(client, on_delta, **params):
+    """Stream a Claude message, forwarding each delta, and return the full text and final message"""
+    parts = []
+    async with client.messages.stream(**params) as stream:
+        async for delta in stream.text_stream:
+            parts.append(delta)
+            await on_delta(delta)
+        final = await stream.get_final_message()
+    return "".join(parts), final
+
+async def openai_chat(client, params, stream=False, ctx=None, info=None):
+    """
+    Run one chat completion within the model's rate limits and return the reply text
+
+    If info is a dict, it is filled with the reply's model, finish_reason and usage.
+    """
+    async def call():
+        timing = Timing()
+        with span("upstream", provider="openai", model=params["model"], stream=stream):
+            if stream:
+                result = await stream_openai_chat(client, timing.wrap(delta_notifier(ctx)), **params)
+            else:
+                response = await client.chat.completions.create(**params)
+                choice = response.choices[0]
+                result = choice.message.content, response.usage, {"model": response.model, "finish_reason": choice.finish_reason}
+        timing.record("openai", params)
+        record_upstream("openai", params["model"], timing.elapsed(), result[1])
+        return result
+
+    text, usage, details = await limiter_for("openai", params["model"]).run(
+        estimate_tokens(params),
+        call,
+        tokens_used=lambda result: result[1].total_tokens if result[1] else None
+    )
+    if info is not None:
+        info.update(details, usage=usage_record(usage))
+    return text
+
+async def anthropic_message(client, params, stream=False, ctx=None, info=None):
+    """
+    Create one Claude message within the model's rate limits and return the reply text
+
+    The stable prompt prefix is marked for Anthropic prompt caching, and the
+    cache read/write token counts are logged to ctx when one is given. If info
+    is a dict, it is filled with the reply's model, finish_reason and usage.
+    """
+    request = with_cache_breakpoints(params)
+
+    async def call():
+        timing = Timing()
+        with span("upstream", provider="anthropic", model=params["model"], stream=stream):
+            if stream:
+                text, response = await stream_anthropic_message(client, timing.wrap(delta_notifier(ctx)), **request)
+            else:
+                response = await client.messages.create(**request)
+                text = response.content[0].text
+            result = text, response.usage, {"model": response.model, "finish_reason": response.stop_reason}
+        timing.record("anthropic", params)
+        record_upstream("anthropic", params["model"], timing.elapsed(), result[1])
+        return result
+
+    text, usage, details = await limiter_for("anthropic", params["model"]).run(
+        estimate_tokens(params),
+        call,
+        tokens_used=lambda result: result[1].input_tokens + result[1].output_tokens if result[1] else None
+    )
+    cache_usage = record_usage(usage)
+    if cache_usage and any(cache_usage.values()):
+        await log_cache_usage(ctx, cache_usage)
+    if info is not None:
+        info.update(details, usage=usage_record(usage))
+    return text
+
+def usage_record(usage):
+    """Token counts of an OpenAI or Anthropic usage object, as a plain dict"""
+    if usage is None:
+        return None
+    prompt = getattr(usage, "prompt_tokens", getattr(usage, "input_tokens", None))
+    completion = getattr(usage, "completion_tokens", getattr(usage, "output_tokens", None))
+    total = getattr(usage, "total_tokens", None)
+    if total is None and prompt is not None and completion is not None:
+        total = prompt + completion
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": total}
+
+async def log_to_client(ctx, level, message, logger_name=None):
+    """Send a log notification to the MCP client, if the call came from one"""
+    try:
+        if ctx is None or ctx.request_context is None:
+            return
+    except ValueError:
+        # Called outside an MCP request (e.g. directly from a script)
+        return
+    await ctx.log(level, message, logger_name=logger_name)
+
+async def log_cache_usage(ctx, cache_usage):
+    """Tell the MCP client how much of the prompt came from the cache"""
+    await log_to_client(
+        ctx,
+        "info",
+        f"prompt cache: read {cache_usage['cache_read_input_tokens']} tokens, "
+        f"wrote {cache_usage['cache_creation_input_tokens']} tokens",
+        logger_name="prompt_cache"
+    )
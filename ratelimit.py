@@ -0,0 +1,215 @@
+"""
+Per-provider, per-model rate limiting for upstream LLM calls
+
+Each (provider, model) pair gets a requests-per-minute and a tokens-per-minute
+token bucket plus a concurrency semaphore. Callers over the limit wait in
+line instead of failing. On 429/overloaded responses the limiter honours
+Retry-After, backs off with jittered exponential delays, and temporarily
+lowers its rate, recovering gradually on success.
+
+Configuration (per provider, e.g. OPENAI_RPM; a model-specific override such
+as OPENAI_GPT_4O_RPM takes precedence):
+    <PROVIDER>_RPM              requests per minute, 0 for unlimited
+    <PROVIDER>_TPM              tokens per minute, 0 for unlimited
+    <PROVIDER>_MAX_CONCURRENCY  requests in flight at once (default: 32)
+    PROVIDER_MAX_RETRIES        retries after a rate-limit error (default: 5)
+    PROVIDER_BACKOFF_BASE       first backoff delay in seconds (default: 1)
+    PROVIDER_BACKOFF_MAX        longest backoff delay in seconds (default: 60)
+"""
+
+import asyncio
+import os
+import random
+import re
+import time
+
+import stats
+from tracing import span
+
+# Status codes that mean "slow down": rate limited, and Anthropic's overloaded
+RATE_LIMIT_STATUSES = (429, 529)
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations
+
+    A reservation always succeeds and returns how long the caller must wait
+    before using it, so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def reserve(self, amount):
+        """Take amount tokens and return the seconds until they are available"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.per_minute, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, amount):
+        """Return tokens that were reserved but not used"""
+        if self.rate > 0:
+            self.tokens = min(self.per_minute, self.tokens + amount)
+
+    def set_rate(self, per_minute):
+        self.rate = per_minute / 60.0
+
+def env_limit(provider, model, name, default):
+    """Read <PROVIDER>_<MODEL>_<NAME>, falling back to <PROVIDER>_<NAME>"""
+    model_key = re.sub(r"[^A-Z0-9]+", "_", model.upper()).strip("_")
+    value = os.getenv(f"{provider.upper()}_{model_key}_{name}") or os.getenv(f"{provider.upper()}_{name}")
+    return int(value) if value else default
+
+def rate_limit_delay(error, attempt):
+    """
+    Seconds to wait after error, or None if it is not a rate-limit error
+
+    Honours Retry-After / retry-after-ms when the provider sends them,
+    otherwise uses jittered exponential backoff.
+    """
+    if getattr(error, "status_code", None) not in RATE_LIMIT_STATUSES:
+        return None
+    base = float(os.getenv("PROVIDER_BACKOFF_BASE", "1"))
+    cap = float(os.getenv("PROVIDER_BACKOFF_MAX", "60"))
+    backoff = random.uniform(0.5, 1.0) * min(cap, base * 2 ** attempt)
+
+    response = getattr(error, "response", None)
+    headers = response.headers if response is not None else {}
+    try:
+        if headers.get("retry-after-ms"):
+            return max(backoff, float(headers["retry-after-ms"]) / 1000)
+        if headers.get("retry-after"):
+            return max(backoff, float(headers["retry-after"]))
+    except ValueError:
+        pass
+    return backoff
+
+class ProviderLimiter:
+    """Rate limits, concurrency cap and adaptive backoff for one provider model"""
+
+    def __init__(self, provider, model):
+        self.provider = provider
+        self.model = model
+        self.rpm = env_limit(provider, model, "RPM", 0)
+        self.tpm = env_limit(provider, model, "TPM", 0)
+        self.requests = TokenBucket(self.rpm)
+        self.tokens = TokenBucket(self.tpm)
+        self.semaphore = asyncio.Semaphore(env_limit(provider, model, "MAX_CONCURRENCY", 32))
+        # Fraction of the configured rate currently allowed (lowered on 429s)
+        self.rate_factor = 1.0
+        self.blocked_until = 0.0
+        self.waiting = 0
+        self.counts = {"calls": 0, "rate_limited": 0, "retries": 0, "failed": 0, "wait_seconds": 0.0}
+
+    async def run(self, estimated_tokens, call, tokens_used=None):
+        """
+        Await call() within the limits, retrying on rate-limit errors
+
+        Args:
+            estimated_tokens: Tokens reserved against the TPM budget up front
+            call: Zero-argument coroutine function making the upstream request
+            tokens_used: Optional function mapping call()'s result to the
+                tokens it actually used, to correct the TPM reservation
+        """
+        self.counts["calls"] += 1
+        max_retries = int(os.getenv("PROVIDER_MAX_RETRIES", "5"))
+        attempt = 0
+        while True:
+            with span("ratelimit.wait", provider=self.provider, model=self.model, attempt=attempt):
+                await self._wait_turn(estimated_tokens)
+                await self.semaphore.acquire()
+            try:
+                try:
+                    result = await call()
+                finally:
+                    self.semaphore.release()
+            except Exception as e:
+                # A failed call used no tokens; the next attempt reserves its own
+                self.tokens.refund(estimated_tokens)
+                delay = rate_limit_delay(e, attempt)
+                if delay is None or attempt >= max_retries:
+                    if delay is not None:
+                        self.counts["failed"] += 1
+                    raise
+                self._slow_down(delay)
+                attempt += 1
+                self.counts["retries"] += 1
+                continue
+
+            self._speed_up()
+            if tokens_used is not None:
+                used = tokens_used(result)
+                if used is not None:
+                    self.tokens.refund(estimated_tokens - used)
+            return result
+
+    async def _wait_turn(self, estimated_tokens):
+        self.waiting += 1
+        try:
+            start = time.monotonic()
+            blocked = self.blocked_until - start
+            if blocked > 0:
+                await asyncio.sleep(blocked)
+            delay = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.counts["wait_seconds"] += time.monotonic() - start
+        finally:
+            self.waiting -= 1
+
+    def _slow_down(self, delay):
+        """Pause everyone queued on this model and halve the allowed rate"""
+        self.counts["rate_limited"] += 1
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        self.rate_factor = max(0.1, self.rate_factor * 0.5)
+        self._apply_rate()
+
+    def _speed_up(self):
+        """Recover the allowed rate additively after successful calls"""
+        if self.rate_factor < 1.0:
+            self.rate_factor = min(1.0, self.rate_factor + 0.05)
+            self._apply_rate()
+
+    def _apply_rate(self):
+        self.requests.set_rate(self.rpm * self.rate_factor)
+        self.tokens.set_rate(self.tpm * self.rate_factor)
+
+    def stats(self):
+        return {
+            **self.counts,
+            "waiting": self.waiting,
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "rate_factor": self.rate_factor
+        }
+
+_limiters = {}
+
+def limiter_for(provider, model):
+    """Return the shared limiter for a provider model"""
+    key = (provider, model)
+    if key not in _limiters:
+        _limiters[key] = ProviderLimiter(provider, model)
+    return _limiters[key]
+
+def estimate_tokens(params):
+    """Token estimate for a request: its prompt, counted like the context budget, plus max_tokens"""
+    # tokens imports env_limit from this module
+    from tokens import content_tokens, message_tokens
+
+    model = params.get("model", "")
+    total = sum(message_tokens(message, model) for message in params.get("messages", []))
+    if params.get("system"):
+        total += content_tokens(params["system"], model)
+    return total + params.get("max_tokens", 0)
+
+stats.register("rate_limits", lambda: {
+    f"{provider}/{model}": limiter.stats() for (provider, model), limiter in _limiters.items()
+})
@@ -0,0 +1,74 @@
+"""
+Typed tool results for MCP structured content
+
+By default the tools return plain text, as they always have. With
+STRUCTURED_OUTPUT=true, get_news and the chatgpt/claude prompt and
+conversation tools declare an output schema and return JSON objects instead
+(headlines as article records, replies with their model, finish reason,
+token usage and latency). Clients get them as structuredContent, plus the
+same JSON as text for clients that only read text. Errors are then raised,
+so they reach the client as isError results rather than as "Error ..." text.
+"""
+
+import os
+import time
+
+from mcp.server.fastmcp.exceptions import ToolError
+from typing_extensions import TypedDict
+
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "false").lower() == "true"
+
+class Article(TypedDict):
+    title: str
+    source: str
+    url: str | None
+    published_at: str | None
+
+class News(TypedDict):
+    category: str
+    articles: list[Article]
+
+class Usage(TypedDict):
+    prompt_tokens: int | None
+    completion_tokens: int | None
+    total_tokens: int | None
+
+class Completion(TypedDict):
+    text: str
+    model: str
+    finish_reason: str | None
+    usage: Usage | None
+    latency_ms: float
+    cached: bool
+
+# Return annotations of the tools, which decide their output schema
+NewsOutput = News if STRUCTURED_OUTPUT else str
+CompletionOutput = Completion if STRUCTURED_OUTPUT else str
+
+def error_output(message):
+    """Return an error message as text, or raise it for structured tools"""
+    if STRUCTURED_OUTPUT:
+        raise ToolError(message)
+    return message
+
+def completion_output(text, params, info, started):
+    """
+    A tool's reply: the text, or a Completion record with structured output
+
+    Args:
+        text: Reply text
+        params: Request parameters, for the model when the reply came from a cache
+        info: Dict the provider call filled with model, finish_reason and usage;
+            left empty when the reply came from a cache
+        started: time.perf_counter() when the tool started
+    """
+    if not STRUCTURED_OUTPUT:
+        return text
+    return {
+        "text": text,
+        "model": info.get("model") or params["model"],
+        "finish_reason": info.get("finish_reason"),
+        "usage": info.get("usage"),
+        "latency_ms": (time.perf_counter() - started) * 1000,
+        "cached": not info
+    }
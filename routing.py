@@ -0,0 +1,157 @@
+"""
+Provider failover and hedged requests
+
+Routes one completion across an ordered list of providers. In failover mode
+the next provider is tried when one fails. In hedged mode the next provider
+is also started if the current one hasn't answered within its recent p95
+latency; the first success wins and the slower call is cancelled.
+
+Each provider's health is tracked from routed calls to any of its models
+(targets are 'provider' or 'provider:model'): after a run of consecutive
+failures its circuit opens for a cooldown and all of its targets move to
+the back of every failover list, so traffic shifts to the healthy providers.
+
+Configuration:
+    ROUTER_FAILURE_THRESHOLD  consecutive failures that open the circuit (default: 3)
+    ROUTER_COOLDOWN           seconds a circuit stays open (default: 30)
+    ROUTER_HEDGE_DELAY        hedge delay before enough latency samples exist (default: 2)
+    ROUTER_HEDGE_MIN_DELAY    shortest hedge delay (default: 0.05)
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+
+import stats
+
+# Latency samples kept per provider for the hedge delay
+WINDOW = 100
+MIN_SAMPLES = 5
+
+class ProviderHealth:
+    """Recent latency and failure history of one provider"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = deque(maxlen=WINDOW)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.counts = {"calls": 0, "failures": 0, "hedged": 0, "wins": 0, "cancelled": 0}
+
+    def record_success(self, latency):
+        self.latencies.append(latency)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self):
+        self.counts["failures"] += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= int(os.getenv("ROUTER_FAILURE_THRESHOLD", "3")):
+            self.open_until = time.monotonic() + float(os.getenv("ROUTER_COOLDOWN", "30"))
+
+    def healthy(self):
+        return time.monotonic() >= self.open_until
+
+    def p95(self):
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def hedge_delay(self):
+        """How long to wait on this provider before starting the next one"""
+        p95 = self.p95()
+        delay = p95 if p95 is not None else float(os.getenv("ROUTER_HEDGE_DELAY", "2"))
+        return max(delay, float(os.getenv("ROUTER_HEDGE_MIN_DELAY", "0.05")))
+
+    def stats(self):
+        p95 = self.p95()
+        return {
+            **self.counts,
+            "healthy": self.healthy(),
+            "consecutive_failures": self.consecutive_failures,
+            "p95_ms": p95 * 1000 if p95 is not None else None
+        }
+
+_health = {}
+
+def provider_of(name):
+    """The provider part of a 'provider' or 'provider:model' target"""
+    return name.partition(":")[0]
+
+def health_for(name):
+    """Health of the provider a target belongs to, shared by all of its models"""
+    provider = provider_of(name)
+    if provider not in _health:
+        _health[provider] = ProviderHealth(provider)
+    return _health[provider]
+
+def order_by_health(names):
+    """Keep the caller's order, but move targets whose provider's circuit is open to the back"""
+    return sorted(names, key=lambda name: not health_for(name).healthy())
+
+class AllProvidersFailed(RuntimeError):
+    """Every provider in the route failed"""
+
+async def _attempt(name, call):
+    """Run one provider call and record its outcome; returns (name, result)"""
+    health = health_for(name)
+    health.counts["calls"] += 1
+    start = time.monotonic()
+    try:
+        result = await call()
+    except asyncio.CancelledError:
+        health.counts["cancelled"] += 1
+        raise
+    except Exception:
+        health.record_failure()
+        raise
+    health.record_success(time.monotonic() - start)
+    return name, result
+
+async def route(calls, hedge=False):
+    """
+    Run a completion on the first provider that succeeds
+
+    Args:
+        calls: Ordered {provider name: zero-argument coroutine function}
+        hedge: Start the next provider when the current one passes its p95 latency
+
+    Returns:
+        (provider name, result) of the winning call
+
+    Raises:
+        AllProvidersFailed: With every provider's error, if none succeeded
+    """
+    pending_names = order_by_health(list(calls))
+    running = {}
+    errors = {}
+    try:
+        while pending_names or running:
+            if pending_names and (hedge or not running):
+                name = pending_names.pop(0)
+                if running:
+                    health_for(name).counts["hedged"] += 1
+                running[asyncio.ensure_future(_attempt(name, calls[name]))] = name
+
+            # Wait for a result, or until the newest call has run past its hedge delay
+            newest = list(running.values())[-1]
+            timeout = health_for(newest).hedge_delay() if hedge and pending_names else None
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                try:
+                    winner, result = task.result()
+                except Exception as e:
+                    errors[name] = e
+                    continue
+                health_for(winner).counts["wins"] += 1
+                return winner, result
+    finally:
+        # Cancel the slower hedged calls
+        for task in running:
+            task.cancel()
+    raise AllProvidersFailed("; ".join(f"{name}: {error}" for name, error in errors.items()))
+
+stats.register("routing", lambda: {name: health.stats() for name, health in _health.items()})
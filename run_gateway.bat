@@ -0,0 +1,5 @@
+@echo off
+echo Starting Gateway MCP Server...
+cd /d "C:\Users\mashe\Desktop\MCPserver"
+call mcp\Scripts\activate.bat
+python gateway.py
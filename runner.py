@@ -0,0 +1,180 @@
+"""
+Command-line entry point shared by the MCP servers
+
+Every server runs over stdio by default, optionally with the faster codec in
+stdio_codec.py (--fast-codec). With --transport (or MCP_TRANSPORT)
+set to streamable-http or sse, one long-lived process serves many clients,
+which then share its warm connection pools and caches. --workers runs a
+pre-fork pool of such processes on one port (see workers.py).
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import uvicorn
+from starlette.responses import JSONResponse
+
+import metrics
+import tracing
+
+TRANSPORTS = ["stdio", "streamable-http", "sse"]
+
+def parse_args(argv=None):
+    """Parse transport options, defaulting to the MCP_* environment variables"""
+    parser = argparse.ArgumentParser(description="Run an MCP server")
+    parser.add_argument("--transport", choices=TRANSPORTS, default=os.getenv("MCP_TRANSPORT", "stdio"),
+                        help="Transport to serve (default: stdio)")
+    parser.add_argument("--host", default=os.getenv("MCP_HOST", "127.0.0.1"),
+                        help="Bind address for HTTP transports (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", "8000")),
+                        help="Port for HTTP transports (default: 8000)")
+    parser.add_argument("--max-sessions", type=int, default=int(os.getenv("MCP_MAX_SESSIONS", "0")),
+                        help="Maximum concurrent client sessions, 0 for unlimited (default: 0)")
+    parser.add_argument("--session-idle-timeout", type=float, default=float(os.getenv("MCP_SESSION_IDLE_TIMEOUT", "600")),
+                        help="Seconds before an idle session stops counting against --max-sessions (default: 600)")
+    parser.add_argument("--log-level", default=os.getenv("MCP_LOG_LEVEL"),
+                        help="Server log level (default: the server's FastMCP log level)")
+    parser.add_argument("--stateless", action="store_true", default=os.getenv("MCP_STATELESS_HTTP", "false").lower() == "true",
+                        help="Serve streamable-http without server-side sessions (implied by --workers > 1)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("MCP_WORKERS", "1")),
+                        help="Worker processes for streamable-http (default: 1)")
+    parser.add_argument("--cache-dir", default=os.getenv("MCP_CACHE_DIR"),
+                        help="Directory for the response caches shared by workers (default: a temp directory)")
+    parser.add_argument("--restart-delay", type=float, default=float(os.getenv("MCP_RESTART_DELAY", "1")),
+                        help="Seconds between worker replacements on graceful restart (default: 1)")
+    parser.add_argument("--fast-codec", action="store_true", default=os.getenv("MCP_FAST_CODEC", "false").lower() == "true",
+                        help="Use the accelerated stdio transport in stdio_codec.py (default: off)")
+    return parser.parse_args(argv)
+
+class SessionLimiter:
+    """
+    ASGI middleware that caps concurrent MCP sessions
+
+    Streamable HTTP sessions are tracked by their mcp-session-id header from
+    initialize until DELETE or until idle for `idle_timeout` seconds. SSE
+    sessions last as long as their event stream is open. Requests that would
+    open a session beyond the cap get 503 with Retry-After.
+    """
+
+    def __init__(self, app, max_sessions, idle_timeout=600.0, sse_path="/sse", message_path="/messages/"):
+        self.app = app
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sse_path = sse_path
+        self.message_path = message_path
+        self._sessions = {}  # mcp-session-id -> last seen
+        self._opening = 0
+        self._sse_streams = 0
+
+    @property
+    def active_sessions(self):
+        return len(self._sessions) + self._opening + self._sse_streams
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        session_id = dict(scope["headers"]).get(b"mcp-session-id")
+        if scope["method"] == "GET" and scope["path"] == self.sse_path:
+            await self._open_sse_stream(scope, receive, send)
+        elif session_id is not None:
+            if scope["method"] == "DELETE":
+                self._sessions.pop(session_id, None)
+            elif session_id in self._sessions:
+                self._sessions[session_id] = time.monotonic()
+            await self.app(scope, receive, send)
+        elif scope["method"] == "POST" and not scope["path"].startswith(self.message_path):
+            await self._open_http_session(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def _open_sse_stream(self, scope, receive, send):
+        if self.active_sessions >= self.max_sessions:
+            return await self._reject(scope, receive, send)
+        self._sse_streams += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._sse_streams -= 1
+
+    async def _open_http_session(self, scope, receive, send):
+        self._expire_idle()
+        if self.active_sessions >= self.max_sessions:
+            return await self._reject(scope, receive, send)
+
+        opening = True
+
+        async def track_session(message):
+            nonlocal opening
+            if message["type"] == "http.response.start" and opening:
+                # The response may still be streaming, so count the session as open now
+                opening = False
+                self._opening -= 1
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"mcp-session-id":
+                        self._sessions[value] = time.monotonic()
+            await send(message)
+
+        self._opening += 1
+        try:
+            await self.app(scope, receive, track_session)
+        finally:
+            if opening:
+                self._opening -= 1
+
+    def _expire_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for session_id in [sid for sid, seen in self._sessions.items() if seen < cutoff]:
+            del self._sessions[session_id]
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(
+            {"jsonrpc": "2.0", "id": None, "error": {"code": -32000, "message": "Too many concurrent sessions"}},
+            status_code=503,
+            headers={"Retry-After": "1"}
+        )
+        await response(scope, receive, send)
+
+def http_app(mcp, transport, max_sessions=0, idle_timeout=600.0):
+    """Build the ASGI app for an HTTP transport, with the session cap applied"""
+    app = mcp.streamable_http_app() if transport == "streamable-http" else mcp.sse_app()
+    if max_sessions > 0:
+        app = SessionLimiter(app, max_sessions, idle_timeout, mcp.settings.sse_path, mcp.settings.message_path)
+    return app
+
+def serve(mcp, argv=None):
+    """Run a FastMCP server on the transport selected on the command line"""
+    args = parse_args(argv)
+    metrics.instrument(mcp)
+    tracing.instrument(mcp)
+    if args.log_level:
+        mcp.settings.log_level = args.log_level.upper()
+        logging.getLogger().setLevel(mcp.settings.log_level)
+    if args.transport == "stdio":
+        metrics.start_exporters()
+        tracing.configure()
+        if args.fast_codec:
+            import anyio
+            from stdio_codec import run_stdio
+            anyio.run(run_stdio, mcp)
+        else:
+            mcp.run(transport="stdio")
+        return
+
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    mcp.settings.stateless_http = args.stateless or args.workers > 1
+    print(f"   serving {args.transport} on http://{args.host}:{args.port}", file=sys.stderr)
+    build_app = lambda: http_app(mcp, args.transport, args.max_sessions, args.session_idle_timeout)
+    if args.workers > 1:
+        from workers import serve_workers
+        if os.getenv("METRICS_PORT"):
+            print("⚠️  METRICS_PORT is ignored with --workers, set METRICS_FILE for per-worker files", file=sys.stderr)
+        serve_workers(mcp, args, build_app)
+        return
+    metrics.start_exporters()
+    tracing.configure()
+    uvicorn.run(build_app(), host=args.host, port=args.port, log_level=mcp.settings.log_level.lower())
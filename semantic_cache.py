@@ -0,0 +1,300 @@
+"""
+Semantic cache for near-duplicate single-prompt completions
+
+Prompts are embedded with a hashed word and character n-gram vectorizer over
+their content words, so lightly rephrased questions ("What's the capital of
+France?" / "what is the capital of france") land close together while a
+different topic ("... of Spain?") does not. Numbers and the words after
+direction words ("to EUR", "than Java") weigh more, so swapping which way
+a question goes ("100 USD to EUR" / "100 EUR to USD") or changing a number
+moves the prompt away. A completion is served from the cache when a stored
+prompt for the same provider, model and parameters has cosine similarity at
+or above the threshold and exactly the same numbers, in the same order.
+
+Vectors live in a fixed-size float32 matrix, one row per entry, evicted
+least-recently-used. NumPy is used for the similarity scan when installed;
+otherwise a pure-Python scan over the query's non-zero features is used,
+which is fine for a few thousand entries. With a path, the matrix is a
+memory-mapped file and entry metadata is kept in SQLite next to it, so the
+index survives restarts.
+
+Configuration:
+    SEMANTIC_CACHE_ENABLED      turn the layer on (default: false)
+    SEMANTIC_CACHE_THRESHOLD    minimum cosine similarity for a hit (default: 0.9)
+    SEMANTIC_CACHE_MAX_ENTRIES  index rows before LRU eviction (default: 2000)
+    SEMANTIC_CACHE_DIM          vector dimensions (default: 1024)
+    SEMANTIC_CACHE_TTL          seconds an entry stays valid (default: 3600)
+    SEMANTIC_CACHE_PATH         file prefix for <path>.vectors and <path>.db (default: memory only)
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import sqlite3
+import time
+import zlib
+from collections import OrderedDict, deque
+
+import stats
+from latency import quantile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+WORD = re.compile(r"\w+")
+NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+# Words that carry little meaning; dropping them lets the topic words decide similarity
+STOPWORDS = frozenset(
+    "a an and are about be can could did do does for how i in is it me my of on or please "
+    "s should that the this to was we were what whats with would you".split()
+)
+
+# Words that set which way a question goes; the word after one is kept as an extra feature
+DIRECTION_WORDS = frozenset("from into than to versus vs per".split())
+
+# Weight of numbers and direction features relative to the other features
+ORDER_WEIGHT = 3.0
+
+def features(text):
+    """(feature, weight) pairs: content words, their bigrams and character trigrams, and direction pairs"""
+    tokens = WORD.findall(text.lower().replace("'", ""))
+    words = [word for word in tokens if word not in STOPWORDS] or tokens
+    for word in words:
+        yield word, ORDER_WEIGHT if word[0].isdigit() else 1.0
+    for a, b in zip(words, words[1:]):
+        yield f"{a} {b}", 1.0
+    for a, b in zip(tokens, tokens[1:]):
+        if a in DIRECTION_WORDS and b not in STOPWORDS:
+            yield f"{a}>{b}", ORDER_WEIGHT
+    for word in words:
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            yield padded[i:i + 3], 1.0
+
+def embed(text, dim):
+    """Unit-length hashed feature vector of text, as a sparse {index: weight} dict"""
+    vector = {}
+    for feature, weight in features(text):
+        h = zlib.crc32(feature.encode("utf-8"))
+        index = h % dim
+        # A hash-derived sign keeps colliding features from only ever adding up
+        vector[index] = vector.get(index, 0.0) + (weight if (h // dim) & 1 else -weight)
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    if norm == 0:
+        return {}
+    return {index: w / norm for index, w in vector.items() if w}
+
+def single_prompt(params):
+    """The prompt of a one-message user request, or None for conversations"""
+    messages = params.get("messages")
+    if not messages or len(messages) != 1 or messages[0].get("role") != "user":
+        return None
+    content = messages[0].get("content")
+    return content if isinstance(content, str) else None
+
+def scope_key(params):
+    """Hash of every request parameter except the prompt itself"""
+    scope = {key: value for key, value in params.items() if key != "messages"}
+    canonical = json.dumps(scope, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class SemanticCache:
+    """Bounded nearest-neighbour cache of completions keyed on prompt similarity"""
+
+    def __init__(self, threshold=0.9, max_entries=2000, dim=1024, ttl=3600.0, path=None,
+                 enabled=True, name="semantic_cache"):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dim = dim
+        self.ttl = ttl
+        self.path = path
+        self.enabled = enabled
+        self.name = name
+        self._pid = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lookup_seconds = deque(maxlen=1000)
+
+    @classmethod
+    def from_env(cls, prefix="SEMANTIC_CACHE"):
+        return cls(
+            threshold=float(os.getenv(f"{prefix}_THRESHOLD", "0.9")),
+            max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", "2000")),
+            dim=int(os.getenv(f"{prefix}_DIM", "1024")),
+            ttl=float(os.getenv(f"{prefix}_TTL", "3600")),
+            path=os.getenv(f"{prefix}_PATH") or None,
+            enabled=os.getenv(f"{prefix}_ENABLED", "false").lower() == "true",
+            name=prefix.lower()
+        )
+
+    def _open(self):
+        """
+        Allocate the vector matrix and load persisted entries
+
+        Done lazily, and again in a forked child, so processes never share
+        a mapping or an SQLite connection.
+        """
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        size = self.max_entries * self.dim * 4
+        self._entries = [None] * self.max_entries  # slot -> (scope, prompt, value, expires_at)
+        self._scopes = {}  # scope -> set of slots
+        self._lru = OrderedDict()  # used slots, least recently used first
+        self._db = None
+
+        if self.path:
+            vectors = f"{self.path}.vectors"
+            fresh = not os.path.exists(vectors) or os.path.getsize(vectors) != size
+            with open(vectors, "a+b") as f:
+                f.truncate(size)
+                self._buffer = mmap.mmap(f.fileno(), size)
+            self._db = sqlite3.connect(f"{self.path}.db", isolation_level=None, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries (slot INTEGER PRIMARY KEY, scope TEXT NOT NULL, "
+                "prompt TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            if fresh:
+                # Rows in a resized matrix no longer match their metadata
+                self._db.execute("DELETE FROM entries")
+            self._db.execute("DELETE FROM entries WHERE expires_at < ? OR slot >= ?", (time.time(), self.max_entries))
+            for slot, scope, prompt, value, expires_at in self._db.execute(
+                "SELECT slot, scope, prompt, value, expires_at FROM entries ORDER BY expires_at"
+            ):
+                self._index(slot, scope, prompt, value, expires_at)
+        else:
+            self._buffer = bytearray(size)
+
+        if numpy is not None:
+            self._matrix = numpy.frombuffer(self._buffer, dtype=numpy.float32).reshape(self.max_entries, self.dim)
+        else:
+            self._floats = memoryview(self._buffer).cast("f")
+
+    def _index(self, slot, scope, prompt, value, expires_at):
+        self._entries[slot] = (scope, prompt, value, expires_at)
+        self._scopes.setdefault(scope, set()).add(slot)
+        self._lru[slot] = None
+
+    def _similarities(self, slots, query):
+        """Cosine similarity of the query with each slot's vector"""
+        if numpy is not None:
+            dense = numpy.zeros(self.dim, dtype=numpy.float32)
+            for index, weight in query.items():
+                dense[index] = weight
+            return (self._matrix[slots] @ dense).tolist()
+        items = list(query.items())
+        floats = self._floats
+        dim = self.dim
+        return [sum(floats[slot * dim + index] * weight for index, weight in items) for slot in slots]
+
+    def lookup(self, params):
+        """Cached completion for a near-duplicate prompt with the same parameters, or None"""
+        prompt = single_prompt(params) if self.enabled else None
+        if prompt is None:
+            return None
+        start = time.perf_counter()
+        self._open()
+        now = time.time()
+        slots = list(self._scopes.get(scope_key(params), ()))
+        for slot in [slot for slot in slots if self._entries[slot][3] <= now]:
+            self._remove(slot)
+            slots.remove(slot)
+
+        value = None
+        query = embed(prompt, self.dim)
+        if slots and query:
+            scores = self._similarities(slots, query)
+            numbers = NUMBER.findall(prompt)
+            # Best match above the threshold that asks about the same numbers
+            for score, slot in sorted(zip(scores, slots), reverse=True):
+                if score < self.threshold:
+                    break
+                if NUMBER.findall(self._entries[slot][1]) == numbers:
+                    self._lru.move_to_end(slot)
+                    value = self._entries[slot][2]
+                    break
+        self.lookup_seconds.append(time.perf_counter() - start)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def add(self, params, value):
+        """Store a completion under its prompt's vector"""
+        prompt = single_prompt(params) if self.enabled else None
+        if prompt is None:
+            return
+        query = embed(prompt, self.dim)
+        if not query:
+            return
+        self._open()
+        if len(self._lru) < self.max_entries:
+            slot = next(slot for slot, entry in enumerate(self._entries) if entry is None)
+        else:
+            slot = next(iter(self._lru))
+            self._remove(slot)
+            self.evictions += 1
+
+        if numpy is not None:
+            row = self._matrix[slot]
+            row[:] = 0
+            for index, weight in query.items():
+                row[index] = weight
+        else:
+            base = slot * self.dim
+            self._buffer[base * 4:(base + self.dim) * 4] = bytes(self.dim * 4)
+            for index, weight in query.items():
+                self._floats[base + index] = weight
+
+        scope = scope_key(params)
+        expires_at = time.time() + self.ttl
+        self._index(slot, scope, prompt, value, expires_at)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (slot, scope, prompt, value, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (slot, scope, prompt, value, expires_at)
+            )
+
+    def _remove(self, slot):
+        scope = self._entries[slot][0]
+        self._entries[slot] = None
+        self._scopes[scope].discard(slot)
+        if not self._scopes[scope]:
+            del self._scopes[scope]
+        self._lru.pop(slot, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM entries WHERE slot = ?", (slot,))
+
+    def clear(self):
+        """Drop every entry"""
+        self._open()
+        for slot in list(self._lru):
+            self._remove(slot)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._lru) if self._pid == os.getpid() else 0,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "lookup_p50_ms": quantile(self.lookup_seconds, 0.5),
+            "lookup_p95_ms": quantile(self.lookup_seconds, 0.95),
+            "backend": "numpy" if numpy is not None else "python",
+            "disk": self.path
+        }
+
+semantic_cache = SemanticCache.from_env()
+stats.register("semantic_cache", semantic_cache.stats)
@@ -1,21 +1,51 @@
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 import sys
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+import json
+import time
+from providers import get_openai_client, openai_chat
+from results import CompletionOutput, completion_output, error_output
+from cache import cached_completion
+from batch import batch_item, run_batch, submit_openai_batch, openai_batch_results
+from singleflight import singleflight
+from tokens import fit_messages
+from sessions import session_store, UnknownSession
+from stats import server_stats
+from runner import serve
 
 mcp = FastMCP("chatgpt_server")
 
-# Initialize OpenAI client
-openai_client = None
-if os.getenv("OPENAI_API_KEY"):
-    openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def openai_params(messages, model, max_tokens, temperature):
+    """Build request parameters, filling unset values from the environment"""
+    return {
+        "model": model or os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),
+        "messages": messages,
+        "max_tokens": max_tokens or int(os.getenv("OPENAI_MAX_TOKENS", "1000")),
+        "temperature": temperature if temperature is not None else float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+    }
+
+async def chatgpt_completion(messages, model=None, max_tokens=None, temperature=None, force_cache=False, trim_policy=None, info=None):
+    """
+    Cached, context-budgeted ChatGPT completion for use by other tools
+    
+    Returns:
+        The reply text; raises instead of returning an error string.
+        A given info dict is filled as by openai_chat, unless cached.
+    """
+    openai_client = get_openai_client()
+    if not openai_client:
+        raise RuntimeError("OpenAI API key not configured")
+    params = openai_params(messages, model, max_tokens, temperature)
+    params["messages"] = fit_messages("openai", params, trim_policy)
+    return await cached_completion(
+        {"provider": "openai", **params},
+        lambda: openai_chat(openai_client, params, info=info),
+        force_cache
+    )
 
 @mcp.tool()
-async def chatgpt(prompt: str, model: str = None, max_tokens: int = None, temperature: float = None) -> str:
+@singleflight(unless=lambda args: args["stream"])
+async def chatgpt(prompt: str, model: str = None, max_tokens: int = None, temperature: float = None, stream: bool = False, force_cache: bool = False, ctx: Context = None) -> CompletionOutput:
     """
     Send a prompt to ChatGPT and get a response
     
@@ -24,35 +54,34 @@ async def chatgpt(prompt: str, model: str = None, max_tokens: int = None, temper
         model: The model to use (default: gpt-3.5-turbo)
         max_tokens: Maximum tokens in response (default: 1000)
         temperature: Response creativity (0.0-1.0, default: 0.7)
+        stream: Forward partial output as progress/log notifications while generating
+        force_cache: Use the response cache even when temperature > 0
     
     Returns:
-        ChatGPT's response as a string
+        ChatGPT's response as a string, or with STRUCTURED_OUTPUT the reply
+        text with its model, finish reason, token usage and latency
     """
+    started = time.perf_counter()
+    openai_client = get_openai_client()
     if not openai_client:
-        return "Error: OpenAI API key not configured. Please set OPENAI_API_KEY in your .env file."
+        return error_output("Error: OpenAI API key not configured. Please set OPENAI_API_KEY in your .env file.")
     
     try:
-        # Use defaults from environment or parameters
-        model = model or os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-        max_tokens = max_tokens or int(os.getenv("OPENAI_MAX_TOKENS", "1000"))
-        temperature = temperature or float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
-        
-        response = openai_client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=max_tokens,
-            temperature=temperature
+        params = openai_params([{"role": "user", "content": prompt}], model, max_tokens, temperature)
+        info = {}
+        text = await cached_completion(
+            {"provider": "openai", **params},
+            lambda: openai_chat(openai_client, params, stream, ctx, info),
+            force_cache
         )
-        
-        return response.choices[0].message.content
+        return completion_output(text, params, info, started)
         
     except Exception as e:
-        return f"Error calling ChatGPT: {str(e)}"
+        return error_output(f"Error calling ChatGPT: {str(e)}")
 
 @mcp.tool()
-async def chatgpt_conversation(messages: list, model: str = None, max_tokens: int = None, temperature: float = None) -> str:
+@singleflight()
+async def chatgpt_conversation(messages: list, model: str = None, max_tokens: int = None, temperature: float = None, force_cache: bool = False, trim_policy: str = None) -> CompletionOutput:
     """
     Send a conversation to ChatGPT with multiple messages
     
@@ -61,31 +90,153 @@ async def chatgpt_conversation(messages: list, model: str = None, max_tokens: in
         model: The model to use (default: gpt-3.5-turbo)
         max_tokens: Maximum tokens in response (default: 1000)
         temperature: Response creativity (0.0-1.0, default: 0.7)
+        force_cache: Use the response cache even when temperature > 0
+        trim_policy: How to shorten a history that exceeds the model's context:
+            drop_oldest, keep_last_k or summarize (default: drop_oldest)
     
     Returns:
-        ChatGPT's response as a string
+        ChatGPT's response as a string, or with STRUCTURED_OUTPUT the reply
+        text with its model, finish reason, token usage and latency
+    """
+    started = time.perf_counter()
+    if not get_openai_client():
+        return error_output("Error: OpenAI API key not configured. Please set OPENAI_API_KEY in your .env file.")
+    
+    try:
+        info = {}
+        text = await chatgpt_completion(messages, model, max_tokens, temperature, force_cache, trim_policy, info)
+        return completion_output(text, openai_params(messages, model, max_tokens, temperature), info, started)
+        
+    except Exception as e:
+        return error_output(f"Error calling ChatGPT: {str(e)}")
+
+@mcp.tool()
+async def chatgpt_batch(prompts: list, model: str = None, max_tokens: int = None, temperature: float = None, max_concurrency: int = None, offline: bool = False) -> str:
     """
+    Send many independent prompts to ChatGPT in one call
+    
+    Args:
+        prompts: List of prompt strings, or objects with 'prompt' and optional 'model', 'max_tokens' and 'temperature' overrides
+        model: The model to use for items without an override (default: gpt-3.5-turbo)
+        max_tokens: Maximum tokens per response (default: 1000)
+        temperature: Response creativity (0.0-1.0, default: 0.7)
+        max_concurrency: Prompts in flight at once (default: 8)
+        offline: Submit to the OpenAI Batch API instead and return its batch id
+    
+    Returns:
+        JSON list with one {"index", "text"} or {"index", "error"} object per prompt, in order,
+        or the batch id and status when offline
+    """
+    openai_client = get_openai_client()
     if not openai_client:
         return "Error: OpenAI API key not configured. Please set OPENAI_API_KEY in your .env file."
     
+    def item_params(item):
+        return openai_params(
+            [{"role": "user", "content": item["prompt"]}],
+            item.get("model", model),
+            item.get("max_tokens", max_tokens),
+            item.get("temperature", temperature)
+        )
+    
+    async def run_item(item):
+        params = item_params(item)
+        return await cached_completion({"provider": "openai", **params}, lambda: openai_chat(openai_client, params))
+    
     try:
-        # Use defaults from environment or parameters
-        model = model or os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-        max_tokens = max_tokens or int(os.getenv("OPENAI_MAX_TOKENS", "1000"))
-        temperature = temperature or float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+        if offline:
+            requests = [item_params(batch_item(item)) for item in prompts]
+            return json.dumps(await submit_openai_batch(openai_client, requests))
+        return json.dumps(await run_batch(prompts, run_item, max_concurrency))
         
-        response = openai_client.chat.completions.create(
-            model=model,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature
-        )
+    except Exception as e:
+        return f"Error calling ChatGPT: {str(e)}"
+
+@mcp.tool()
+async def chatgpt_batch_results(batch_id: str) -> str:
+    """
+    Get the status and results of an offline ChatGPT batch
+    
+    Args:
+        batch_id: The batch id returned by chatgpt_batch with offline=True
+    
+    Returns:
+        JSON object with the batch status, plus ordered results once it has completed
+    """
+    openai_client = get_openai_client()
+    if not openai_client:
+        return "Error: OpenAI API key not configured. Please set OPENAI_API_KEY in your .env file."
+    
+    try:
+        return json.dumps(await openai_batch_results(openai_client, batch_id))
         
-        return response.choices[0].message.content
+    except Exception as e:
+        return f"Error calling ChatGPT: {str(e)}"
+
+@mcp.tool()
+async def chatgpt_session_create(system: str = None) -> str:
+    """
+    Start a server-side ChatGPT conversation so later turns only send new messages
+    
+    Args:
+        system: Optional system prompt for the conversation
+    
+    Returns:
+        The session id to pass to chatgpt_session_append
+    """
+    return session_store.create(system)
+
+@mcp.tool()
+async def chatgpt_session_append(session_id: str, content: str, model: str = None, max_tokens: int = None, temperature: float = None) -> str:
+    """
+    Add a user message to a ChatGPT session and get the reply
+    
+    Args:
+        session_id: The id returned by chatgpt_session_create
+        content: The new user message
+        model: The model to use (default: gpt-3.5-turbo)
+        max_tokens: Maximum tokens in response (default: 1000)
+        temperature: Response creativity (0.0-1.0, default: 0.7)
+    
+    Returns:
+        ChatGPT's response as a string
+    """
+    openai_client = get_openai_client()
+    if not openai_client:
+        return "Error: OpenAI API key not configured. Please set OPENAI_API_KEY in your .env file."
+    
+    try:
+        async with session_store.lock(session_id):
+            session = session_store.get(session_id)
+            params = openai_params(session.messages() + [{"role": "user", "content": content}], model, max_tokens, temperature)
+            params["messages"] = fit_messages("openai", params)
+            reply = await openai_chat(openai_client, params)
+            # Only record the turn once it succeeded, so a retry doesn't duplicate it
+            session_store.record(session_id, session, [("user", content), ("assistant", reply)])
+        return reply
         
+    except UnknownSession:
+        return f"Error: Unknown or expired session {session_id}"
     except Exception as e:
         return f"Error calling ChatGPT: {str(e)}"
 
+@mcp.tool()
+async def chatgpt_session_close(session_id: str) -> str:
+    """
+    End a ChatGPT session and discard its history
+    
+    Args:
+        session_id: The id returned by chatgpt_session_create
+    
+    Returns:
+        Confirmation message
+    """
+    if session_store.close(session_id):
+        return f"Closed session {session_id}"
+    return f"Error: Unknown or expired session {session_id}"
+
+mcp.add_tool(server_stats)
+
 if __name__ == "__main__":
     print("🤖 ChatGPT MCP server starting...", file=sys.stderr)
-    mcp.run(transport="stdio")
+    serve(mcp)
@@ -1,21 +1,70 @@
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 import sys
 import os
-from anthropic import Anthropic
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+import json
+import time
+from providers import get_anthropic_client, anthropic_message
+from results import CompletionOutput, completion_output, error_output
+from cache import cached_completion
+from batch import batch_item, run_batch, submit_anthropic_batch, anthropic_batch_results
+from singleflight import singleflight
+from tokens import fit_messages
+from sessions import session_store, UnknownSession
+from stats import server_stats
+from runner import serve
 
 mcp = FastMCP("claude_server")
 
-# Initialize Anthropic client
-anthropic_client = None
-if os.getenv("ANTHROPIC_API_KEY"):
-    anthropic_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+def anthropic_params(messages, model, max_tokens, temperature, system=None):
+    """Build request parameters, filling unset values from the environment"""
+    params = {
+        "model": model or os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-20241022"),
+        "max_tokens": max_tokens or int(os.getenv("ANTHROPIC_MAX_TOKENS", "1000")),
+        "temperature": temperature if temperature is not None else float(os.getenv("ANTHROPIC_TEMPERATURE", "0.7")),
+        "messages": messages
+    }
+    if system:
+        params["system"] = system
+    return params
+
+def anthropic_conversation(messages):
+    """Split chat-style messages into Anthropic's system prompt and turns"""
+    system = []
+    turns = []
+    for msg in messages:
+        if msg["role"] == "system":
+            # Anthropic takes the system prompt as a separate parameter
+            system.append(msg["content"])
+        else:
+            turns.append({"role": msg["role"], "content": msg["content"]})
+    return "\n\n".join(system) or None, turns
+
+async def claude_completion(messages, model=None, max_tokens=None, temperature=None, force_cache=False, trim_policy=None, ctx=None, info=None):
+    """
+    Cached, context-budgeted Claude completion for use by other tools
+    
+    Args:
+        messages: Chat-style messages; system messages become the system prompt
+    
+    Returns:
+        The reply text; raises instead of returning an error string.
+        A given info dict is filled as by anthropic_message, unless cached.
+    """
+    anthropic_client = get_anthropic_client()
+    if not anthropic_client:
+        raise RuntimeError("Anthropic API key not configured")
+    params = anthropic_params(messages, model, max_tokens, temperature)
+    system, anthropic_messages = anthropic_conversation(fit_messages("anthropic", params, trim_policy))
+    params = anthropic_params(anthropic_messages, model, max_tokens, temperature, system)
+    return await cached_completion(
+        {"provider": "anthropic", **params},
+        lambda: anthropic_message(anthropic_client, params, ctx=ctx, info=info),
+        force_cache
+    )
 
 @mcp.tool()
-async def claude(prompt: str, model: str = None, max_tokens: int = None, temperature: float = None) -> str:
+@singleflight(unless=lambda args: args["stream"])
+async def claude(prompt: str, model: str = None, max_tokens: int = None, temperature: float = None, stream: bool = False, force_cache: bool = False, ctx: Context = None) -> CompletionOutput:
     """
     Send a prompt to Claude and get a response
     
@@ -24,77 +73,193 @@ async def claude(prompt: str, model: str = None, max_tokens: int = None, tempera
         model: The model to use (default: claude-3-5-sonnet-20241022)
         max_tokens: Maximum tokens in response (default: 1000)
         temperature: Response creativity (0.0-1.0, default: 0.7)
+        stream: Forward partial output as progress/log notifications while generating
+        force_cache: Use the response cache even when temperature > 0
     
     Returns:
-        Claude's response as a string
+        Claude's response as a string, or with STRUCTURED_OUTPUT the reply
+        text with its model, finish reason, token usage and latency
     """
+    started = time.perf_counter()
+    anthropic_client = get_anthropic_client()
     if not anthropic_client:
-        return "Error: Anthropic API key not configured. Please set ANTHROPIC_API_KEY in your .env file."
+        return error_output("Error: Anthropic API key not configured. Please set ANTHROPIC_API_KEY in your .env file.")
     
     try:
-        # Use defaults from environment or parameters
-        model = model or os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-20241022")
-        max_tokens = max_tokens or int(os.getenv("ANTHROPIC_MAX_TOKENS", "1000"))
-        temperature = temperature or float(os.getenv("ANTHROPIC_TEMPERATURE", "0.7"))
-        
-        response = anthropic_client.messages.create(
-            model=model,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
+        params = anthropic_params([{"role": "user", "content": prompt}], model, max_tokens, temperature)
+        info = {}
+        text = await cached_completion(
+            {"provider": "anthropic", **params},
+            lambda: anthropic_message(anthropic_client, params, stream, ctx, info),
+            force_cache
         )
-        
-        return response.content[0].text
+        return completion_output(text, params, info, started)
         
     except Exception as e:
-        return f"Error calling Claude: {str(e)}"
+        return error_output(f"Error calling Claude: {str(e)}")
 
 @mcp.tool()
-async def claude_conversation(messages: list, model: str = None, max_tokens: int = None, temperature: float = None) -> str:
+@singleflight()
+async def claude_conversation(messages: list, model: str = None, max_tokens: int = None, temperature: float = None, force_cache: bool = False, trim_policy: str = None, ctx: Context = None) -> CompletionOutput:
     """
     Send a conversation to Claude with multiple messages
     
+    System messages become Claude's system prompt, and the stable prefix of
+    the conversation is marked for Anthropic prompt caching.
+    
     Args:
         messages: List of message dictionaries with 'role' and 'content' keys
         model: The model to use (default: claude-3-5-sonnet-20241022)
         max_tokens: Maximum tokens in response (default: 1000)
         temperature: Response creativity (0.0-1.0, default: 0.7)
+        force_cache: Use the response cache even when temperature > 0
+        trim_policy: How to shorten a history that exceeds the model's context:
+            drop_oldest, keep_last_k or summarize (default: drop_oldest)
     
     Returns:
-        Claude's response as a string
+        Claude's response as a string, or with STRUCTURED_OUTPUT the reply
+        text with its model, finish reason, token usage and latency
+    """
+    started = time.perf_counter()
+    if not get_anthropic_client():
+        return error_output("Error: Anthropic API key not configured. Please set ANTHROPIC_API_KEY in your .env file.")
+    
+    try:
+        info = {}
+        text = await claude_completion(messages, model, max_tokens, temperature, force_cache, trim_policy, ctx, info)
+        return completion_output(text, anthropic_params(messages, model, max_tokens, temperature), info, started)
+        
+    except Exception as e:
+        return error_output(f"Error calling Claude: {str(e)}")
+
+@mcp.tool()
+async def claude_batch(prompts: list, model: str = None, max_tokens: int = None, temperature: float = None, max_concurrency: int = None, offline: bool = False) -> str:
     """
+    Send many independent prompts to Claude in one call
+    
+    Args:
+        prompts: List of prompt strings, or objects with 'prompt' and optional 'model', 'max_tokens' and 'temperature' overrides
+        model: The model to use for items without an override (default: claude-3-5-sonnet-20241022)
+        max_tokens: Maximum tokens per response (default: 1000)
+        temperature: Response creativity (0.0-1.0, default: 0.7)
+        max_concurrency: Prompts in flight at once (default: 8)
+        offline: Submit to the Anthropic Message Batches API instead and return its batch id
+    
+    Returns:
+        JSON list with one {"index", "text"} or {"index", "error"} object per prompt, in order,
+        or the batch id and status when offline
+    """
+    anthropic_client = get_anthropic_client()
     if not anthropic_client:
         return "Error: Anthropic API key not configured. Please set ANTHROPIC_API_KEY in your .env file."
     
+    def item_params(item):
+        return anthropic_params(
+            [{"role": "user", "content": item["prompt"]}],
+            item.get("model", model),
+            item.get("max_tokens", max_tokens),
+            item.get("temperature", temperature)
+        )
+    
+    async def run_item(item):
+        params = item_params(item)
+        return await cached_completion({"provider": "anthropic", **params}, lambda: anthropic_message(anthropic_client, params))
+    
     try:
-        # Use defaults from environment or parameters
-        model = model or os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-20241022")
-        max_tokens = max_tokens or int(os.getenv("ANTHROPIC_MAX_TOKENS", "1000"))
-        temperature = temperature or float(os.getenv("ANTHROPIC_TEMPERATURE", "0.7"))
-        
-        # Convert messages to Anthropic format
-        anthropic_messages = []
-        for msg in messages:
-            if msg["role"] != "system":  # Anthropic doesn't use system messages the same way
-                anthropic_messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
+        if offline:
+            requests = [item_params(batch_item(item)) for item in prompts]
+            return json.dumps(await submit_anthropic_batch(anthropic_client, requests))
+        return json.dumps(await run_batch(prompts, run_item, max_concurrency))
         
-        response = anthropic_client.messages.create(
-            model=model,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            messages=anthropic_messages
-        )
+    except Exception as e:
+        return f"Error calling Claude: {str(e)}"
+
+@mcp.tool()
+async def claude_batch_results(batch_id: str) -> str:
+    """
+    Get the status and results of an offline Claude batch
+    
+    Args:
+        batch_id: The batch id returned by claude_batch with offline=True
+    
+    Returns:
+        JSON object with the batch status, plus ordered results once it has ended
+    """
+    anthropic_client = get_anthropic_client()
+    if not anthropic_client:
+        return "Error: Anthropic API key not configured. Please set ANTHROPIC_API_KEY in your .env file."
+    
+    try:
+        return json.dumps(await anthropic_batch_results(anthropic_client, batch_id))
         
-        return response.content[0].text
+    except Exception as e:
+        return f"Error calling Claude: {str(e)}"
+
+@mcp.tool()
+async def claude_session_create(system: str = None) -> str:
+    """
+    Start a server-side Claude conversation so later turns only send new messages
+    
+    Args:
+        system: Optional system prompt for the conversation
+    
+    Returns:
+        The session id to pass to claude_session_append
+    """
+    return session_store.create(system)
+
+@mcp.tool()
+async def claude_session_append(session_id: str, content: str, model: str = None, max_tokens: int = None, temperature: float = None, ctx: Context = None) -> str:
+    """
+    Add a user message to a Claude session and get the reply
+    
+    Args:
+        session_id: The id returned by claude_session_create
+        content: The new user message
+        model: The model to use (default: claude-3-5-sonnet-20241022)
+        max_tokens: Maximum tokens in response (default: 1000)
+        temperature: Response creativity (0.0-1.0, default: 0.7)
+    
+    Returns:
+        Claude's response as a string
+    """
+    anthropic_client = get_anthropic_client()
+    if not anthropic_client:
+        return "Error: Anthropic API key not configured. Please set ANTHROPIC_API_KEY in your .env file."
+    
+    try:
+        async with session_store.lock(session_id):
+            session = session_store.get(session_id)
+            params = anthropic_params(session.messages() + [{"role": "user", "content": content}], model, max_tokens, temperature)
+            system, messages = anthropic_conversation(fit_messages("anthropic", params))
+            params = anthropic_params(messages, model, max_tokens, temperature, system)
+            reply = await anthropic_message(anthropic_client, params, ctx=ctx)
+            # Only record the turn once it succeeded, so a retry doesn't duplicate it
+            session_store.record(session_id, session, [("user", content), ("assistant", reply)])
+        return reply
         
+    except UnknownSession:
+        return f"Error: Unknown or expired session {session_id}"
     except Exception as e:
         return f"Error calling Claude: {str(e)}"
 
+@mcp.tool()
+async def claude_session_close(session_id: str) -> str:
+    """
+    End a Claude session and discard its history
+    
+    Args:
+        session_id: The id returned by claude_session_create
+    
+    Returns:
+        Confirmation message
+    """
+    if session_store.close(session_id):
+        return f"Closed session {session_id}"
+    return f"Error: Unknown or expired session {session_id}"
+
+mcp.add_tool(server_stats)
+
 if __name__ == "__main__":
     print("🧠 Claude MCP server starting...", file=sys.stderr)
-    mcp.run(transport="stdio")
+    serve(mcp)
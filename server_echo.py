@@ -1,5 +1,6 @@
 from mcp.server.fastmcp import FastMCP
 import sys
+from runner import serve
 
 mcp = FastMCP("echo_server")
 
@@ -25,4 +26,4 @@ async def lowercase(text: str) -> str:
 
 if __name__ == "__main__":
     print("📢 Echo MCP server starting...", file=sys.stderr)
-    mcp.run(transport="stdio")
+    serve(mcp)
@@ -1,16 +1,67 @@
 from mcp.server.fastmcp import FastMCP
 import sys
-import requests
+import httpx
+import json
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from providers import get_http_client
+from results import STRUCTURED_OUTPUT, NewsOutput, error_output
+from cache import ResponseCache
+from singleflight import singleflight
+from stats import server_stats
+import stats
+from runner import serve
 
 mcp = FastMCP("news_server")
 
+# Headlines change on a minutes scale, so a short TTL removes most upstream calls
+news_cache = ResponseCache.from_env("NEWS_CACHE", ttl=120)
+stats.register("news_cache", news_cache.stats)
+
+class NewsAPIError(Exception):
+    """NewsAPI answered with a non-ok status"""
+
+async def fetch_articles(category, limit, api_key):
+    """Fetch headlines from NewsAPI as a JSON list of article records"""
+    params = {
+        "country": "us",
+        "category": category,
+        "pageSize": limit,
+        "apiKey": api_key
+    }
+    
+    response = await get_http_client().get(
+        os.getenv("NEWS_API_URL", "https://newsapi.org/v2/top-headlines"),
+        params=params,
+        timeout=httpx.Timeout(
+            float(os.getenv("NEWS_READ_TIMEOUT", "10")),
+            connect=float(os.getenv("NEWS_CONNECT_TIMEOUT", "5"))
+        )
+    )
+    data = response.json()
+    
+    if data["status"] != "ok":
+        raise NewsAPIError(data.get("message", "Unknown error"))
+    
+    # Cached as JSON text so the cache's byte accounting and disk tier still apply
+    return json.dumps([
+        {
+            "title": article["title"],
+            "source": article["source"]["name"],
+            "url": article.get("url"),
+            "published_at": article.get("publishedAt")
+        }
+        for article in data["articles"]
+    ])
+
+def format_news(category, articles):
+    """Headlines as the numbered text list the tool has always returned"""
+    lines = [f"📰 Today's {category} news:\n"]
+    lines.extend(f"{i}. {article['title']} ({article['source']})" for i, article in enumerate(articles, 1))
+    return "\n".join(lines) + "\n"
+
 @mcp.tool()
-async def get_news(category: str = "general", limit: int = 5) -> str:
+@singleflight()
+async def get_news(category: str = "general", limit: int = 5) -> NewsOutput:
     """
     Get today's news headlines
     
@@ -19,41 +70,30 @@ async def get_news(category: str = "general", limit: int = 5) -> str:
         limit: Number of articles to return (default: 5)
     
     Returns:
-        Today's news headlines
+        Today's news headlines, or with STRUCTURED_OUTPUT the category and
+        a list of article records
     """
+    # Using NewsAPI (free tier available)
+    api_key = os.getenv("NEWS_API_KEY")
+    if not api_key:
+        return error_output("Error: NEWS_API_KEY not configured. Please set NEWS_API_KEY in your .env file.")
+
     try:
-        # Using NewsAPI (free tier available)
-        url = "https://newsapi.org/v2/top-headlines"
-        api_key = os.getenv("NEWS_API_KEY")
-        if not api_key:
-            return "Error: NEWS_API_KEY not configured. Please set NEWS_API_KEY in your .env file."
-        
-        params = {
-            "country": "us",
-            "category": category,
-            "pageSize": limit,
-            "apiKey": api_key
-        }
+        # Concurrent callers for the same category share one upstream request
+        key = news_cache.make_key({"category": category, "limit": limit})
+        articles = json.loads(await news_cache.get_or_fetch(key, lambda: fetch_articles(category, limit, api_key)))
         
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if data["status"] == "ok":
-            articles = data["articles"]
-            news_text = f"📰 Today's {category} news:\n\n"
-            
-            for i, article in enumerate(articles, 1):
-                title = article["title"]
-                source = article["source"]["name"]
-                news_text += f"{i}. {title} ({source})\n"
-            
-            return news_text
-        else:
-            return f"Error fetching news: {data.get('message', 'Unknown error')}"
-            
+    except NewsAPIError as e:
+        return error_output(f"Error fetching news: {str(e)}")
     except Exception as e:
-        return f"Error: {str(e)}"
+        return error_output(f"Error: {str(e)}")
+    
+    if STRUCTURED_OUTPUT:
+        return {"category": category, "articles": articles}
+    return format_news(category, articles)
+
+mcp.add_tool(server_stats)
 
 if __name__ == "__main__":
     print("📰 News MCP server starting...", file=sys.stderr)
-    mcp.run(transport="stdio")
+    serve(mcp)
@@ -0,0 +1,80 @@
+from mcp.server.fastmcp import FastMCP, Context
+import sys
+import os
+from server_chatgpt import chatgpt_completion
+from server_claude import claude_completion
+from providers import log_to_client
+from routing import route, AllProvidersFailed
+from latency import pick_models, prompt_tokens
+from stats import server_stats
+from runner import serve
+
+mcp = FastMCP("router_server")
+
+# Provider name -> completion function of its server module
+PROVIDERS = {
+    "openai": chatgpt_completion,
+    "anthropic": claude_completion
+}
+
+def parse_target(target):
+    """Split 'provider' or 'provider:model' into (provider, model)"""
+    provider, _, model = target.partition(":")
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown provider {provider!r}. Available: {', '.join(PROVIDERS)}")
+    return provider, model or None
+
+@mcp.tool()
+async def route_prompt(prompt: str, providers: list = None, hedge: bool = False, tier: str = None, latency_budget_ms: int = None, system: str = None, max_tokens: int = None, temperature: float = None, ctx: Context = None) -> str:
+    """
+    Send a prompt to the first healthy provider, failing over to the next on errors
+    
+    With a tier or latency budget instead of a provider list, the model is
+    chosen from recent latency measurements for prompts of this length.
+
+    Args:
+        prompt: The text prompt to send
+        providers: Ordered provider list, each 'openai' or 'anthropic' with an optional
+            ':model' suffix (default: ROUTER_PROVIDERS or openai,anthropic)
+        hedge: Also start the next provider when the current one is slower than its
+            recent p95 latency, and return whichever answers first
+        tier: 'fast' (lowest expected latency), 'balanced' or 'best' (strongest model),
+            choosing among ROUTER_MODELS when no providers are given
+        latency_budget_ms: Use the cheapest model expected to answer within this
+            many milliseconds, when no providers are given
+        system: Optional system prompt
+        max_tokens: Maximum tokens in response (default: each provider's default)
+        temperature: Response creativity (0.0-1.0, default: each provider's default)
+
+    Returns:
+        The first successful response as a string
+    """
+    try:
+        messages = ([{"role": "system", "content": system}] if system else []) + [{"role": "user", "content": prompt}]
+        if providers:
+            targets = providers
+        elif tier or latency_budget_ms:
+            targets = pick_models(prompt_tokens({"messages": messages}), tier, latency_budget_ms)
+        else:
+            targets = os.getenv("ROUTER_PROVIDERS", "openai,anthropic").split(",")
+        calls = {}
+        for target in targets:
+            provider, model = parse_target(target.strip())
+            calls[target.strip()] = lambda complete=PROVIDERS[provider], model=model: complete(
+                messages, model, max_tokens, temperature
+            )
+
+        winner, reply = await route(calls, hedge)
+        await log_to_client(ctx, "info", f"answered by {winner}", logger_name="router")
+        return reply
+
+    except AllProvidersFailed as e:
+        return f"Error: all providers failed ({str(e)})"
+    except Exception as e:
+        return f"Error routing prompt: {str(e)}"
+
+mcp.add_tool(server_stats)
+
+if __name__ == "__main__":
+    print("🔀 Router MCP server starting...", file=sys.stderr)
+    serve(mcp)
@@ -0,0 +1,268 @@
+"""
+Server-side conversation sessions for the ChatGPT and Claude tools
+
+A session holds a conversation's history so clients only send the new turn.
+History is stored compactly as (role, content) tuples, capped by message
+count and size (oldest turns are dropped first, the system prompt is kept),
+and sessions idle longer than a timeout are evicted from memory, or spilled
+to SQLite when SESSION_STORE_PATH is set and reloaded on their next use.
+In multi-worker mode every session lives in the shared SQLite file instead,
+so any worker can continue any conversation. Rows on disk expire once they
+have not been written for the idle timeout. Each row carries a version, and
+a worker saves a turn only if the version is still the one it read. Turns
+that two workers add to one session at the same time are therefore both
+kept, the later one re-applied on top of the earlier.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+
+import stats
+
+class UnknownSession(KeyError):
+    """No open session has this id"""
+
+class Session:
+    """One conversation: an optional system prompt and its turns"""
+
+    __slots__ = ("system", "turns", "size", "last_used", "version")
+
+    def __init__(self, system=None, turns=(), version=0):
+        self.system = system
+        self.turns = list(turns)  # [(role, content), ...]
+        self.size = len(system or "") + sum(len(content) for _, content in self.turns)
+        self.last_used = time.monotonic()
+        # Version of the SQLite row this was loaded from (shared mode)
+        self.version = version
+
+    def messages(self):
+        """History in chat-completions message format"""
+        history = [{"role": "system", "content": self.system}] if self.system else []
+        history.extend({"role": role, "content": content} for role, content in self.turns)
+        return history
+
+    def to_json(self):
+        return json.dumps({"system": self.system, "turns": self.turns})
+
+    @classmethod
+    def from_json(cls, data, version=0):
+        data = json.loads(data)
+        return cls(data["system"], [tuple(turn) for turn in data["turns"]], version)
+
+class SessionStore:
+    """Bounded in-memory session store with idle eviction and optional disk spill"""
+
+    def __init__(self, max_messages=200, max_bytes=256 * 1024, idle_timeout=3600.0, max_sessions=1000, path=None):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.path = path
+        # Keep every session on disk so forked workers see each other's turns
+        self.shared = False
+        self._sessions = OrderedDict()  # id -> Session, least recently used first
+        self._db = None
+        self._db_pid = None
+        self._locks = weakref.WeakValueDictionary()
+        self.counts = {"created": 0, "closed": 0, "evicted": 0, "spilled": 0, "reloaded": 0, "trimmed": 0,
+                       "expired": 0, "conflicts": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_messages=int(os.getenv("SESSION_MAX_MESSAGES", "200")),
+            max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024))),
+            idle_timeout=float(os.getenv("SESSION_IDLE_TIMEOUT", "3600")),
+            max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", "1000")),
+            path=os.getenv("SESSION_STORE_PATH") or None
+        )
+
+    @property
+    def db(self):
+        """SQLite connection for spilled sessions (reopened after fork)"""
+        if not self.path:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            self._db_pid = os.getpid()
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, "
+                "version INTEGER NOT NULL DEFAULT 0, last_used REAL NOT NULL DEFAULT 0)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(sessions)")}
+            if "last_used" not in columns:
+                # Files from before expiry: give their rows a full timeout from now
+                self._db.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+                self._db.execute("ALTER TABLE sessions ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+                self._db.execute("UPDATE sessions SET last_used = ?", (time.time(),))
+            self._db.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)")
+        return self._db
+
+    def share_on_disk(self, path):
+        """Store sessions only in the SQLite file at path (multi-worker mode)"""
+        if not self.path:
+            self.path = path
+        self.shared = True
+
+    def lock(self, session_id):
+        """
+        Lock serializing turns within one session in this process
+
+        Other worker processes are not blocked; record() reconciles their turns.
+        """
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    def create(self, system=None):
+        """Open a new session and return its id"""
+        self._evict_idle()
+        session_id = uuid.uuid4().hex
+        session = Session(system or None)
+        self.counts["created"] += 1
+        if self.shared:
+            self._write(session_id, session)
+            return session_id
+        self._sessions[session_id] = session
+        self._evict_overflow()
+        return session_id
+
+    def get(self, session_id):
+        """Return an open session, reloading it from disk if it was spilled"""
+        if self.shared:
+            self._evict_idle()
+            row = self.db.execute("SELECT data, version FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                raise UnknownSession(session_id)
+            return Session.from_json(*row)
+        session = self._sessions.get(session_id)
+        if session is None and self.db is not None:
+            row = self.db.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is not None:
+                session = Session.from_json(row[0])
+                self.db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self._sessions[session_id] = session
+                self.counts["reloaded"] += 1
+        if session is None:
+            raise UnknownSession(session_id)
+        self._sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        self._evict_idle()
+        return session
+
+    def append(self, session, role, content):
+        """Add a turn and trim the oldest turns to stay within the caps"""
+        session.turns.append((role, content))
+        session.size += len(content)
+        trimmed = False
+        while session.turns and (len(session.turns) > self.max_messages or session.size > self.max_bytes):
+            _, dropped = session.turns.pop(0)
+            session.size -= len(dropped)
+            trimmed = True
+        # A conversation must still start with a user turn after trimming
+        while session.turns and session.turns[0][0] != "user":
+            _, dropped = session.turns.pop(0)
+            session.size -= len(dropped)
+            trimmed = True
+        if trimmed:
+            self.counts["trimmed"] += 1
+
+    def save(self, session_id, session):
+        """
+        Persist a session after a turn (only needed in multi-worker mode)
+
+        Returns False, writing nothing, if another worker saved the session
+        since it was loaded.
+        """
+        if not self.shared:
+            return True
+        written = self.db.execute(
+            "UPDATE sessions SET data = ?, version = version + 1, last_used = ? WHERE id = ? AND version = ?",
+            (session.to_json(), time.time(), session_id, session.version)
+        ).rowcount
+        if not written:
+            return False
+        session.version += 1
+        return True
+
+    def record(self, session_id, session, turns):
+        """
+        Append a finished exchange of (role, content) turns and persist it
+
+        If another worker saved the session in the meantime, the turns are
+        appended to its newer history instead, so neither exchange is lost.
+        Raises UnknownSession if the session was closed or expired meanwhile.
+        """
+        while True:
+            for role, content in turns:
+                self.append(session, role, content)
+            if self.save(session_id, session):
+                return session
+            self.counts["conflicts"] += 1
+            session = self.get(session_id)
+
+    def _write(self, session_id, session):
+        self.db.execute(
+            "INSERT OR REPLACE INTO sessions (id, data, version, last_used) VALUES (?, ?, ?, ?)",
+            (session_id, session.to_json(), session.version, time.time())
+        )
+
+    def close(self, session_id):
+        """Discard a session; returns False if it did not exist"""
+        found = self._sessions.pop(session_id, None) is not None
+        if self.db is not None:
+            found = self.db.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0 or found
+        if found:
+            self.counts["closed"] += 1
+        return found
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff:
+                break
+            self._evict(session_id)
+        if self.db is not None:
+            # Rows not written for the idle timeout: spilled sessions nobody came back to,
+            # and abandoned sessions in shared mode
+            self.counts["expired"] += self.db.execute(
+                "DELETE FROM sessions WHERE last_used < ?", (time.time() - self.idle_timeout,)
+            ).rowcount
+
+    def _evict_overflow(self):
+        while len(self._sessions) > self.max_sessions:
+            self._evict(next(iter(self._sessions)))
+
+    def _evict(self, session_id):
+        session = self._sessions.pop(session_id)
+        if self.db is not None:
+            self._write(session_id, session)
+            self.counts["spilled"] += 1
+        else:
+            self.counts["evicted"] += 1
+
+    def stats(self):
+        return {
+            **self.counts,
+            "open": len(self._sessions),
+            "bytes": sum(session.size for session in self._sessions.values()),
+            "disk": self.path
+        }
+
+# Sessions shared by the chatgpt_session_* and claude_session_* tools
+session_store = SessionStore.from_env()
+stats.register("sessions", session_store.stats)
+
+def share_on_disk(directory):
+    """Keep sessions in directory so every worker process can serve them"""
+    os.makedirs(directory, exist_ok=True)
+    session_store.share_on_disk(os.path.join(directory, "sessions.db"))
@@ -0,0 +1,73 @@
+"""
+Single-flight coalescing for concurrent duplicate tool calls
+
+Decorate a tool function with @singleflight() (below @mcp.tool()) to opt it
+in. While a call is running, further calls with identical arguments await
+the same execution and all receive its result or exception.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import os
+
+from mcp.server.fastmcp import Context
+
+import stats
+from tracing import span
+
+_pending = {}  # (tool, arguments) -> in-flight task
+_counters = {}  # tool -> {"calls": n, "coalesced": n}
+
+def singleflight(unless=None):
+    """
+    Coalesce concurrent calls with identical arguments into one execution
+
+    Args:
+        unless: Optional predicate on the bound arguments; calls for which it
+            returns True always run on their own (e.g. streamed calls, whose
+            followers would otherwise miss the partial output)
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        name = fn.__name__
+        counters = _counters.setdefault(name, {"calls": 0, "coalesced": 0})
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            counters["calls"] += 1
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                key: value for key, value in bound.arguments.items()
+                if not isinstance(value, Context)
+            }
+            if os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() != "true" or (unless and unless(arguments)):
+                return await fn(*args, **kwargs)
+
+            key = (name, json.dumps(arguments, sort_keys=True, default=str))
+            with span("singleflight", tool=name) as flight:
+                task = _pending.get(key)
+                if task is None:
+                    task = asyncio.ensure_future(fn(*args, **kwargs))
+                    _pending[key] = task
+                    task.add_done_callback(lambda _: _pending.pop(key, None))
+                else:
+                    counters["coalesced"] += 1
+                    flight.set("coalesced", True)
+                # Shield so a cancelled caller does not cancel the call for the others
+                return await asyncio.shield(task)
+
+        return wrapper
+    return decorator
+
+def singleflight_stats():
+    """Per-tool call and coalesced-call counts"""
+    return {
+        "in_flight": len(_pending),
+        "tools": {name: dict(counts) for name, counts in _counters.items()},
+        "coalesced": sum(counts["coalesced"] for counts in _counters.values())
+    }
+
+stats.register("singleflight", singleflight_stats)
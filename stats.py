@@ -0,0 +1,27 @@
+"""
+Runtime statistics shared by the MCP servers
+
+Components register a collector function; the server_stats tool reports a
+snapshot of all of them.
+"""
+
+import json
+
+_collectors = {}
+
+def register(name, collect):
+    """Register a zero-argument function returning a JSON-serializable dict"""
+    _collectors[name] = collect
+
+def snapshot():
+    """Collect the current statistics from every registered component"""
+    return {name: collect() for name, collect in _collectors.items()}
+
+async def server_stats() -> str:
+    """
+    Report runtime statistics for this server
+
+    Returns:
+        JSON object with cache hit/miss counters and other runtime counters
+    """
+    return json.dumps(snapshot(), indent=2)
@@ -0,0 +1,273 @@
+"""
+Accelerated stdio transport for the MCP servers
+
+The SDK's stdio transport reads stdin one line at a time and writes and
+flushes stdout once per message, each through a worker thread, and the
+low-level server recompiles a tool's JSON schema on every call to validate
+its result. For small, frequent calls (the echo tools) that overhead costs
+far more than the tool itself. This transport instead:
+
+    - reads stdin in 64 KiB blocks and splits them into messages itself
+    - writes every response that is ready in one write and flush
+    - decodes and encodes with orjson when it is installed
+    - compiles each tool schema's validator once and reuses it
+    - at end of input, waits for the requests still running to be answered
+      (up to DRAIN_TIMEOUT seconds) instead of dropping their responses
+
+It also accepts JSON-RPC batches: a line holding an array of requests
+(typically many tools/call) whose requests run concurrently and are answered
+with one array of responses, in request order, once all of them are done.
+Items that aren't valid requests get their own error response in the array;
+an empty batch gets a single Invalid Request error.
+
+Messages and errors are the same as with the SDK transport. Enable it with
+--fast-codec or MCP_FAST_CODEC=true; it only applies to --transport stdio.
+"""
+
+import json
+import sys
+from contextlib import asynccontextmanager
+
+import anyio
+import anyio.lowlevel
+import anyio.to_thread
+import jsonschema
+import mcp.types as types
+from jsonschema.exceptions import best_match
+from mcp.server.lowlevel import server as lowlevel_server
+from mcp.shared.message import SessionMessage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+READ_SIZE = 64 * 1024
+DRAIN_TIMEOUT = 30.0
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def decode_message(line):
+    """Parse one JSON-RPC message line"""
+    if orjson is not None:
+        return types.JSONRPCMessage.model_validate(orjson.loads(line))
+    return types.JSONRPCMessage.model_validate_json(line)
+
+def dump_message(message):
+    """Serialize one JSON-RPC message as UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(message.model_dump(by_alias=True, exclude_none=True, mode="json"))
+    return message.model_dump_json(by_alias=True, exclude_none=True).encode("utf-8")
+
+def encode_message(message):
+    """Serialize one JSON-RPC message as a newline-terminated UTF-8 line"""
+    return dump_message(message) + b"\n"
+
+def error_item(request_id, message):
+    """An Invalid Request error response for one batch item"""
+    if not isinstance(request_id, (str, int)) or isinstance(request_id, bool):
+        request_id = None
+    return dumps({"jsonrpc": "2.0", "id": request_id, "error": {"code": types.INVALID_REQUEST, "message": message}})
+
+def split_lines(buffer):
+    """Remove and return the complete lines at the start of a bytearray"""
+    end = buffer.rfind(b"\n")
+    if end < 0:
+        return []
+    lines = bytes(buffer[:end]).split(b"\n")
+    del buffer[:end + 1]
+    return [line for line in lines if line.strip()]
+
+class Batch:
+    """The responses to one JSON-RPC batch, collected in request order"""
+
+    def __init__(self):
+        self.items = []  # serialized responses, None where one is still due
+        self.pending = {}  # request id -> index in items
+
+    def expect(self, request_id):
+        self.pending[request_id] = len(self.items)
+        self.items.append(None)
+
+    def add(self, item):
+        self.items.append(item)
+
+    def answer(self, request_id, item):
+        self.items[self.pending.pop(request_id)] = item
+
+    @property
+    def done(self):
+        return not self.pending
+
+    def encode(self):
+        return b"[" + b",".join(self.items) + b"]\n"
+
+class CachedValidators:
+    """
+    Stand-in for the jsonschema module in the low-level MCP server
+
+    jsonschema.validate checks and compiles the schema on every call; this
+    does it once per distinct schema and raises the same best-match error.
+    """
+
+    ValidationError = jsonschema.ValidationError
+
+    def __init__(self, max_schemas=1024):
+        self.max_schemas = max_schemas
+        self._validators = {}
+
+    def validator(self, schema):
+        # Tool listings rebuild the schema dicts, so key on their content
+        key = json.dumps(schema, sort_keys=True, default=str)
+        validator = self._validators.get(key)
+        if validator is None:
+            cls = jsonschema.validators.validator_for(schema)
+            cls.check_schema(schema)
+            if len(self._validators) >= self.max_schemas:
+                self._validators.clear()
+            validator = self._validators[key] = cls(schema)
+        return validator
+
+    def validate(self, instance, schema):
+        error = best_match(self.validator(schema).iter_errors(instance))
+        if error is not None:
+            raise error
+
+def install_validator_cache():
+    """Have the low-level server validate tool input and output with cached validators"""
+    if not isinstance(lowlevel_server.jsonschema, CachedValidators):
+        lowlevel_server.jsonschema = CachedValidators()
+
+def write_all(stdout, data):
+    stdout.write(data)
+    stdout.flush()
+
+@asynccontextmanager
+async def fast_stdio_server(stdin=None, stdout=None):
+    """
+    Server transport over binary stdin/stdout, used like mcp.server.stdio.stdio_server
+
+    Yields the (read_stream, write_stream) pair the low-level server runs on.
+    """
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+    unanswered = set()  # ids of requests read but not yet answered
+    batches = {}  # request id -> the Batch its response belongs to
+    drained = None  # set once unanswered empties after end of input
+    write_lock = anyio.Lock()
+
+    async def output(data):
+        async with write_lock:
+            await anyio.to_thread.run_sync(write_all, stdout, data)
+
+    async def deliver(line):
+        try:
+            if line.lstrip().startswith(b"["):
+                return await deliver_batch(loads(line))
+            message = decode_message(line)
+        except Exception as exc:
+            await read_stream_writer.send(exc)
+            return
+        if isinstance(message.root, types.JSONRPCRequest):
+            unanswered.add(message.root.id)
+        await read_stream_writer.send(SessionMessage(message))
+
+    async def deliver_batch(items):
+        if not items:
+            # JSON-RPC answers an empty batch with a single error, not an array
+            await output(error_item(None, "Empty batch") + b"\n")
+            return
+        batch = Batch()
+        messages = []
+        for item in items:
+            try:
+                message = types.JSONRPCMessage.model_validate(item)
+            except Exception:
+                batch.add(error_item(item.get("id") if isinstance(item, dict) else None, "Invalid request"))
+                continue
+            if isinstance(message.root, types.JSONRPCRequest):
+                request_id = message.root.id
+                if request_id in unanswered:
+                    batch.add(error_item(request_id, "Duplicate request id"))
+                    continue
+                unanswered.add(request_id)
+                batches[request_id] = batch
+                batch.expect(request_id)
+            messages.append(message)
+        if batch.items and batch.done:
+            await output(batch.encode())
+        # The server handles each message in its own task, so the requests run concurrently
+        for message in messages:
+            await read_stream_writer.send(SessionMessage(message))
+
+    def encode(message):
+        if isinstance(message.root, (types.JSONRPCResponse, types.JSONRPCError)):
+            unanswered.discard(message.root.id)
+            if drained is not None and not unanswered:
+                drained.set()
+            batch = batches.pop(message.root.id, None)
+            if batch is not None:
+                batch.answer(message.root.id, dump_message(message))
+                return batch.encode() if batch.done else b""
+        return encode_message(message)
+
+    async def stdin_reader():
+        nonlocal drained
+        buffer = bytearray()
+        try:
+            async with read_stream_writer:
+                while True:
+                    chunk = await anyio.to_thread.run_sync(stdin.read1, READ_SIZE, abandon_on_cancel=True)
+                    if not chunk:
+                        break
+                    buffer += chunk
+                    for line in split_lines(buffer):
+                        await deliver(line)
+                if buffer.strip():
+                    # A last message without a trailing newline
+                    await deliver(bytes(buffer))
+                if unanswered:
+                    # Closing the read stream ends the session, cancelling what is still running
+                    drained = anyio.Event()
+                    with anyio.move_on_after(DRAIN_TIMEOUT):
+                        await drained.wait()
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async def stdout_writer():
+        try:
+            async with write_stream_reader:
+                async for session_message in write_stream_reader:
+                    chunks = [encode(session_message.message)]
+                    # Responses finished in the meantime go out in the same write
+                    while True:
+                        try:
+                            chunks.append(encode(write_stream_reader.receive_nowait().message))
+                        except (anyio.WouldBlock, anyio.EndOfStream):
+                            break
+                    data = b"".join(chunks)
+                    if data:
+                        await output(data)
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(stdin_reader)
+        tg.start_soon(stdout_writer)
+        yield read_stream, write_stream
+
+async def run_stdio(mcp):
+    """Serve a FastMCP server over the accelerated stdio transport"""
+    install_validator_cache()
+    server = mcp._mcp_server
+    async with fast_stdio_server() as (read_stream, write_stream):
+        await server.run(read_stream, write_stream, server.create_initialization_options())
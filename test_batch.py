@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for the chatgpt_batch and claude_batch tools
+"""
+
+import asyncio
+import json
+import time
+
+import providers
+import server_chatgpt
+import server_claude
+from batch import run_batch
+from mock_providers import start_mock_providers, DEFAULT_LATENCY
+
+def test_run_batch_order_errors_and_bound():
+    """Results keep input order, failures stay per item, parallelism is bounded"""
+    in_flight = []
+    peak = []
+
+    async def run_item(item):
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01 * (5 - len(item["prompt"]) % 5))
+        in_flight.pop()
+        if item["prompt"] == "bad":
+            raise RuntimeError("upstream failed")
+        return item["prompt"].upper()
+
+    items = ["a", "bb", "bad", {"prompt": "ccc", "model": "m"}, 42, "dddd"]
+    results = asyncio.run(run_batch(items, run_item, max_concurrency=2))
+    assert [r["index"] for r in results] == list(range(6))
+    assert [r.get("text") for r in results] == ["A", "BB", None, "CCC", None, "DDDD"]
+    assert results[2]["error"] == "upstream failed"
+    assert "prompt" in results[4]["error"]
+    assert max(peak) <= 2
+
+def check_batch_tool(mcp, tool):
+    prompts = [f"ping {i}" for i in range(10)] + [{"prompt": "override", "max_tokens": 5}]
+
+    async def run():
+        try:
+            # Import the SDKs and build the clients before timing
+            providers.get_openai_client()
+            providers.get_anthropic_client()
+            start = time.perf_counter()
+            content, _ = await mcp.call_tool(tool, {"prompts": prompts, "max_concurrency": 11})
+            return time.perf_counter() - start, json.loads(content[0].text)
+        finally:
+            await providers.aclose_clients()
+
+    elapsed, results = asyncio.run(run())
+    print(f"{tool}: {len(prompts)} prompts in {elapsed:.2f}s")
+    assert [r["text"] for r in results] == [f"pong: ping {i}" for i in range(10)] + ["pong: override"]
+    # One round trip's worth of latency, not one per prompt
+    assert elapsed < DEFAULT_LATENCY * 3
+
+def test_chatgpt_batch():
+    """chatgpt_batch fans prompts out concurrently and returns them in order"""
+    server = start_mock_providers()
+    try:
+        check_batch_tool(server_chatgpt.mcp, "chatgpt_batch")
+    finally:
+        server.should_exit = True
+
+def test_claude_batch():
+    """claude_batch fans prompts out concurrently and returns them in order"""
+    server = start_mock_providers()
+    try:
+        check_batch_tool(server_claude.mcp, "claude_batch")
+    finally:
+        server.should_exit = True
+
+if __name__ == "__main__":
+    print("Batch Tool Test Suite")
+    print("=" * 50)
+
+    test_run_batch_order_errors_and_bound()
+    test_chatgpt_batch()
+    test_claude_batch()
+
+    print("\nTest suite completed!")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Tests for the LLM response cache
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import cache
+import stats
+from cache import ResponseCache, cached_completion
+
+def test_key_is_canonical():
+    """Parameter order does not change the cache key"""
+    a = ResponseCache.make_key({"model": "m", "temperature": 0, "messages": [{"role": "user", "content": "hi"}]})
+    b = ResponseCache.make_key({"messages": [{"content": "hi", "role": "user"}], "temperature": 0, "model": "m"})
+    c = ResponseCache.make_key({"model": "m", "temperature": 0, "messages": [{"role": "user", "content": "bye"}]})
+    assert a == b
+    assert a != c
+
+def test_lru_eviction_by_entries():
+    """The least recently used entry is evicted first"""
+    c = ResponseCache(max_entries=2)
+    c.set("a", "1")
+    c.set("b", "2")
+    assert c.get("a") == "1"
+    c.set("c", "3")
+    assert c.get("b") is None
+    assert c.get("a") == "1"
+    assert c.get("c") == "3"
+    assert c.stats()["evictions"] == 1
+
+def test_lru_eviction_by_bytes():
+    """Entries are evicted to stay under the byte budget"""
+    c = ResponseCache(max_bytes=30)
+    c.set("a", "x" * 10)
+    c.set("b", "y" * 10)
+    c.set("c", "z" * 10)
+    assert c.get("a") is None
+    assert c.stats()["bytes"] <= 30
+    # Values larger than the whole budget are never stored
+    c.set("d", "w" * 100)
+    assert c.get("d") is None
+
+def test_ttl_expiry():
+    """Entries expire after the TTL"""
+    c = ResponseCache(ttl=0.05)
+    c.set("a", "1")
+    assert c.get("a") == "1"
+    time.sleep(0.1)
+    assert c.get("a") is None
+
+def test_disk_tier_survives_restart():
+    """The SQLite tier serves entries to a fresh cache instance"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.db")
+        ResponseCache(path=path).set("a", "persisted")
+        restarted = ResponseCache(path=path)
+        assert restarted.get("a") == "persisted"
+        assert restarted.stats()["disk_hits"] == 1
+        # Promoted into memory on the first disk hit
+        assert restarted.get("a") == "persisted"
+        assert restarted.stats()["hits"] == 1
+
+def test_disk_tier_keeps_to_budget():
+    """The SQLite tier drops expired rows and the oldest beyond the entry and byte budgets"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.db")
+        c = ResponseCache(max_entries=3, path=path)
+        for i in range(50):
+            c.set(f"k{i}", f"v{i}")
+        keys = [row[0] for row in c.db.execute("SELECT key FROM entries ORDER BY expires_at")]
+        assert keys == ["k47", "k48", "k49"]
+        assert c.stats()["disk_evictions"] == 47
+
+        c = ResponseCache(max_bytes=30, path=path)
+        c.set("a", "x" * 10)
+        c.set("b", "y" * 10)
+        c.set("c", "z" * 10)
+        keys = [row[0] for row in c.db.execute("SELECT key FROM entries ORDER BY expires_at")]
+        assert keys == ["b", "c"]
+
+        c = ResponseCache(ttl=0.05, path=path)
+        c.set("old", "1")
+        time.sleep(0.1)
+        c.set("new", "2")
+        assert c.db.execute("SELECT key FROM entries WHERE key IN ('old', 'new')").fetchall() == [("new",)]
+
+def test_cached_completion_bypass():
+    """Sampled completions bypass the cache unless forced"""
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return "reply"
+
+    async def run():
+        cache.llm_cache.clear()
+        greedy = {"provider": "test", "model": "m", "messages": [], "temperature": 0}
+        sampled = {**greedy, "temperature": 0.7}
+        await cached_completion(greedy, fetch)
+        await cached_completion(greedy, fetch)
+        assert len(calls) == 1
+        await cached_completion(sampled, fetch)
+        await cached_completion(sampled, fetch)
+        assert len(calls) == 3
+        await cached_completion(sampled, fetch, force=True)
+        await cached_completion(sampled, fetch, force=True)
+        assert len(calls) == 4
+
+    asyncio.run(run())
+
+def test_empty_reply_not_cached():
+    """A reply without text (content=None) is returned as "" and fetched again next time"""
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return None
+
+    async def run():
+        cache.llm_cache.clear()
+        params = {"provider": "test", "model": "m", "messages": [{"role": "user", "content": "refuse"}], "temperature": 0}
+        assert await cached_completion(params, fetch) == ""
+        assert await cached_completion(params, fetch) == ""
+        assert await cached_completion({**params, "temperature": 0.7}, fetch) == ""
+
+    asyncio.run(run())
+    assert len(calls) == 3
+
+def test_server_stats_reports_cache():
+    """Hit/miss counters are exposed through server_stats"""
+    report = json.loads(asyncio.run(stats.server_stats()))
+    assert {"hits", "misses", "hit_rate", "bytes"} <= set(report["llm_cache"])
+
+if __name__ == "__main__":
+    print("Response Cache Test Suite")
+    print("=" * 50)
+
+    test_key_is_canonical()
+    test_lru_eviction_by_entries()
+    test_lru_eviction_by_bytes()
+    test_ttl_expiry()
+    test_disk_tier_survives_restart()
+    test_disk_tier_keeps_to_budget()
+    test_cached_completion_bypass()
+    test_empty_reply_not_cached()
+    test_server_stats_reports_cache()
+
+    print("\nTest suite completed!")
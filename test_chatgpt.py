@@ -53,7 +53,7 @@ def test_chatgpt_tool():
         # Run the server with proper MCP protocol sequence
         input_data = json.dumps(init_request) + "\n" + json.dumps(initialized_notification) + "\n" + json.dumps(tool_request) + "\n"
         result = subprocess.run(
-            ["mcp\\Scripts\\python.exe", "server.py"],
+            [sys.executable, "server.py"],
             input=input_data,
             text=True,
             capture_output=True,
@@ -127,7 +127,7 @@ def test_conversation_tool():
         # Run the server with proper MCP protocol sequence
         input_data = json.dumps(init_request) + "\n" + json.dumps(initialized_notification) + "\n" + json.dumps(tool_request) + "\n"
         result = subprocess.run(
-            ["mcp\\Scripts\\python.exe", "server.py"],
+            [sys.executable, "server.py"],
             input=input_data,
             text=True,
             capture_output=True,
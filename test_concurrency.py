@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Concurrency test for the async ChatGPT and Claude tools
+
+Runs the local provider stand-ins from mock_providers.py, which answer after a
+fixed delay, and checks that parallel tool calls overlap their network wait.
+"""
+
+import asyncio
+import time
+
+import providers
+import server_chatgpt
+import server_claude
+from mock_providers import start_mock_providers
+
+PARALLEL_CALLS = 20
+
+async def time_parallel_calls(mcp, tool, count):
+    """Call a tool `count` times in parallel and return (elapsed, results)"""
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        mcp.call_tool(tool, {"prompt": f"ping {i}"}) for i in range(count)
+    ])
+    return time.perf_counter() - start, results
+
+async def check_parallel_calls(mcp, tool):
+    try:
+        single, _ = await time_parallel_calls(mcp, tool, 1)
+        elapsed, results = await time_parallel_calls(mcp, tool, PARALLEL_CALLS)
+    finally:
+        await providers.aclose_clients()
+
+    print(f"{tool}: 1 call {single:.2f}s, {PARALLEL_CALLS} parallel calls {elapsed:.2f}s")
+    for i, (content, _) in enumerate(results):
+        assert content[0].text == f"pong: ping {i}"
+    # Serial execution would take PARALLEL_CALLS times the provider latency
+    assert elapsed < single * 2.5
+
+def test_chatgpt_parallel_calls():
+    """20 parallel chatgpt calls finish in about the time of one"""
+    server = start_mock_providers()
+    try:
+        asyncio.run(check_parallel_calls(server_chatgpt.mcp, "chatgpt"))
+    finally:
+        server.should_exit = True
+
+def test_claude_parallel_calls():
+    """20 parallel claude calls finish in about the time of one"""
+    server = start_mock_providers()
+    try:
+        asyncio.run(check_parallel_calls(server_claude.mcp, "claude"))
+    finally:
+        server.should_exit = True
+
+if __name__ == "__main__":
+    print("Async Provider Concurrency Test Suite")
+    print("=" * 50)
+
+    test_chatgpt_parallel_calls()
+    test_claude_parallel_calls()
+
+    print("\nTest suite completed!")
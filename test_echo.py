@@ -53,7 +53,7 @@ def test_echo_tool():
         # Run the server with proper MCP protocol sequence
         input_data = json.dumps(init_request) + "\n" + json.dumps(initialized_notification) + "\n" + json.dumps(tool_request) + "\n"
         result = subprocess.run(
-            ["mcp\\Scripts\\python.exe", "server_echo.py"],
+            [sys.executable, "server_echo.py"],
             input=input_data,
             text=True,
             capture_output=True,
@@ -120,7 +120,7 @@ def test_reverse_tool():
         # Run the server with proper MCP protocol sequence
         input_data = json.dumps(init_request) + "\n" + json.dumps(initialized_notification) + "\n" + json.dumps(tool_request) + "\n"
         result = subprocess.run(
-            ["mcp\\Scripts\\python.exe", "server_echo.py"],
+            [sys.executable, "server_echo.py"],
             input=input_data,
             text=True,
             capture_output=True,
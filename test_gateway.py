@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for the gateway server that mounts several toolsets in one process
+"""
+
+import asyncio
+import os
+
+import gateway
+
+def tool_names(mcp):
+    return [tool.name for tool in asyncio.run(mcp.list_tools())]
+
+def test_all_toolsets_mounted():
+    """Every toolset's tools are served once, shared tools included"""
+    names = tool_names(gateway.build_gateway(list(gateway.TOOLSETS)))
+    assert {"echo", "reverse", "get_news", "chatgpt", "chatgpt_conversation", "claude", "claude_conversation"} <= set(names)
+    assert names.count("server_stats") == 1
+
+def test_toolsets_from_env():
+    """GATEWAY_TOOLSETS selects which toolsets are mounted"""
+    os.environ["GATEWAY_TOOLSETS"] = "echo, anthropic"
+    try:
+        names = tool_names(gateway.build_gateway())
+    finally:
+        del os.environ["GATEWAY_TOOLSETS"]
+    assert "echo" in names and "claude" in names
+    assert "chatgpt" not in names and "get_news" not in names
+
+def test_unknown_toolset_rejected():
+    """An unknown toolset name is a configuration error"""
+    os.environ["GATEWAY_TOOLSETS"] = "echo,gemini"
+    try:
+        gateway.enabled_toolsets()
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert "gemini" in str(e)
+    finally:
+        del os.environ["GATEWAY_TOOLSETS"]
+
+def test_mounted_tool_call():
+    """Mounted tools are callable through the gateway"""
+    mcp = gateway.build_gateway(["echo"])
+    content, _ = asyncio.run(mcp.call_tool("reverse", {"text": "abc"}))
+    assert content[0].text == "Reversed: cba"
+
+if __name__ == "__main__":
+    print("Gateway Test Suite")
+    print("=" * 50)
+
+    test_all_toolsets_mounted()
+    test_toolsets_from_env()
+    test_unknown_toolset_rejected()
+    test_mounted_tool_call()
+
+    print("\nTest suite completed!")
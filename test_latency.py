@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for rolling latency statistics and latency-aware model selection
+"""
+
+import asyncio
+import os
+
+import latency
+import providers
+import server_chatgpt
+import server_router
+from latency import bucket_for, expected_ms, pick_models, record
+from mock_providers import start_mock_providers, LLM_REQUESTS, DEFAULT_LATENCY
+
+def seed(target, seconds, prompt="short prompt"):
+    provider, _, model = target.partition(":")
+    for _ in range(latency.MIN_SAMPLES):
+        record(provider, model, {"messages": [{"role": "user", "content": prompt}]}, seconds)
+
+def test_buckets_and_expected_latency():
+    """Latency is tracked per prompt-length bucket, falling back to the nearest one"""
+    assert bucket_for(10) == 0 and bucket_for(300) == 1 and bucket_for(10 ** 6) == len(latency.BUCKETS)
+    assert expected_ms("openai:lat-unknown", 10) is None
+
+    seed("openai:lat-a", 0.2)
+    seed("openai:lat-a", 3.0, prompt="x" * 8000)
+    assert expected_ms("openai:lat-a", 10) == 200
+    assert expected_ms("openai:lat-a", 2000) == 3000
+    # No samples in the largest bucket: use the nearest bucket that has them
+    assert expected_ms("openai:lat-a", 10 ** 6) == 3000
+
+def test_pick_models():
+    """Tiers and latency budgets order the candidates"""
+    os.environ["ROUTER_MODELS"] = "openai:pick-cheap,anthropic:pick-mid,openai:pick-strong"
+    try:
+        seed("openai:pick-cheap", 2.0)
+        seed("anthropic:pick-mid", 0.5)
+        seed("openai:pick-strong", 6.0)
+        assert pick_models(10, tier="fast")[0] == "anthropic:pick-mid"
+        assert pick_models(10, tier="best")[0] == "openai:pick-strong"
+        assert pick_models(10, tier="balanced")[0] == "anthropic:pick-mid"
+        assert pick_models(10, latency_budget_ms=3000)[0] == "openai:pick-cheap"
+        assert pick_models(10, latency_budget_ms=1000)[0] == "anthropic:pick-mid"
+        # Nothing meets the budget: fastest first
+        assert pick_models(10, latency_budget_ms=100)[0] == "anthropic:pick-mid"
+        try:
+            pick_models(10, tier="cheapest")
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    finally:
+        del os.environ["ROUTER_MODELS"]
+
+def test_calls_record_latency_and_route_by_tier():
+    """Upstream calls feed the windows (TTFT when streamed) and route_prompt uses them"""
+    server = start_mock_providers()
+    os.environ["ROUTER_MODELS"] = "openai:tier-slow,anthropic:tier-fast"
+
+    async def run():
+        try:
+            await server_chatgpt.mcp.call_tool("chatgpt", {"prompt": "hi", "model": "tier-probe", "stream": True})
+            content, _ = await server_router.mcp.call_tool("route_prompt", {"prompt": "which?", "tier": "fast"})
+            return content[0].text
+        finally:
+            await providers.aclose_clients()
+
+    try:
+        seed("openai:tier-slow", 5.0)
+        seed("anthropic:tier-fast", 0.1)
+        assert asyncio.run(run()) == "pong: which?"
+    finally:
+        del os.environ["ROUTER_MODELS"]
+        server.should_exit = True
+    assert LLM_REQUESTS[-1]["model"] == "tier-fast"
+
+    window = latency._windows[("openai", "tier-probe", 0)]
+    assert window.total[0] >= DEFAULT_LATENCY * 0.9
+    assert 0 < window.ttft[0] < window.total[0]
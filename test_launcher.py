@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the launcher's supervisor mode: health checks, restarts and resource reporting
+"""
+
+import asyncio
+import os
+import time
+
+from bench_http import free_port
+from launcher import Supervisor, parse_children, process_usage
+
+async def wait_for_state(child, state, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while child.state != state:
+        assert time.monotonic() < deadline, f"{child.name} stayed {child.state}"
+        await asyncio.sleep(0.05)
+
+async def check_restart_after_crash():
+    (child,) = parse_children([f"echo:{free_port()}"], "127.0.0.1", 0)
+    supervisor = Supervisor([child], check_interval=0.2, backoff_base=0.1, report_interval=0)
+    run = asyncio.create_task(supervisor.run())
+    try:
+        await wait_for_state(child, "healthy")
+        first_pid = child.proc.pid
+        status = supervisor.status()[0]
+        assert status["tools"] == 4 and status["pid"] == first_pid
+        if status["rss_mb"] is not None:
+            assert status["rss_mb"] > 10
+
+        child.proc.kill()
+        await wait_for_state(child, "restarting")
+        await wait_for_state(child, "healthy")
+        assert child.proc.pid != first_pid
+        assert child.restarts == 1
+    finally:
+        supervisor.stop()
+        await run
+    assert child.state == "stopped" and child.proc.returncode is not None
+
+def test_supervisor_restarts_crashed_child():
+    """A killed child is restarted after its backoff and passes its health check again"""
+    asyncio.run(check_restart_after_crash())
+
+def test_parse_children_and_usage():
+    """Children get sequential ports unless given one, and /proc usage is read where available"""
+    children = parse_children(["echo", "news:9001", "gateway"], "127.0.0.1", 8100)
+    assert [(c.name, c.port) for c in children] == [("echo", 8100), ("news", 9001), ("gateway", 8102)]
+    try:
+        parse_children(["nope"], "127.0.0.1", 8100)
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert "nope" in str(e)
+
+    rss, cpu = process_usage(os.getpid())
+    if rss is not None:
+        assert rss > 0 and cpu >= 0
+
+if __name__ == "__main__":
+    print("Launcher Supervisor Test Suite")
+    print("=" * 50)
+
+    test_supervisor_restarts_crashed_child()
+    test_parse_children_and_usage()
+
+    print("\nTest suite completed!")
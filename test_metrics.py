@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus metrics exported by the MCP servers
+"""
+
+import asyncio
+import os
+import tempfile
+import urllib.request
+
+from mcp.server.fastmcp import FastMCP
+
+import metrics
+import providers
+import server_chatgpt
+from bench_http import free_port
+from mock_providers import start_mock_providers
+
+def sample(text, line_prefix):
+    """Value of the first exposition line starting with line_prefix"""
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"no sample {line_prefix!r} in:\n{text}")
+
+def test_tool_metrics():
+    """Calls, errors by class, latency and in-flight calls are counted per tool"""
+    mcp = FastMCP("metrics_test")
+
+    @mcp.tool()
+    async def ok() -> str:
+        return "fine"
+
+    @mcp.tool()
+    async def soft_error() -> str:
+        return "Error: upstream unavailable"
+
+    @mcp.tool()
+    async def crash() -> str:
+        raise KeyError("boom")
+
+    metrics.instrument(mcp)
+    metrics.instrument(mcp)  # idempotent
+
+    async def run():
+        for tool in ("ok", "ok", "soft_error", "crash"):
+            try:
+                await mcp.call_tool(tool, {})
+            except Exception:
+                pass
+
+    asyncio.run(run())
+    text = metrics.render()
+    labels = 'server="metrics_test",tool='
+    assert sample(text, f'mcp_tool_calls_total{{{labels}"ok"}}') == 2
+    assert sample(text, f'mcp_tool_errors_total{{{labels}"soft_error",error="error_result"}}') == 1
+    assert sample(text, f'mcp_tool_errors_total{{{labels}"crash",error="KeyError"}}') == 1
+    assert sample(text, f'mcp_tool_duration_seconds_count{{{labels}"ok"}}') == 2
+    assert sample(text, f'mcp_tool_duration_seconds_bucket{{{labels}"ok",le="+Inf"}}') == 2
+    assert sample(text, f'mcp_tool_in_flight{{{labels}"ok"}}') == 0
+
+def test_provider_metrics_and_exporters():
+    """Provider calls report latency and usage tokens, served over HTTP and to a file"""
+    server = start_mock_providers()
+
+    async def run():
+        try:
+            await server_chatgpt.mcp.call_tool("chatgpt", {"prompt": "metrics", "model": "metrics-model", "temperature": 0})
+            await server_chatgpt.mcp.call_tool("chatgpt", {"prompt": "metrics", "model": "metrics-model", "temperature": 0})
+        finally:
+            await providers.aclose_clients()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.should_exit = True
+
+    port = free_port()
+    http_server = metrics.serve_metrics(port)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            text = response.read().decode()
+    finally:
+        http_server.shutdown()
+    labels = 'provider="openai",model="metrics-model"'
+    assert sample(text, f"llm_upstream_duration_seconds_count{{{labels}}}") == 1
+    assert sample(text, f'llm_tokens_total{{{labels},kind="prompt"}}') == 1
+    assert sample(text, f'llm_tokens_total{{{labels},kind="completion"}}') == 1
+    assert sample(text, 'mcp_cache_requests_total{cache="llm_cache",outcome="hits"}') >= 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metrics.prom")
+        metrics.write_metrics(path)
+        with open(path) as f:
+            assert "# TYPE mcp_tool_calls_total counter" in f.read()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for the local provider stand-ins: scripted 429s and failures, latency
+distributions and token rates
+"""
+
+import asyncio
+import os
+import time
+
+import mock_providers
+import providers
+import server_chatgpt
+import server_claude
+import server_news
+from mock_providers import start_mock_providers, configure, parse_latency, LLM_REQUESTS
+
+def call(mcp, tool, arguments):
+    async def run():
+        try:
+            content, _ = await mcp.call_tool(tool, arguments)
+            return content[0].text
+        finally:
+            await providers.aclose_clients()
+    return asyncio.run(run())
+
+def test_latency_distributions():
+    """Latency specs parse to samplers within their bounds"""
+    mock_providers.rng.seed(0)
+    assert parse_latency(0.2)() == 0.2
+    assert parse_latency("0.3")() == 0.3
+    assert parse_latency("fixed:0.1")() == 0.1
+    assert all(0.1 <= parse_latency("uniform:0.1,0.2")() <= 0.2 for _ in range(100))
+    assert {parse_latency("choice:0.1,2")() for _ in range(100)} == {0.1, 2.0}
+    assert all(parse_latency("normal:0.01,1")() >= 0 for _ in range(100))
+    try:
+        parse_latency("zipf:1")
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert "zipf" in str(e)
+
+def test_scripted_rate_limits_are_retried():
+    """Scripted 429s carry Retry-After and the rate limiter retries past them"""
+    server = start_mock_providers(latency=0.01)
+    os.environ["PROVIDER_BACKOFF_BASE"] = "0.01"
+    try:
+        configure(["openai"], script=[429, 429], retry_after=0.05)
+        start = time.perf_counter()
+        assert call(server_chatgpt.mcp, "chatgpt", {"prompt": "retry me"}) == "pong: retry me"
+        assert time.perf_counter() - start >= 0.1
+        assert len(LLM_REQUESTS) == 3
+
+        configure(["anthropic"], script=[500])
+        assert call(server_claude.mcp, "claude", {"prompt": "fail"}).startswith("Error calling Claude")
+        assert call(server_claude.mcp, "claude", {"prompt": "ok"}) == "pong: ok"
+
+        configure(["news"], script=[429])
+        assert "Rate limit" in call(server_news.mcp, "get_news", {"category": "health", "limit": 2})
+    finally:
+        del os.environ["PROVIDER_BACKOFF_BASE"]
+        server.should_exit = True
+
+def test_token_rate_paces_streams():
+    """With a token rate, streamed replies take about output_tokens / token_rate"""
+    server = start_mock_providers(latency=0.0, token_rate=100, output_tokens=21)
+    try:
+        start = time.perf_counter()
+        text = call(server_claude.mcp, "claude", {"prompt": "long", "stream": True})
+        elapsed = time.perf_counter() - start
+    finally:
+        server.should_exit = True
+    assert text == "pong:" + " tok" * 20
+    assert elapsed >= 0.2
+
+if __name__ == "__main__":
+    print("Mock Provider Test Suite")
+    print("=" * 50)
+
+    test_latency_distributions()
+    test_scripted_rate_limits_are_retried()
+    test_token_rate_paces_streams()
+
+    print("\nTest suite completed!")
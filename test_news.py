@@ -3,10 +3,15 @@
 Test client for News MCP server
 """
 
+import asyncio
 import subprocess
 import json
 import sys
 
+import providers
+import server_news
+from mock_providers import start_mock_providers, NEWS_REQUESTS
+
 def test_news_tool():
     """Test the news tool functionality"""
     
@@ -51,7 +56,7 @@ def test_news_tool():
         # Run the server with proper MCP protocol sequence
         input_data = json.dumps(init_request) + "\n" + json.dumps(initialized_notification) + "\n" + json.dumps(tool_request) + "\n"
         result = subprocess.run(
-            ["mcp\\Scripts\\python.exe", "server_news.py"],
+            [sys.executable, "server_news.py"],
             input=input_data,
             text=True,
             capture_output=True,
@@ -72,6 +77,33 @@ def test_news_tool():
     except Exception as e:
         print(f"Error: {e}")
 
+def test_news_cache_and_coalescing():
+    """Concurrent and repeated calls for one category make a single upstream request"""
+    server = start_mock_providers()
+    
+    async def run():
+        try:
+            results = await asyncio.gather(*[
+                server_news.get_news("technology", 3) for _ in range(10)
+            ])
+            results.append(await server_news.get_news("technology", 3))
+            results.append(await server_news.get_news("sports", 3))
+        finally:
+            await providers.aclose_clients()
+        return results
+    
+    try:
+        NEWS_REQUESTS.clear()
+        server_news.news_cache.clear()
+        results = asyncio.run(run())
+    finally:
+        server.should_exit = True
+    
+    print(results[0])
+    assert "1. technology headline 0 (Fake Wire)" in results[0]
+    assert len(set(results[:11])) == 1
+    assert [r["category"] for r in NEWS_REQUESTS] == ["technology", "sports"]
+
 if __name__ == "__main__":
     print("News MCP Server Test Suite")
     print("=" * 50)
@@ -91,5 +123,6 @@ if __name__ == "__main__":
     
     # Run tests
     test_news_tool()
+    test_news_cache_and_coalescing()
     
     print("\nTest suite completed!")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for Anthropic prompt caching and system prompts in claude_conversation
+"""
+
+import asyncio
+import json
+import os
+
+from mcp.shared.memory import create_connected_server_and_client_session
+
+import providers
+import server_claude
+from prompt_cache import with_cache_breakpoints, cache_stats
+from mock_providers import start_mock_providers, LLM_REQUESTS
+
+PREAMBLE = "You are a careful assistant. " * 200
+
+def test_cache_breakpoints():
+    """Breakpoints go on a large system prompt and the turn before the newest one"""
+    short = {"model": "m", "system": "be brief", "messages": [{"role": "user", "content": "hi"}]}
+    assert with_cache_breakpoints(short) == short
+
+    params = {"model": "m", "system": PREAMBLE, "messages": [
+        {"role": "user", "content": "first"},
+        {"role": "assistant", "content": "reply"},
+        {"role": "user", "content": "second"}
+    ]}
+    marked = with_cache_breakpoints(params)
+    assert marked["system"] == [{"type": "text", "text": PREAMBLE, "cache_control": {"type": "ephemeral"}}]
+    assert marked["messages"][1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert marked["messages"][2] == {"role": "user", "content": "second"}
+    # The caller's parameters (and so the response-cache key) are untouched
+    assert params["system"] == PREAMBLE and params["messages"][1]["content"] == "reply"
+
+    os.environ["ANTHROPIC_CACHE_MIN_TOKENS"] = "100000"
+    try:
+        assert with_cache_breakpoints(params) == params
+        os.environ["ANTHROPIC_CACHE_MIN_TOKENS"] = "1"
+        os.environ["ANTHROPIC_PROMPT_CACHE"] = "false"
+        assert with_cache_breakpoints(params) == params
+    finally:
+        del os.environ["ANTHROPIC_CACHE_MIN_TOKENS"]
+        os.environ.pop("ANTHROPIC_PROMPT_CACHE", None)
+
+async def converse(messages, logs):
+    async def on_log(params):
+        logs.append(params.data)
+
+    async with create_connected_server_and_client_session(
+        server_claude.mcp._mcp_server, logging_callback=on_log
+    ) as client:
+        result = await client.call_tool("claude_conversation", {"messages": messages})
+    return result.content[0].text
+
+def test_claude_conversation_system_and_cache():
+    """System messages reach Claude's system prompt and cache usage is reported"""
+    server = start_mock_providers()
+    messages = [
+        {"role": "system", "content": PREAMBLE},
+        {"role": "user", "content": "question"}
+    ]
+    logs = []
+    before = cache_stats()
+
+    async def run():
+        try:
+            return [await converse(messages, logs) for _ in range(2)]
+        finally:
+            await providers.aclose_clients()
+
+    try:
+        replies = asyncio.run(run())
+    finally:
+        server.should_exit = True
+
+    assert replies == ["pong: question", "pong: question"]
+    request = LLM_REQUESTS[-1]
+    assert request["system"][0]["text"] == PREAMBLE
+    assert all(message["role"] != "system" for message in request["messages"])
+    assert "wrote" in logs[0] and logs[1].startswith("prompt cache: read")
+    after = cache_stats()
+    print(json.dumps(after))
+    assert after["cache_creation_input_tokens"] > before["cache_creation_input_tokens"]
+    assert after["cache_read_input_tokens"] > before["cache_read_input_tokens"]
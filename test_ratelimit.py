@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-provider rate limiter
+"""
+
+import asyncio
+import os
+import time
+
+import httpx
+
+from ratelimit import ProviderLimiter, TokenBucket, rate_limit_delay
+
+class FakeStatusError(Exception):
+    """Stand-in for the SDKs' APIStatusError"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = httpx.Response(status_code, headers=headers or {})
+
+def test_token_bucket_queues_reservations():
+    """Reservations beyond the budget wait in arrival order"""
+    bucket = TokenBucket(60)
+    assert bucket.reserve(60) == 0.0
+    first = bucket.reserve(1)
+    second = bucket.reserve(1)
+    assert 0.9 < first < 1.1
+    assert 1.9 < second < 2.1
+
+def test_rate_limit_delay_honours_retry_after():
+    """Retry-After wins over a shorter backoff; other errors are not retried"""
+    assert rate_limit_delay(FakeStatusError(429, {"retry-after": "3"}), 0) >= 3.0
+    assert rate_limit_delay(FakeStatusError(429, {"retry-after-ms": "2500"}), 0) >= 2.5
+    assert 0 < rate_limit_delay(FakeStatusError(529), 0) <= float(os.getenv("PROVIDER_BACKOFF_BASE", "1"))
+    assert rate_limit_delay(FakeStatusError(400), 0) is None
+    assert rate_limit_delay(ValueError("boom"), 0) is None
+
+def test_retries_after_rate_limit():
+    """A 429 is retried after Retry-After and lowers the allowed rate"""
+    limiter = ProviderLimiter("test", "retry-model")
+    attempts = []
+
+    async def call():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise FakeStatusError(429, {"retry-after": "0.1"})
+        return "ok"
+
+    start = time.monotonic()
+    assert asyncio.run(limiter.run(10, call)) == "ok"
+    assert time.monotonic() - start >= 0.2
+    assert limiter.counts["retries"] == 2
+    assert limiter.counts["rate_limited"] == 2
+    assert limiter.rate_factor < 1.0
+
+def test_gives_up_after_max_retries():
+    """The error surfaces once PROVIDER_MAX_RETRIES is exhausted"""
+    os.environ["PROVIDER_MAX_RETRIES"] = "1"
+    limiter = ProviderLimiter("test", "exhausted-model")
+
+    async def call():
+        raise FakeStatusError(429, {"retry-after": "0.01"})
+
+    try:
+        asyncio.run(limiter.run(10, call))
+        assert False, "expected FakeStatusError"
+    except FakeStatusError:
+        pass
+    finally:
+        del os.environ["PROVIDER_MAX_RETRIES"]
+    assert limiter.counts["retries"] == 1
+    assert limiter.counts["failed"] == 1
+
+def test_failed_attempts_refund_their_reservation():
+    """Each retry or failure gives back its TPM reservation instead of holding it"""
+    os.environ["OPENAI_TPM"] = "6000"
+    os.environ["PROVIDER_BACKOFF_BASE"] = "0.01"
+    try:
+        limiter = ProviderLimiter("openai", "refund-model")
+        attempts = []
+
+        async def call():
+            attempts.append(1)
+            if len(attempts) <= 2:
+                raise FakeStatusError(429, {"retry-after": "0.01"})
+            return "ok"
+
+        assert asyncio.run(limiter.run(1000, call, lambda result: 300)) == "ok"
+        assert limiter.counts["retries"] == 2
+        assert abs(limiter.tokens.tokens - 5700) < 10
+
+        async def broken():
+            raise ValueError("boom")
+
+        try:
+            asyncio.run(limiter.run(1000, broken))
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+        assert abs(limiter.tokens.tokens - 5700) < 10
+    finally:
+        del os.environ["OPENAI_TPM"]
+        del os.environ["PROVIDER_BACKOFF_BASE"]
+
+def test_concurrency_cap_and_rpm_queue():
+    """Calls beyond the concurrency cap and RPM budget wait instead of failing"""
+    os.environ["TEST_MAX_CONCURRENCY"] = "2"
+    os.environ["TEST_QUEUED_MODEL_RPM"] = "600"
+    try:
+        limiter = ProviderLimiter("test", "queued-model")
+    finally:
+        del os.environ["TEST_MAX_CONCURRENCY"]
+        del os.environ["TEST_QUEUED_MODEL_RPM"]
+    assert limiter.rpm == 600
+
+    in_flight = []
+    peak = []
+
+    async def call():
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.05)
+        in_flight.pop()
+        return "ok"
+
+    async def run():
+        # Drain the initial burst so the next calls are paced at 10/s
+        limiter.requests.tokens = 0
+        return await asyncio.gather(*[limiter.run(0, call) for _ in range(5)])
+
+    start = time.monotonic()
+    assert asyncio.run(run()) == ["ok"] * 5
+    assert max(peak) <= 2
+    assert time.monotonic() - start >= 0.4
+
+if __name__ == "__main__":
+    print("Rate Limiter Test Suite")
+    print("=" * 50)
+
+    test_token_bucket_queues_reservations()
+    test_rate_limit_delay_honours_retry_after()
+    test_retries_after_rate_limit()
+    test_gives_up_after_max_retries()
+    test_failed_attempts_refund_their_reservation()
+    test_concurrency_cap_and_rpm_queue()
+
+    print("\nTest suite completed!")
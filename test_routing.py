@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for provider failover, hedged requests and the route_prompt tool
+"""
+
+import asyncio
+import os
+import time
+
+import providers
+import routing
+import server_router
+from routing import route, health_for, AllProvidersFailed
+from mock_providers import start_mock_providers, DEFAULT_LATENCY
+
+def reply_after(delay, text=None, error=None):
+    async def call():
+        await asyncio.sleep(delay)
+        if error:
+            raise RuntimeError(error)
+        return text
+    return call
+
+def test_failover_in_order():
+    """A failed provider falls through to the next one in the list"""
+    winner, result = asyncio.run(route({
+        "fo-a": reply_after(0.01, error="down"),
+        "fo-b": reply_after(0.01, "from b")
+    }))
+    assert (winner, result) == ("fo-b", "from b")
+
+    try:
+        asyncio.run(route({"fo-c": reply_after(0, error="x"), "fo-d": reply_after(0, error="y")}))
+        assert False, "expected AllProvidersFailed"
+    except AllProvidersFailed as e:
+        assert "fo-c: x" in str(e) and "fo-d: y" in str(e)
+
+def test_hedged_request_takes_the_faster_provider():
+    """Past the primary's p95 the secondary starts, and the slow primary is cancelled"""
+    primary = health_for("hedge-a")
+    primary.latencies.extend([0.05] * 10)
+
+    start = time.perf_counter()
+    winner, result = asyncio.run(route({
+        "hedge-a": reply_after(2.0, "slow"),
+        "hedge-b": reply_after(0.05, "fast")
+    }, hedge=True))
+    elapsed = time.perf_counter() - start
+    assert (winner, result) == ("hedge-b", "fast")
+    assert elapsed < 0.5
+    assert primary.counts["cancelled"] == 1 and health_for("hedge-b").counts["hedged"] == 1
+
+def test_unhealthy_provider_moves_to_the_back():
+    """Consecutive failures open a provider's circuit so others are tried first"""
+    os.environ["ROUTER_FAILURE_THRESHOLD"] = "2"
+    try:
+        for _ in range(2):
+            asyncio.run(route({"cb-a": reply_after(0, error="down"), "cb-b": reply_after(0, "ok")}))
+    finally:
+        del os.environ["ROUTER_FAILURE_THRESHOLD"]
+    assert not health_for("cb-a").healthy()
+    assert routing.order_by_health(["cb-a", "cb-b"]) == ["cb-b", "cb-a"]
+
+    calls_before = health_for("cb-a").counts["calls"]
+    assert asyncio.run(route({"cb-a": reply_after(0, "a"), "cb-b": reply_after(0, "b")})) == ("cb-b", "b")
+    assert health_for("cb-a").counts["calls"] == calls_before
+
+def test_health_is_shared_by_a_providers_models():
+    """Failures on one model open the circuit for every target of that provider"""
+    os.environ["ROUTER_FAILURE_THRESHOLD"] = "2"
+    try:
+        asyncio.run(route({"mixed:model-a": reply_after(0, error="down"), "other": reply_after(0, "ok")}))
+        asyncio.run(route({"mixed:model-b": reply_after(0, error="down"), "other": reply_after(0, "ok")}))
+    finally:
+        del os.environ["ROUTER_FAILURE_THRESHOLD"]
+    assert health_for("mixed") is health_for("mixed:model-a") is health_for("mixed:model-c")
+    assert not health_for("mixed").healthy()
+    assert routing.order_by_health(["mixed", "mixed:model-c", "other:model-d"]) == [
+        "other:model-d", "mixed", "mixed:model-c"
+    ]
+    assert asyncio.run(route({"mixed:model-c": reply_after(0, "c"), "other:model-d": reply_after(0, "d")})) == (
+        "other:model-d", "d"
+    )
+
+def test_route_prompt_fails_over_between_providers():
+    """route_prompt answers from Claude when OpenAI is unreachable"""
+    server = start_mock_providers()
+
+    async def call(arguments):
+        try:
+            content, _ = await server_router.mcp.call_tool("route_prompt", arguments)
+            return content[0].text
+        finally:
+            await providers.aclose_clients()
+
+    try:
+        assert asyncio.run(call({"prompt": "hi", "providers": ["openai", "anthropic"]})) == "pong: hi"
+        assert health_for("openai").counts["wins"] >= 1
+
+        anthropic_wins = health_for("anthropic").counts["wins"]
+        working_url = os.environ["OPENAI_BASE_URL"]
+        os.environ["OPENAI_BASE_URL"] = "http://127.0.0.1:9/v1"
+        try:
+            start = time.perf_counter()
+            assert asyncio.run(call({"prompt": "again", "providers": ["openai", "anthropic:claude-test"]})) == "pong: again"
+            assert time.perf_counter() - start < DEFAULT_LATENCY * 3
+        finally:
+            os.environ["OPENAI_BASE_URL"] = working_url
+        assert health_for("openai").counts["failures"] >= 1
+        assert health_for("anthropic:claude-test").counts["wins"] == anthropic_wins + 1
+
+        assert asyncio.run(call({"prompt": "hi", "providers": ["gemini"]})).startswith("Error routing prompt")
+    finally:
+        server.should_exit = True
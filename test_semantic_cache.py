@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the semantic cache: similarity, scoping, eviction, persistence and
+serving rephrased chatgpt prompts without an upstream call
+"""
+
+import asyncio
+import os
+import tempfile
+
+import providers
+import server_chatgpt
+from mock_providers import start_mock_providers, LLM_REQUESTS
+from semantic_cache import SemanticCache, embed, semantic_cache
+
+def params(prompt, model="m", temperature=0):
+    return {"provider": "openai", "model": model, "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 100, "temperature": temperature}
+
+def similarity(a, b):
+    x, y = embed(a, 1024), embed(b, 1024)
+    return sum(weight * y.get(index, 0.0) for index, weight in x.items())
+
+def test_rephrasings_are_close_and_topics_are_not():
+    """Case, punctuation and filler words barely move a prompt; a different topic does"""
+    assert similarity("What is the capital of France?", "what's the capital of france") > 0.9
+    assert similarity("How do I reverse a list in Python?", "How can I reverse a Python list?") > 0.9
+    assert similarity("What is the capital of France?", "What is the capital of Spain?") < 0.6
+    assert similarity("Write a haiku about autumn", "Write a haiku about spring") < 0.7
+    # Same words, but a different direction or number
+    assert similarity("Convert 100 USD to EUR", "Convert 100 EUR to USD") < 0.8
+    assert similarity("Translate hello from English to French", "Translate hello from French to English") < 0.8
+    assert similarity("Is Python faster than Java?", "Is Java faster than Python?") < 0.8
+    assert similarity("Who won the 2018 world cup", "Who won the 2014 world cup") < 0.8
+
+def test_lookup_is_scoped_to_model_and_parameters():
+    """Hits need the same model and parameters, and only single prompts are cached"""
+    index = SemanticCache()
+    index.add(params("What is the capital of France?"), "Paris")
+    assert index.lookup(params("what's the capital of france")) == "Paris"
+    assert index.lookup(params("what's the capital of france", model="other")) is None
+    assert index.lookup(params("what's the capital of france", temperature=0.5)) is None
+    assert index.lookup(params("What is the capital of Spain?")) is None
+
+    conversation = params("What is the capital of France?")
+    conversation["messages"].insert(0, {"role": "assistant", "content": "Hi"})
+    index.add(conversation, "ignored")
+    assert index.lookup(conversation) is None
+
+    stats = index.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3 and stats["entries"] == 1
+    assert stats["lookup_p50_ms"] is not None
+
+def test_hits_need_the_same_numbers():
+    """A prompt that differs only in a number is never served, however close it scores"""
+    index = SemanticCache(threshold=0.5)
+    story = "Summarise the plot of the film released in {} about a family of explorers crossing a frozen sea"
+    index.add(params(story.format(1998)), "1998 film")
+    assert similarity(story.format(1998), story.format(2004)) >= index.threshold
+    assert index.lookup(params(story.format(2004))) is None
+    assert index.lookup(params(story.format(1998).lower())) == "1998 film"
+
+def test_bounded_index_evicts_least_recently_used():
+    """Past max_entries the least recently used row is reused"""
+    index = SemanticCache(max_entries=3, dim=256)
+    for topic in ("apples", "bicycles", "volcanoes"):
+        index.add(params(f"Tell me about {topic}"), topic)
+    assert index.lookup(params("tell me about apples")) == "apples"
+    index.add(params("Tell me about glaciers"), "glaciers")
+    assert index.stats()["evictions"] == 1
+    assert index.lookup(params("tell me about bicycles")) is None
+    assert index.lookup(params("tell me about apples")) == "apples"
+    assert index.lookup(params("tell me about glaciers")) == "glaciers"
+
+def test_index_persists_in_mapped_file():
+    """Entries survive a restart through the memory-mapped vectors and SQLite metadata"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "semantic")
+        first = SemanticCache(max_entries=8, dim=256, path=path)
+        first.add(params("Summarize the plot of Hamlet"), "Revenge, mostly")
+        first.add(params("Explain TCP slow start"), "Exponential window growth")
+
+        second = SemanticCache(max_entries=8, dim=256, path=path)
+        assert second.lookup(params("summarize the plot of hamlet!")) == "Revenge, mostly"
+        assert second.stats()["entries"] == 2
+
+        expired = SemanticCache(max_entries=8, dim=256, path=path, ttl=-1)
+        expired.add(params("Explain UDP"), "Datagrams")
+        reopened = SemanticCache(max_entries=8, dim=256, path=path)
+        assert reopened.lookup(params("Explain UDP")) is None
+        assert reopened.stats()["entries"] == 2
+
+        resized = SemanticCache(max_entries=4, dim=256, path=path)
+        assert resized.lookup(params("summarize the plot of hamlet")) is None
+        assert resized.stats()["entries"] == 0
+
+def test_rephrased_chatgpt_prompt_served_from_cache():
+    """With the layer enabled, a rephrased deterministic prompt skips the provider"""
+    server = start_mock_providers(latency=0.01)
+    semantic_cache.enabled = True
+
+    async def ask(prompt):
+        content, _ = await server_chatgpt.mcp.call_tool("chatgpt", {"prompt": prompt, "temperature": 0})
+        return content[0].text
+
+    async def run():
+        try:
+            first = await ask("What is the capital of Burkina Faso?")
+            second = await ask("what's the capital of burkina faso")
+            return first, second
+        finally:
+            await providers.aclose_clients()
+
+    try:
+        first, second = asyncio.run(run())
+    finally:
+        semantic_cache.enabled = False
+        semantic_cache.clear()
+        server.should_exit = True
+    assert first == second == "pong: What is the capital of Burkina Faso?"
+    assert len(LLM_REQUESTS) == 1
+    assert semantic_cache.hits >= 1
+
+if __name__ == "__main__":
+    print("Semantic Cache Test Suite")
+    print("=" * 50)
+
+    test_rephrasings_are_close_and_topics_are_not()
+    test_lookup_is_scoped_to_model_and_parameters()
+    test_hits_need_the_same_numbers()
+    test_bounded_index_evicts_least_recently_used()
+    test_index_persists_in_mapped_file()
+    test_rephrased_chatgpt_prompt_served_from_cache()
+
+    print("\nTest suite completed!")
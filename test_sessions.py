@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests for the server-side conversation session store and session tools
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import providers
+import server_chatgpt
+import server_claude
+from sessions import SessionStore, UnknownSession
+from mock_providers import start_mock_providers, LLM_REQUESTS
+
+def test_store_caps_and_eviction():
+    """History is trimmed oldest-first to the caps and idle sessions are evicted"""
+    store = SessionStore(max_messages=4, max_bytes=1000, idle_timeout=60)
+    session_id = store.create("be brief")
+    session = store.get(session_id)
+    for i in range(5):
+        store.append(session, "user", f"q{i}")
+        store.append(session, "assistant", f"a{i}")
+    assert session.turns == [("user", "q3"), ("assistant", "a3"), ("user", "q4"), ("assistant", "a4")]
+    assert session.messages()[0] == {"role": "system", "content": "be brief"}
+
+    # A byte cap that falls mid-pair still leaves a user turn first
+    small = SessionStore(max_bytes=15)
+    session = small.get(small.create())
+    small.append(session, "user", "hello")
+    small.append(session, "assistant", "hi there")
+    small.append(session, "user", "again")
+    assert session.turns == [("user", "again")]
+
+    session.last_used = time.monotonic() - 3600
+    other = small.create()
+    assert small.stats()["evicted"] == 1
+    small.get(other)
+    try:
+        small.get("missing")
+        assert False, "expected UnknownSession"
+    except UnknownSession:
+        pass
+
+def test_store_spills_to_disk():
+    """Idle sessions spill to SQLite and reload on their next use"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(idle_timeout=60, path=os.path.join(tmp, "sessions.db"))
+        session_id = store.create("system prompt")
+        store.append(store.get(session_id), "user", "remember me")
+        store._sessions[session_id].last_used = time.monotonic() - 3600
+        store.create()
+        assert session_id not in store._sessions and store.stats()["spilled"] == 1
+
+        session = store.get(session_id)
+        assert session.system == "system prompt" and session.turns == [("user", "remember me")]
+        assert store.close(session_id) and not store.close(session_id)
+
+        # Shared mode keeps every session on disk for other worker processes
+        shared = SessionStore()
+        shared.share_on_disk(os.path.join(tmp, "shared.db"))
+        session_id = shared.create()
+        session = shared.get(session_id)
+        shared.append(session, "user", "from worker 1")
+        shared.save(session_id, session)
+        worker2 = SessionStore()
+        worker2.share_on_disk(shared.path)
+        assert worker2.get(session_id).turns == [("user", "from worker 1")]
+
+def test_shared_sessions_expire_and_keep_concurrent_turns():
+    """Shared rows expire when idle, and turns saved by two workers at once are both kept"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shared.db")
+        worker1, worker2 = SessionStore(idle_timeout=60), SessionStore(idle_timeout=60)
+        worker1.share_on_disk(path)
+        worker2.share_on_disk(path)
+        session_id = worker1.create("be brief")
+
+        # Both workers load the same history, then each records its own exchange
+        first, second = worker1.get(session_id), worker2.get(session_id)
+        worker1.record(session_id, first, [("user", "one"), ("assistant", "a1")])
+        worker2.record(session_id, second, [("user", "two"), ("assistant", "a2")])
+        assert worker1.get(session_id).turns == [("user", "one"), ("assistant", "a1"), ("user", "two"), ("assistant", "a2")]
+        assert worker2.stats()["conflicts"] == 1
+
+        # A row not written for the idle timeout is purged, spilled or shared
+        worker1.db.execute("UPDATE sessions SET last_used = last_used - 3600 WHERE id = ?", (session_id,))
+        try:
+            worker2.get(session_id)
+            assert False, "expected UnknownSession"
+        except UnknownSession:
+            pass
+        assert worker2.stats()["expired"] == 1
+
+        spilling = SessionStore(idle_timeout=60, path=os.path.join(tmp, "spill.db"))
+        spilled = spilling.create()
+        spilling._sessions[spilled].last_used = time.monotonic() - 3600
+        spilling.create()
+        spilling.db.execute("UPDATE sessions SET last_used = last_used - 3600")
+        spilling.create()
+        assert spilling.stats()["expired"] == 1
+        try:
+            spilling.get(spilled)
+            assert False, "expected UnknownSession"
+        except UnknownSession:
+            pass
+
+def check_session_tools(mcp, prefix):
+    async def call(tool, arguments):
+        content, _ = await mcp.call_tool(f"{prefix}_{tool}", arguments)
+        return content[0].text
+
+    async def run():
+        try:
+            session_id = await call("session_create", {"system": "be brief"})
+            first = await call("session_append", {"session_id": session_id, "content": "one"})
+            second = await call("session_append", {"session_id": session_id, "content": "two"})
+            closed = await call("session_close", {"session_id": session_id})
+            after = await call("session_append", {"session_id": session_id, "content": "three"})
+            return first, second, closed, after
+        finally:
+            await providers.aclose_clients()
+
+    LLM_REQUESTS.clear()
+    first, second, closed, after = asyncio.run(run())
+    assert (first, second) == ("pong: one", "pong: two")
+    assert closed.startswith("Closed session")
+    assert after.startswith("Error: Unknown or expired session")
+    # The client only sent the new turn; the server supplied the history
+    history = [(m["role"], m["content"]) for m in LLM_REQUESTS[-1]["messages"]]
+    assert history[-3:] == [("user", "one"), ("assistant", "pong: one"), ("user", "two")]
+    return LLM_REQUESTS[-1]
+
+def test_chatgpt_session_tools():
+    """ChatGPT sessions keep history server-side between turns"""
+    server = start_mock_providers()
+    try:
+        request = check_session_tools(server_chatgpt.mcp, "chatgpt")
+        assert request["messages"][0] == {"role": "system", "content": "be brief"}
+    finally:
+        server.should_exit = True
+
+def test_claude_session_tools():
+    """Claude sessions keep history server-side and pass the system prompt separately"""
+    server = start_mock_providers()
+    try:
+        request = check_session_tools(server_claude.mcp, "claude")
+        assert request["system"] == "be brief"
+        assert request["messages"][0]["role"] == "user"
+    finally:
+        server.should_exit = True
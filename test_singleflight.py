@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for single-flight coalescing of duplicate tool calls
+"""
+
+import asyncio
+
+from mcp.server.fastmcp import FastMCP
+
+from singleflight import singleflight, singleflight_stats
+
+def test_duplicate_calls_share_one_execution():
+    """Concurrent identical calls run once; different arguments run separately"""
+    mcp = FastMCP("singleflight_test")
+    executions = []
+
+    @mcp.tool()
+    @singleflight()
+    async def slow_upper(text: str) -> str:
+        """Uppercase text slowly"""
+        executions.append(text)
+        await asyncio.sleep(0.1)
+        return text.upper()
+
+    async def run():
+        return await asyncio.gather(
+            *[mcp.call_tool("slow_upper", {"text": "a"}) for _ in range(5)],
+            mcp.call_tool("slow_upper", {"text": "b"})
+        )
+
+    results = asyncio.run(run())
+    assert [content[0].text for content, _ in results] == ["A"] * 5 + ["B"]
+    assert sorted(executions) == ["a", "b"]
+    assert singleflight_stats()["tools"]["slow_upper"] == {"calls": 6, "coalesced": 4}
+
+def test_errors_reach_every_caller():
+    """A failing shared execution raises in every coalesced caller"""
+    executions = []
+
+    @singleflight()
+    async def flaky(n: int) -> str:
+        executions.append(n)
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream failed")
+
+    async def run():
+        return await asyncio.gather(*[flaky(1) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(executions) == 1
+    assert all(isinstance(r, ValueError) for r in results)
+
+def test_cancelled_caller_does_not_cancel_others():
+    """Cancelling the first caller leaves the shared execution running"""
+    @singleflight()
+    async def slow(n: int) -> int:
+        await asyncio.sleep(0.1)
+        return n * 2
+
+    async def run():
+        first = asyncio.ensure_future(slow(21))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(slow(21))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 42
+
+def test_unless_bypasses_coalescing():
+    """Calls matching the unless predicate always execute on their own"""
+    executions = []
+
+    @singleflight(unless=lambda args: args["stream"])
+    async def generate(prompt: str, stream: bool = False) -> str:
+        executions.append(stream)
+        await asyncio.sleep(0.05)
+        return prompt
+
+    async def run():
+        await asyncio.gather(*[generate("p", stream=True) for _ in range(3)])
+
+    asyncio.run(run())
+    assert executions == [True, True, True]
+
+if __name__ == "__main__":
+    print("Single-Flight Test Suite")
+    print("=" * 50)
+
+    test_duplicate_calls_share_one_execution()
+    test_errors_reach_every_caller()
+    test_cancelled_caller_does_not_cancel_others()
+    test_unless_bypasses_coalescing()
+
+    print("\nTest suite completed!")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for the accelerated stdio codec: framing, cached schema validation,
+identical responses to the SDK transport and JSON-RPC batches
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import jsonschema
+
+from bench_startup import INITIALIZE, INITIALIZED
+from bench_suite import StdioSession
+from mock_providers import start_mock_providers
+from stdio_codec import CachedValidators, split_lines
+
+def run_echo(lines, fast):
+    env = {**os.environ, "MCP_FAST_CODEC": "true" if fast else "false", "MCP_LOG_LEVEL": "warning"}
+    result = subprocess.run(
+        [sys.executable, "server_echo.py"],
+        input="".join(lines),
+        capture_output=True,
+        text=True,
+        timeout=60,
+        env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    return [json.loads(line) for line in result.stdout.splitlines()]
+
+def test_split_lines_keeps_partial_message():
+    """Complete lines are taken from the buffer and a partial one is left for the next read"""
+    buffer = bytearray(b'{"a": 1}\n\n{"b": 2}\r\n{"c"')
+    assert split_lines(buffer) == [b'{"a": 1}', b'{"b": 2}\r']
+    assert buffer == bytearray(b'{"c"')
+    assert split_lines(buffer) == []
+    buffer += b': 3}\n'
+    assert split_lines(buffer) == [b'{"c": 3}'] and not buffer
+
+def test_cached_validators_match_jsonschema():
+    """Each schema is compiled once and raises the same error as jsonschema.validate"""
+    schema = {"type": "object", "properties": {"text": {"type": "string"}}, "required": ["text"]}
+    validators = CachedValidators()
+    validators.validate({"text": "hi"}, schema)
+    validators.validate({"text": "again"}, dict(schema))
+    assert len(validators._validators) == 1
+
+    for instance in ({}, {"text": 3}):
+        try:
+            jsonschema.validate(instance, schema)
+        except jsonschema.ValidationError as e:
+            expected = e.message
+        try:
+            validators.validate(instance, schema)
+            assert False, "expected ValidationError"
+        except validators.ValidationError as e:
+            assert e.message == expected
+
+def test_fast_codec_answers_like_sdk_transport():
+    """Pipelined calls, including a last line without a newline, get the same responses"""
+    lines = [json.dumps(INITIALIZE) + "\n", json.dumps(INITIALIZED) + "\n"]
+    for i, tool in enumerate(["echo", "reverse", "uppercase", "lowercase", "echo"], 1):
+        arguments = {"text": f"Héllo {i}"} if i < 5 else {}
+        lines.append(json.dumps({"jsonrpc": "2.0", "id": i, "method": "tools/call",
+                                 "params": {"name": tool, "arguments": arguments}}) + "\n")
+    lines[-1] = lines[-1].rstrip("\n")
+
+    by_id = lambda message: message["id"]
+    fast = sorted(run_echo(lines, True), key=by_id)
+    assert len(fast) == 6
+    assert fast == sorted(run_echo(lines, False), key=by_id)
+    assert fast[1]["result"]["content"][0]["text"] == "Echo: Héllo 1"
+    assert fast[5]["result"]["isError"] is True
+
+def test_batch_answered_in_one_array():
+    """A batch gets one array of responses in request order, with per-item errors"""
+    call = lambda i, tool, arguments: {"jsonrpc": "2.0", "id": i, "method": "tools/call",
+                                       "params": {"name": tool, "arguments": arguments}}
+    batch = [
+        call(1, "uppercase", {"text": "a"}),
+        {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 99}},
+        call(2, "echo", {}),
+        {"id": 3, "params": {}},
+        call(1, "echo", {"text": "duplicate"}),
+        call(4, "reverse", {"text": "ab"})
+    ]
+    lines = [json.dumps(INITIALIZE) + "\n", json.dumps(INITIALIZED) + "\n", json.dumps(batch) + "\n", "[]\n"]
+    _, *responses = run_echo(lines, True)
+    answers, empty = sorted(responses, key=lambda response: isinstance(response, dict))
+
+    assert empty == {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Empty batch"}}
+    assert [answer["id"] for answer in answers] == [1, 2, 3, 1, 4]
+    assert answers[0]["result"]["content"][0]["text"] == "Uppercase: A"
+    assert answers[1]["result"]["isError"] is True
+    assert answers[2]["error"]["message"] == "Invalid request"
+    assert answers[3]["error"]["message"] == "Duplicate request id"
+    assert answers[4]["result"]["content"][0]["text"] == "Reversed: ba"
+
+async def timed_news_batch():
+    session = StdioSession("server_news.py", {**os.environ, "MCP_FAST_CODEC": "true", "MCP_LOG_LEVEL": "warning"})
+    await session.start()
+    try:
+        start = time.perf_counter()
+        responses = await session.call_batch(
+            [("get_news", {"category": category, "limit": 1}) for category in ("business", "health", "science", "sports")]
+        )
+        return time.perf_counter() - start, responses
+    finally:
+        await session.close()
+
+def test_batch_calls_run_concurrently():
+    """Slow calls in one batch overlap instead of running one after another"""
+    server = start_mock_providers(latency=0.5)
+    try:
+        elapsed, responses = asyncio.run(timed_news_batch())
+    finally:
+        server.should_exit = True
+    assert [r["result"]["content"][0]["text"].split("\n")[2] for r in responses] == [
+        f"1. {category} headline 0 (Fake Wire)" for category in ("business", "health", "science", "sports")
+    ]
+    assert elapsed < 1.5, f"batch took {elapsed:.2f}s"
+
+if __name__ == "__main__":
+    print("Stdio Codec Test Suite")
+    print("=" * 50)
+
+    test_split_lines_keeps_partial_message()
+    test_cached_validators_match_jsonschema()
+    test_fast_codec_answers_like_sdk_transport()
+    test_batch_answered_in_one_array()
+    test_batch_calls_run_concurrently()
+
+    print("\nTest suite completed!")
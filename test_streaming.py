@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Streaming test for the ChatGPT and Claude tools
+
+Connects an in-memory MCP client session and checks that partial output
+arrives as progress or log notifications before the final result.
+"""
+
+import asyncio
+import os
+
+from mcp.shared.memory import create_connected_server_and_client_session
+
+import providers
+import server_chatgpt
+import server_claude
+from mock_providers import start_mock_providers, STREAM_DELTAS, LLM_REQUESTS
+from ratelimit import limiter_for
+
+async def collect_stream(mcp, tool, use_progress):
+    """Call a tool with stream=True and return (result text, forwarded deltas)"""
+    deltas = []
+
+    async def on_log(params):
+        deltas.append(params.data)
+
+    async def on_progress(progress, total, message):
+        deltas.append(message)
+
+    try:
+        async with create_connected_server_and_client_session(
+            mcp._mcp_server, logging_callback=on_log
+        ) as client:
+            result = await client.call_tool(
+                tool,
+                {"prompt": "ping", "stream": True},
+                progress_callback=on_progress if use_progress else None
+            )
+    finally:
+        await providers.aclose_clients()
+    return result.content[0].text, deltas
+
+def check_stream(mcp, tool):
+    for use_progress in (True, False):
+        text, deltas = asyncio.run(collect_stream(mcp, tool, use_progress))
+        mode = "progress" if use_progress else "log"
+        print(f"{tool} ({mode}): {deltas} -> {text!r}")
+        assert deltas == STREAM_DELTAS
+        assert text == "".join(STREAM_DELTAS)
+
+def test_chatgpt_stream():
+    """chatgpt forwards deltas while generating and returns the full text"""
+    server = start_mock_providers()
+    try:
+        check_stream(server_chatgpt.mcp, "chatgpt")
+    finally:
+        server.should_exit = True
+
+def test_chatgpt_stream_reports_usage():
+    """Streamed ChatGPT calls ask for usage, so the TPM reservation is corrected and usage recorded"""
+    server = start_mock_providers()
+    os.environ["OPENAI_TPM"] = "100000"
+    params = {"model": "gpt-stream-usage", "max_tokens": 20000, "temperature": 0.7,
+              "messages": [{"role": "user", "content": "ping"}]}
+    info = {}
+
+    async def run():
+        try:
+            return await providers.openai_chat(providers.get_openai_client(), params, stream=True, info=info)
+        finally:
+            await providers.aclose_clients()
+
+    try:
+        text = asyncio.run(run())
+        limiter = limiter_for("openai", "gpt-stream-usage")
+    finally:
+        del os.environ["OPENAI_TPM"]
+        server.should_exit = True
+    assert text == "".join(STREAM_DELTAS)
+    assert LLM_REQUESTS[-1]["stream_options"] == {"include_usage": True}
+    assert info["usage"] == {"prompt_tokens": 1, "completion_tokens": len(STREAM_DELTAS),
+                             "total_tokens": 1 + len(STREAM_DELTAS)}
+    assert info["finish_reason"] == "stop"
+    # Only the tokens actually used stay reserved, not the max_tokens estimate
+    assert limiter.tokens.tokens >= 100000 - len(STREAM_DELTAS) - 1
+
+def test_claude_stream():
+    """claude forwards deltas while generating and returns the full text"""
+    server = start_mock_providers()
+    try:
+        check_stream(server_claude.mcp, "claude")
+    finally:
+        server.should_exit = True
+
+if __name__ == "__main__":
+    print("Streaming Test Suite")
+    print("=" * 50)
+
+    test_chatgpt_stream()
+    test_chatgpt_stream_reports_usage()
+    test_claude_stream()
+
+    print("\nTest suite completed!")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for STRUCTURED_OUTPUT: typed results with an output schema for the news
+and chatgpt/claude tools, and the default plain-text results
+"""
+
+import asyncio
+import importlib
+import json
+import os
+
+import providers
+import results
+import server_chatgpt
+import server_claude
+import server_news
+from cache import llm_cache
+from mock_providers import start_mock_providers, LLM_REQUESTS
+
+def reload_servers():
+    """Re-import the tool modules so their return annotations follow STRUCTURED_OUTPUT"""
+    for module in (results, server_news, server_chatgpt, server_claude):
+        importlib.reload(module)
+
+async def call_all():
+    try:
+        return [
+            await server_news.mcp.call_tool("get_news", {"category": "science", "limit": 2}),
+            await server_chatgpt.mcp.call_tool("chatgpt", {"prompt": "hello", "temperature": 0}),
+            await server_chatgpt.mcp.call_tool("chatgpt", {"prompt": "hello", "temperature": 0}),
+            await server_claude.mcp.call_tool("claude_conversation", {
+                "messages": [{"role": "system", "content": "Be brief"}, {"role": "user", "content": "hi"}],
+                "model": "claude-test"
+            })
+        ]
+    finally:
+        await providers.aclose_clients()
+
+def test_structured_results():
+    """Tools declare an output schema and return records, with errors raised"""
+    server = start_mock_providers(latency=0.01)
+    os.environ["STRUCTURED_OUTPUT"] = "true"
+    news_api_key = os.environ.get("NEWS_API_KEY")
+    try:
+        reload_servers()
+        tools = {tool.name: tool for tool in asyncio.run(server_news.mcp.list_tools())}
+        assert tools["get_news"].outputSchema["properties"]["articles"]["type"] == "array"
+        news, first, second, conversation = asyncio.run(call_all())
+
+        content, structured = news
+        assert structured["category"] == "science"
+        assert structured["articles"][1] == {
+            "title": "science headline 1", "source": "Fake Wire",
+            "url": "https://news.example/science/1", "published_at": "2024-01-01T00:00:00Z"
+        }
+        assert json.loads(content[0].text) == structured
+
+        _, reply = first
+        assert reply["text"] == "pong: hello" and reply["finish_reason"] == "stop"
+        assert reply["usage"]["total_tokens"] == reply["usage"]["prompt_tokens"] + reply["usage"]["completion_tokens"]
+        assert reply["cached"] is False and reply["latency_ms"] > 0
+        _, reply = second
+        assert reply["cached"] is True and reply["usage"] is None and reply["model"] == "gpt-3.5-turbo"
+        assert len(LLM_REQUESTS) == 2
+
+        _, reply = conversation
+        assert reply["model"] == "claude-test" and reply["finish_reason"] == "end_turn"
+        assert reply["usage"]["prompt_tokens"] == 1
+
+        del os.environ["NEWS_API_KEY"]
+        try:
+            asyncio.run(server_news.mcp.call_tool("get_news", {"category": "science"}))
+            assert False, "expected ToolError"
+        except Exception as e:
+            assert str(e) == (
+                "Error executing tool get_news: "
+                "Error: NEWS_API_KEY not configured. Please set NEWS_API_KEY in your .env file."
+            )
+    finally:
+        if news_api_key is not None:
+            os.environ["NEWS_API_KEY"] = news_api_key
+        del os.environ["STRUCTURED_OUTPUT"]
+        server.should_exit = True
+        llm_cache.clear()
+        server_news.news_cache.clear()
+        reload_servers()
+
+def test_text_results_by_default():
+    """Without STRUCTURED_OUTPUT the tools keep returning plain text"""
+    assert results.STRUCTURED_OUTPUT is False
+    tools = {tool.name: tool for tool in asyncio.run(server_chatgpt.mcp.list_tools())}
+    assert tools["chatgpt"].outputSchema["properties"]["result"]["type"] == "string"
+    text = server_news.format_news("sports", [{"title": "Final tonight", "source": "Wire"}])
+    assert text == "📰 Today's sports news:\n\n1. Final tonight (Wire)\n"
+
+if __name__ == "__main__":
+    print("Structured Output Test Suite")
+    print("=" * 50)
+
+    test_structured_results()
+    test_text_results_by_default()
+
+    print("\nTest suite completed!")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for token counting and context-window trimming
+"""
+
+import asyncio
+import os
+
+import providers
+import server_chatgpt
+import tokens
+from prompt_cache import with_cache_breakpoints
+from ratelimit import estimate_tokens
+from tokens import fit_messages, text_tokens, ContextOverflow
+from mock_providers import start_mock_providers, LLM_REQUESTS
+
+def conversation(turns):
+    messages = [{"role": "system", "content": "You are terse."}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"Question {i}. " + "x" * 400})
+        messages.append({"role": "assistant", "content": f"Answer {i}. " + "y" * 400})
+    messages.append({"role": "user", "content": "Final question?"})
+    return messages
+
+def fit(messages, policy, context_tokens):
+    os.environ["TEST_CONTEXT_TOKENS"] = str(context_tokens)
+    try:
+        return fit_messages("test", {"model": "m", "max_tokens": 100, "messages": messages}, policy)
+    finally:
+        del os.environ["TEST_CONTEXT_TOKENS"]
+
+def test_trim_policies():
+    """Each policy keeps the system prompt and newest turn and fits the budget"""
+    messages = conversation(20)
+    assert fit(messages, "drop_oldest", 100000) is messages
+
+    for policy in tokens.POLICIES:
+        os.environ["CONTEXT_KEEP_LAST"] = "3"
+        try:
+            kept = fit(messages, policy, 1000)
+        finally:
+            del os.environ["CONTEXT_KEEP_LAST"]
+        assert kept[0] == messages[0] and kept[-1] == messages[-1]
+        assert sum(tokens.message_tokens(m, "m") for m in kept) <= 900
+        assert [m for m in kept if m["role"] != "system"][0]["role"] == "user"
+        if policy == "summarize":
+            assert kept[1]["content"].startswith("Summary of earlier conversation:")
+            assert "user: Question 0." in kept[1]["content"]
+        if policy == "keep_last_k":
+            assert len(kept) <= 1 + 3
+
+    try:
+        fit([{"role": "user", "content": "z" * 10000}], "drop_oldest", 1000)
+        assert False, "expected ContextOverflow"
+    except ContextOverflow:
+        pass
+
+def test_counts_are_memoized():
+    """Re-counting an unchanged history hits the memo instead of re-tokenizing"""
+    messages = conversation(5)
+    for message in messages:
+        tokens.message_tokens(message, "memo-model")
+    before = tokens.token_stats()
+    for message in messages:
+        tokens.message_tokens(message, "memo-model")
+    after = tokens.token_stats()
+    assert after["memo_misses"] == before["memo_misses"]
+    assert after["memo_hits"] - before["memo_hits"] == len(messages)
+    # The memo holds digests, not the history text
+    assert all(isinstance(digest, bytes) and len(digest) == 20 for digest, _ in tokens._memo)
+
+def test_estimates_share_the_counter():
+    """The TPM reservation and the prompt-cache threshold count like the context budget"""
+    messages = conversation(3)
+    params = {"model": "claude-test", "max_tokens": 100, "system": "Be brief.", "messages": messages}
+    prompt = sum(tokens.message_tokens(message, "claude-test") for message in messages)
+    prompt += text_tokens("Be brief.", "claude-test")
+    assert estimate_tokens(params) == prompt + 100
+
+    prefix = prompt - tokens.message_tokens(messages[-1], "claude-test")
+    os.environ["ANTHROPIC_CACHE_MIN_TOKENS"] = str(prefix + 1)
+    try:
+        assert with_cache_breakpoints(params)["messages"] == messages
+        os.environ["ANTHROPIC_CACHE_MIN_TOKENS"] = str(prefix)
+        assert "cache_control" in with_cache_breakpoints(params)["messages"][-2]["content"][0]
+    finally:
+        del os.environ["ANTHROPIC_CACHE_MIN_TOKENS"]
+
+def test_chatgpt_conversation_trims():
+    """chatgpt_conversation sends a trimmed history when it exceeds the context window"""
+    server = start_mock_providers()
+    os.environ["OPENAI_CONTEXT_TOKENS"] = "1500"
+
+    async def run():
+        try:
+            content, _ = await server_chatgpt.mcp.call_tool(
+                "chatgpt_conversation", {"messages": conversation(20), "max_tokens": 100, "trim_policy": "summarize"}
+            )
+            return content[0].text
+        finally:
+            await providers.aclose_clients()
+
+    try:
+        assert asyncio.run(run()) == "pong: Final question?"
+    finally:
+        del os.environ["OPENAI_CONTEXT_TOKENS"]
+        server.should_exit = True
+    sent = LLM_REQUESTS[-1]["messages"]
+    assert len(sent) < len(conversation(20))
+    assert sent[1]["content"].startswith("Summary of earlier conversation:")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for request tracing spans and trace-context propagation
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from mcp import types
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.memory import create_connected_server_and_client_session
+
+import providers
+import server_chatgpt
+import tracing
+from bench_http import free_port
+from mock_providers import start_mock_providers
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+def read_spans(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+async def call_with_traceparent(mcp, traceparent):
+    request = types.ClientRequest(types.CallToolRequest(
+        method="tools/call",
+        params=types.CallToolRequestParams(
+            name="chatgpt",
+            arguments={"prompt": "trace me", "model": "trace-model", "temperature": 0},
+            _meta={"traceparent": traceparent}
+        )
+    ))
+    try:
+        async with create_connected_server_and_client_session(mcp._mcp_server) as client:
+            result = await client.send_request(request, types.CallToolResult)
+    finally:
+        await providers.aclose_clients()
+    return result.content[0].text
+
+def test_tool_call_spans():
+    """A tools/call request yields nested spans under the caller's trace"""
+    server = start_mock_providers()
+    mcp = FastMCP("tracing_test")
+    mcp.add_tool(server_chatgpt.chatgpt)
+    tracing.instrument(mcp)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traces.jsonl")
+        exporter = tracing.configure(path=path)
+        try:
+            text = asyncio.run(call_with_traceparent(mcp, f"00-{TRACE_ID}-{PARENT_ID}-01"))
+            # An unsampled caller is not recorded
+            asyncio.run(call_with_traceparent(mcp, f"00-{'1' * 32}-{PARENT_ID}-00"))
+            exporter.flush()
+            spans = read_spans(path)
+        finally:
+            tracing._exporter = None
+            server.should_exit = True
+
+    assert text == "pong: trace me"
+    assert {span["trace_id"] for span in spans} == {TRACE_ID}
+    by_name = {span["name"]: span for span in spans}
+    assert {"mcp tools/call", "tool", "singleflight", "cache.lookup", "ratelimit.wait", "upstream", "respond"} <= set(by_name)
+
+    root = by_name["mcp tools/call"]
+    assert root["parent_id"] == PARENT_ID
+    assert by_name["tool"]["parent_id"] == root["span_id"]
+    assert by_name["respond"]["parent_id"] == root["span_id"]
+    assert by_name["upstream"]["attributes"]["model"] == "trace-model"
+    assert by_name["cache.lookup"]["attributes"]["hit"] is False
+    assert root["duration_ms"] >= by_name["upstream"]["duration_ms"]
+
+def test_sampling_and_collector():
+    """New traces follow TRACE_SAMPLE_RATE and batches reach a collector endpoint"""
+    assert tracing.start_trace("off") is tracing.NOOP
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "collected.jsonl")
+        port = free_port()
+        collector = tracing.serve_collector(port, output)
+        exporter = tracing.configure(endpoint=f"http://127.0.0.1:{port}/")
+        os.environ["TRACE_SAMPLE_RATE"] = "0"
+        try:
+            assert tracing.start_trace("never") is tracing.NOOP
+            os.environ["TRACE_SAMPLE_RATE"] = "1"
+            with tracing.start_trace("always", job="test") as root:
+                with tracing.span("child"):
+                    time.sleep(0.01)
+            exporter.flush()
+            spans = read_spans(output)
+        finally:
+            del os.environ["TRACE_SAMPLE_RATE"]
+            tracing._exporter = None
+            collector.shutdown()
+
+    assert [span["name"] for span in spans] == ["child", "always"]
+    assert spans[0]["parent_id"] == root.span_id and spans[1]["parent_id"] is None
+    assert spans[0]["duration_ms"] >= 10
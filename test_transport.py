@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for serving the MCP servers over HTTP transports
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import time
+
+import httpx
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from bench_http import free_port, start_server
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 0,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-06-18",
+        "capabilities": {},
+        "clientInfo": {"name": "test", "version": "1.0.0"}
+    }
+}
+
+HEADERS = {"Accept": "application/json, text/event-stream"}
+
+def test_streamable_http_sessions_share_process():
+    """Several client sessions call tools on one long-lived HTTP server"""
+    port = free_port()
+    proc = start_server("server_echo.py", "streamable-http", port)
+
+    async def call(text):
+        async with streamablehttp_client(f"http://127.0.0.1:{port}/mcp") as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                result = await session.call_tool("uppercase", {"text": text})
+                return result.content[0].text
+
+    async def run():
+        return await asyncio.gather(*[call(f"client {i}") for i in range(5)])
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    assert results == [f"Uppercase: CLIENT {i}" for i in range(5)]
+
+def test_max_sessions():
+    """Sessions beyond --max-sessions are rejected until one is closed"""
+    port = free_port()
+    proc = start_server("server_echo.py", "streamable-http", port, ["--max-sessions", "2"])
+    url = f"http://127.0.0.1:{port}/mcp"
+    try:
+        with httpx.Client(headers=HEADERS) as client:
+            first = client.post(url, json=INITIALIZE)
+            second = client.post(url, json=INITIALIZE)
+            assert first.status_code == 200 and second.status_code == 200
+
+            rejected = client.post(url, json=INITIALIZE)
+            assert rejected.status_code == 503
+            assert rejected.headers["retry-after"] == "1"
+
+            client.delete(url, headers={"mcp-session-id": first.headers["mcp-session-id"]})
+            assert client.post(url, json=INITIALIZE).status_code == 200
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+def worker_pids(parent):
+    result = subprocess.run(["pgrep", "-P", str(parent)], capture_output=True, text=True)
+    return set(result.stdout.split())
+
+def test_workers_serve_and_restart_gracefully():
+    """A pre-fork pool serves stateless calls and survives a graceful restart"""
+    port = free_port()
+    proc = start_server("server_echo.py", "streamable-http", port, ["--workers", "2", "--restart-delay", "0.2"])
+    url = f"http://127.0.0.1:{port}/mcp"
+    call = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "tools/call",
+        "params": {"name": "reverse", "arguments": {"text": "abc"}}
+    }
+    try:
+        time.sleep(1.0)
+        before = worker_pids(proc.pid)
+        assert len(before) == 2
+
+        with httpx.Client(headers=HEADERS) as client:
+            for _ in range(4):
+                assert "Reversed: cba" in client.post(url, json=call).text
+
+            os.kill(proc.pid, signal.SIGHUP)
+            time.sleep(2.0)
+            after = worker_pids(proc.pid)
+            assert len(after) == 2 and not (before & after)
+            assert "Reversed: cba" in client.post(url, json=call).text
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+if __name__ == "__main__":
+    print("HTTP Transport Test Suite")
+    print("=" * 50)
+
+    test_streamable_http_sessions_share_process()
+    test_max_sessions()
+    test_workers_serve_and_restart_gracefully()
+
+    print("\nTest suite completed!")
@@ -0,0 +1,199 @@
+"""
+Token counting and context budgeting for the conversation tools
+
+Estimates a request's prompt size per model before it is sent and trims
+the history to fit the model's context window (minus the reply's
+max_tokens), so oversized conversations fail or shrink locally instead of
+after a full upstream round trip. Token counts are memoized per message, so
+a growing history is only tokenized once per new turn. The memo is keyed on
+a digest of the text, so it doesn't keep old histories alive.
+
+Counts use tiktoken when it is installed (OpenAI models) and otherwise a
+~4 characters per token estimate. The rate limiter's TPM reservation, the
+latency router's prompt buckets and the prompt-cache breakpoint threshold
+all count with these functions, so they agree with the context budget.
+
+Trim policies:
+    drop_oldest   drop the oldest turns until the history fits
+    keep_last_k   keep the system prompt and the last CONTEXT_KEEP_LAST turns
+    summarize     replace the middle turns with a short extractive summary
+
+Configuration (per provider and model, like the rate limits):
+    <PROVIDER>_CONTEXT_TOKENS  context window size (default: from the model name)
+    CONTEXT_TRIM_POLICY        policy used when a tool doesn't pick one (default: drop_oldest)
+    CONTEXT_KEEP_LAST          turns kept by keep_last_k and summarize (default: 8)
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from functools import lru_cache
+
+import stats
+from ratelimit import env_limit
+
+POLICIES = ("drop_oldest", "keep_last_k", "summarize")
+
+# Tokens each message adds beyond its content (role and separators)
+MESSAGE_OVERHEAD = 4
+
+# Context window by model name prefix; the longest matching prefix wins
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "o1": 200000,
+    "o3": 200000,
+    "o4": 200000,
+    "claude": 200000
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+_counts = {"requests": 0, "trimmed": 0, "dropped_messages": 0, "summarized_messages": 0, "rejected": 0}
+
+MEMO_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "65536"))
+_memo = OrderedDict()  # (sha1 of text, model) -> token count, least recently used first
+_memo_counts = {"memo_hits": 0, "memo_misses": 0}
+
+class ContextOverflow(ValueError):
+    """The newest message alone does not fit the model's context budget"""
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    """tiktoken encoding for an OpenAI model, or None to use the estimate"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base") if model.startswith(("gpt", "o")) else None
+
+def text_tokens(text, model):
+    """Token count of one string for a model (memoized)"""
+    key = (hashlib.sha1(text.encode("utf-8")).digest(), model)
+    count = _memo.get(key)
+    if count is not None:
+        _memo.move_to_end(key)
+        _memo_counts["memo_hits"] += 1
+        return count
+
+    _memo_counts["memo_misses"] += 1
+    encoding = _encoding(model)
+    if encoding is None:
+        count = len(text) // 4 + 1
+    else:
+        count = len(encoding.encode(text, disallowed_special=()))
+    _memo[key] = count
+    if len(_memo) > MEMO_SIZE:
+        _memo.popitem(last=False)
+    return count
+
+def content_tokens(content, model):
+    """Token count of a string or content-block list"""
+    if not isinstance(content, str):
+        content = json.dumps(content, sort_keys=True)
+    return text_tokens(content, model)
+
+def message_tokens(message, model):
+    """Token count of one chat message, including per-message overhead"""
+    return content_tokens(message.get("content") or "", model) + MESSAGE_OVERHEAD
+
+def context_window(provider, model):
+    configured = env_limit(provider, model, "CONTEXT_TOKENS", 0)
+    if configured:
+        return configured
+    matches = [prefix for prefix in CONTEXT_WINDOWS if model.startswith(prefix)]
+    return CONTEXT_WINDOWS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_WINDOW
+
+def summarize(messages, max_chars=200):
+    """Extractive summary: the first sentence of each message, clipped"""
+    lines = []
+    for message in messages:
+        content = message.get("content") or ""
+        if not isinstance(content, str):
+            content = " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+        first = content.strip().split("\n")[0]
+        for end in (". ", "? ", "! "):
+            if end in first:
+                first = first[:first.index(end) + 1]
+                break
+        lines.append(f"{message['role']}: {first[:max_chars]}")
+    return "Summary of earlier conversation:\n" + "\n".join(lines)
+
+def fit_messages(provider, params, policy=None):
+    """
+    Trim a request's messages to fit the model's context budget
+
+    Args:
+        provider: "openai" or "anthropic", for the context-window settings
+        params: Request parameters with model, max_tokens and messages
+            (chat-style, system messages included)
+        policy: One of POLICIES (default: CONTEXT_TRIM_POLICY)
+
+    Returns:
+        The messages to send; params is not modified
+
+    Raises:
+        ContextOverflow: If the system prompt and newest message alone don't fit
+    """
+    policy = policy or os.getenv("CONTEXT_TRIM_POLICY", "drop_oldest")
+    if policy not in POLICIES:
+        raise ValueError(f"unknown trim policy {policy!r} (choose from {', '.join(POLICIES)})")
+    model = params["model"]
+    budget = context_window(provider, model) - params.get("max_tokens", 0)
+    messages = params["messages"]
+    _counts["requests"] += 1
+
+    sizes = [message_tokens(message, model) for message in messages]
+    total = sum(sizes)
+    if total <= budget:
+        return messages
+
+    system = [i for i, message in enumerate(messages) if message["role"] == "system"]
+    turns = [i for i, message in enumerate(messages) if message["role"] != "system"]
+    keep_last = max(1, int(os.getenv("CONTEXT_KEEP_LAST", "8")))
+    summary = None
+
+    if policy in ("keep_last_k", "summarize") and len(turns) > keep_last:
+        split = len(turns) - keep_last
+        middle, turns = turns[:split], turns[split:]
+        if policy == "summarize":
+            summary = {"role": "system", "content": summarize([messages[i] for i in middle])}
+            _counts["summarized_messages"] += len(middle)
+        else:
+            _counts["dropped_messages"] += len(middle)
+
+    def size():
+        extra = message_tokens(summary, model) if summary else 0
+        return sum(sizes[i] for i in system + turns) + extra
+
+    # Drop the oldest turns until the history fits, always keeping the newest
+    while len(turns) > 1 and size() > budget:
+        turns.pop(0)
+        _counts["dropped_messages"] += 1
+    # Conversations must still open with a user turn
+    while len(turns) > 1 and messages[turns[0]]["role"] != "user":
+        turns.pop(0)
+        _counts["dropped_messages"] += 1
+    if summary and size() > budget:
+        summary = None
+    if size() > budget:
+        _counts["rejected"] += 1
+        raise ContextOverflow(f"prompt needs ~{size()} tokens but {model} has room for {budget}")
+
+    _counts["trimmed"] += 1
+    kept = [messages[i] for i in system]
+    if summary:
+        kept.append(summary)
+    return kept + [messages[i] for i in turns]
+
+def token_stats():
+    return {**_counts, **_memo_counts, "memo_size": len(_memo)}
+
+stats.register("tokens", token_stats)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Request tracing for the MCP servers
+
+instrument() starts a trace for each JSON-RPC request a FastMCP server
+handles, continuing the caller's W3C traceparent when the request's _meta
+(or, over HTTP, its headers) carries one. Code on the request path adds
+nested spans with span(): tool dispatch, cache lookups, request coalescing,
+rate-limiter waits, the upstream provider call and sending the response.
+
+Unsampled requests only pay for one random() call and a context-variable
+lookup per span, so tracing can stay on in production with a low rate.
+
+Configuration (tracing is off unless an exporter is set):
+    TRACE_FILE         append finished spans to this JSONL file
+    TRACE_ENDPOINT     POST batches of spans as JSON to this URL
+    TRACE_SAMPLE_RATE  fraction of new traces recorded (default: 0.1);
+                       a sampled incoming traceparent is always recorded
+
+Run this module to start a local collector stand-in that writes the spans
+it receives to a JSONL file:
+    python tracing.py --port 4318 --output traces.jsonl
+"""
+
+import argparse
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current = contextvars.ContextVar("current_span", default=None)
+_exporter = None
+
+class Span:
+    """One timed operation in a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start", "start_time", "status", "token")
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.status = "ok"
+        self.token = None
+
+    def set(self, name, value):
+        self.attributes[name] = value
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def __enter__(self):
+        self.start_time = time.time()
+        self.start = time.perf_counter()
+        self.token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current.reset(self.token)
+        if exc_type is not None:
+            self.status = "error"
+            self.attributes.setdefault("error", exc_type.__name__)
+        _exporter.export({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": duration * 1000,
+            "status": self.status,
+            "attributes": self.attributes
+        })
+        return False
+
+class NoopSpan:
+    """Stand-in for spans of unsampled requests"""
+
+    traceparent = None
+
+    def set(self, name, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NOOP = NoopSpan()
+
+def span(name, **attributes):
+    """Child span of the current span, or a no-op outside a sampled trace"""
+    parent = _current.get()
+    if parent is None:
+        return NOOP
+    return Span(name, parent.trace_id, parent.span_id, attributes)
+
+def start_trace(name, traceparent=None, **attributes):
+    """
+    Root span for a request, continuing traceparent when one is given
+
+    The span is recorded if the incoming traceparent is sampled, or else
+    with probability TRACE_SAMPLE_RATE. Returns NOOP when tracing is off.
+    """
+    if _exporter is None:
+        return NOOP
+    match = TRACEPARENT.match(traceparent.strip().lower()) if isinstance(traceparent, str) else None
+    if match:
+        if not int(match.group(3), 16) & 1:
+            return NOOP
+        return Span(name, match.group(1), match.group(2), attributes)
+    if random.random() >= float(os.getenv("TRACE_SAMPLE_RATE", "0.1")):
+        return NOOP
+    return Span(name, os.urandom(16).hex(), None, attributes)
+
+def incoming_traceparent(message):
+    """traceparent from a request's _meta, or from its HTTP headers"""
+    meta = message.request_meta
+    traceparent = getattr(meta, "traceparent", None) if meta is not None else None
+    if traceparent is None and message.message_metadata is not None:
+        request = getattr(message.message_metadata, "request_context", None)
+        headers = getattr(request, "headers", None)
+        if headers is not None:
+            traceparent = headers.get("traceparent")
+    return traceparent
+
+class Exporter:
+    """Batches finished spans on a background thread and writes them out"""
+
+    def __init__(self, path=None, endpoint=None, interval=1.0):
+        self.path = path
+        self.endpoint = endpoint
+        self.interval = interval
+        self.queue = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        threading.Thread(target=self.run, daemon=True).start()
+        atexit.register(self.flush)
+
+    def export(self, record):
+        self.queue.put(record)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            batch = []
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            if self.path:
+                # One O_APPEND write per batch keeps lines whole when workers share the file
+                data = "".join(json.dumps(record, default=str) + "\n" for record in batch).encode("utf-8")
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, data)
+                finally:
+                    os.close(fd)
+            if self.endpoint:
+                request = urllib.request.Request(
+                    self.endpoint,
+                    data=json.dumps(batch, default=str).encode("utf-8"),
+                    headers={"Content-Type": "application/json"}
+                )
+                try:
+                    urllib.request.urlopen(request, timeout=5).close()
+                except OSError:
+                    # Tracing must never take the server down; drop the batch
+                    pass
+
+def configure(path=None, endpoint=None):
+    """Set up the exporter from arguments or TRACE_FILE / TRACE_ENDPOINT; returns it or None"""
+    global _exporter
+    path = path or os.getenv("TRACE_FILE")
+    endpoint = endpoint or os.getenv("TRACE_ENDPOINT")
+    if path or endpoint:
+        _exporter = Exporter(path, endpoint, float(os.getenv("TRACE_FLUSH_INTERVAL", "1")))
+    return _exporter
+
+def instrument(mcp):
+    """Trace every request a FastMCP server handles, with a span per tool call"""
+    server = mcp._mcp_server
+    if getattr(server, "traced", False):
+        return
+    handle_request = server._handle_request
+    manager = mcp._tool_manager
+    call_tool = manager.call_tool
+
+    async def traced_handle_request(message, req, session, lifespan_context, raise_exceptions):
+        method = getattr(req, "method", type(req).__name__)
+        root = start_trace(f"mcp {method}", incoming_traceparent(message), server=mcp.name, method=method)
+        if root is NOOP:
+            return await handle_request(message, req, session, lifespan_context, raise_exceptions)
+
+        respond = message.respond
+
+        async def traced_respond(response):
+            # Serializing the result and writing it to the transport
+            with span("respond"):
+                await respond(response)
+
+        message.respond = traced_respond
+        with root:
+            await handle_request(message, req, session, lifespan_context, raise_exceptions)
+
+    async def traced_call_tool(name, arguments, *args, **kwargs):
+        # Argument validation and the tool body
+        with span("tool", tool=name):
+            return await call_tool(name, arguments, *args, **kwargs)
+
+    server._handle_request = traced_handle_request
+    server.traced = True
+    manager.call_tool = traced_call_tool
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    output = None
+
+    def do_POST(self):
+        batch = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with open(self.output, "a") as f:
+            f.writelines(json.dumps(record) + "\n" for record in batch)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_collector(port, output, host="127.0.0.1"):
+    """Start a collector stand-in in a background thread; returns the HTTP server"""
+    handler = type("Collector", (CollectorHandler,), {"output": output})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local trace collector stand-in")
+    parser.add_argument("--port", type=int, default=4318, help="Port to receive spans on (default: 4318)")
+    parser.add_argument("--output", default="traces.jsonl", help="JSONL file to append spans to")
+    args = parser.parse_args()
+    server = serve_collector(args.port, args.output)
+    print(f"Collecting spans on http://127.0.0.1:{args.port} into {args.output}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Pre-fork worker pool for the streamable HTTP transport
+
+The parent binds one listening socket and forks worker processes that all
+accept on it, so JSON-RPC parsing, validation and serialization spread
+across cores. Workers run in stateless HTTP mode, since any of them may
+receive any request, and share the response caches and conversation
+sessions through SQLite files.
+
+Signals to the parent:
+    SIGHUP           replace the workers one at a time (graceful restart)
+    SIGTERM, SIGINT  stop all workers after in-flight requests finish
+"""
+
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+import uvicorn
+
+import cache
+import metrics
+import sessions
+import tracing
+from semantic_cache import semantic_cache
+
+class WorkerPool:
+    """Supervise a fixed number of forked uvicorn workers"""
+
+    def __init__(self, mcp, args, build_app):
+        self.mcp = mcp
+        self.args = args
+        self.build_app = build_app
+        self.sock = None
+        self.workers = set()
+        self.retiring = set()
+        self.restart_requested = False
+        self.stop_requested = False
+
+    def bind(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.args.host, self.args.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self.sock = sock
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self.run_worker()
+            except BaseException:
+                code = 1
+                raise
+            finally:
+                os._exit(code)
+        self.workers.add(pid)
+        return pid
+
+    def run_worker(self):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        metrics.start_exporters(worker=True)
+        tracing.configure()
+        config = uvicorn.Config(self.build_app(), log_level=self.mcp.settings.log_level.lower())
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def rolling_restart(self):
+        """Start a replacement for each worker before retiring the old one"""
+        for pid in list(self.workers - self.retiring):
+            self.spawn()
+            time.sleep(self.args.restart_delay)
+            self.retire(pid)
+
+    def retire(self, pid):
+        self.retiring.add(pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def reap(self):
+        """Collect exited workers and replace any that died unexpectedly"""
+        while self.workers:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            self.workers.discard(pid)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+            elif not self.stop_requested:
+                print(f"⚠️  worker {pid} exited with status {status}, restarting", file=sys.stderr)
+                self.spawn()
+
+    def run(self):
+        self.bind()
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, "restart_requested", True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "stop_requested", True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, "stop_requested", True))
+
+        for _ in range(self.args.workers):
+            self.spawn()
+        print(f"   {self.args.workers} workers (pids {', '.join(map(str, sorted(self.workers)))})", file=sys.stderr)
+
+        while not self.stop_requested:
+            if self.restart_requested:
+                self.restart_requested = False
+                print("   graceful restart", file=sys.stderr)
+                self.rolling_restart()
+            self.reap()
+            time.sleep(0.2)
+
+        for pid in list(self.workers):
+            self.retire(pid)
+        while self.workers:
+            pid, _ = os.waitpid(-1, 0)
+            self.workers.discard(pid)
+        self.sock.close()
+
+def serve_workers(mcp, args, build_app):
+    """Run a streamable HTTP server as a pool of forked workers"""
+    if args.transport != "streamable-http":
+        raise SystemExit("--workers requires --transport streamable-http (SSE sessions are tied to one process)")
+    if not hasattr(os, "fork"):
+        raise SystemExit("--workers requires a POSIX system")
+
+    cache_dir = args.cache_dir or os.path.join(tempfile.gettempdir(), f"mcp-cache-{args.port}")
+    cache.share_on_disk(cache_dir)
+    sessions.share_on_disk(cache_dir)
+    if semantic_cache.path:
+        # The memory-mapped index has one writer; each worker keeps its own in memory instead
+        print("⚠️  SEMANTIC_CACHE_PATH is ignored with --workers", file=sys.stderr)
+        semantic_cache.path = None
+    WorkerPool(mcp, args, build_app).run()